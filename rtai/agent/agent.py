@@ -4,6 +4,8 @@ from typing import List, TYPE_CHECKING
 from queue import Queue
 from numpy import uint16
 from contextlib import contextmanager
+from json import dump, load
+from os import path, makedirs
 
 if TYPE_CHECKING:
     from rtai.agent.agent_manager import AgentManager
@@ -12,6 +14,7 @@ from rtai.agent.abstract_agent import AbstractAgent
 
 from rtai.core.event import Event, EventType
 from rtai.utils.logging import info, debug, warn, log_transcript
+from rtai.utils.stats import profiler
 from rtai.agent.persona import Persona
 from rtai.world.clock import clock
 from rtai.agent.memory.short_memory import ShortTermMemory
@@ -24,6 +27,9 @@ from rtai.agent.behavior.chat import Chat
 from rtai.agent.cognition.cognition import Cognition
 from rtai.agent.cognition.conversing import Conversing
 
+PERSONA_FILE = 'persona.json'
+SHORT_TERM_FILE = 'short_term.json'
+
 class Agent(AbstractAgent):
     """ _summary_ Class to represent AI Agent with behaviors generated by LLMs
 
@@ -63,7 +69,7 @@ class Agent(AbstractAgent):
             info("Generating Agent [%s] from LLM" % (self.get_name()))
 
         self.s_mem: ShortTermMemory = ShortTermMemory(self.id, self.persona, self.llm_client)
-        self.l_mem: LongTermMemory = LongTermMemory(self.persona, self.llm_client)
+        self.l_mem: LongTermMemory = LongTermMemory(self.persona, self.llm_client, self.agent_mgr.embedding_service, self.agent_mgr.index_config, self.agent_mgr.min_importance)
         self.cognition = Cognition(self)
         self.conversing = Conversing(self)
 
@@ -75,17 +81,25 @@ class Agent(AbstractAgent):
     def update(self) -> None:
         """ _summary_ Update the agent's state
         """
-        self.cognition.perceive()
+        with profiler.measure(self.get_name(), 'perceive'):
+            self.cognition.perceive()
         debug("Agent [%s] finished update()" % (self.get_name()))
 
     def process_queue(self) -> None:
-        """ _summary_ Process the events from the agent's event queue"""
-        event: Event = None
+        """ _summary_ Process the events from the agent's event queue
+
+        Chat requests sent in the same cycle arrive in whatever order the agent threads sent them,
+        so they are processed by chat priority instead of arrival order.
+        """
+        events: List[Event] = []
         while not self.agent_queue.empty():
-            event = self.agent_queue.get(block=False)
-                
+            events.append(self.agent_queue.get(block=False))
+
+        chats = sorted([e for e in events if e.get_event_type() == EventType.ChatEvent], key=lambda e: e.get_message().get_priority())
+        for event in [e for e in events if e.get_event_type() != EventType.ChatEvent] + chats:
             debug("Agent [%s] Received event:\n\t%s" % (self.get_name(), event))
             self.process_event(event)
+            event.release()
 
     def process_event(self, event: Event) -> None:
         """ _summary_ Process an event received from the agent's queue
@@ -116,22 +130,26 @@ class Agent(AbstractAgent):
 
         if new_day or first_day:
              # Creates Planning Thought
-            self.cognition.plan(False, new_day, first_day)
+            with profiler.measure(self.get_name(), 'plan'):
+                self.cognition.plan(False, new_day, first_day)
 
         # if action expired, create new agenda/plan
         current_action: Action = self.s_mem.current_action if len(self.s_mem.chatting_with) == 0 else self.s_mem.current_action
                
         if current_action.has_completed():
             debug("Action [%s] completed at [%s]" % (self.s_mem.current_action.description, clock.get_time_str()))
-            self.cognition.determine_action()
+            with profiler.measure(self.get_name(), 'determine_action'):
+                self.cognition.determine_action()
             
         # TODO later - if perceived event that needs to be responded to (such as chat), generate action or chat
         self.process_queue()
 
         if len(self.s_mem.chatting_with) > 0:
-            self.cognition.chat()
+            with profiler.measure(self.get_name(), 'chat'):
+                self.cognition.chat()
 
         elapsed_time = perf_counter() - start_time
+        profiler.record(self.get_name(), 'act', elapsed_time * 1000)
         debug("Agent [%s] took [%s] ms for act()" % (self.get_name(), elapsed_time * 1000))
 
     def reflect(self) -> None:
@@ -142,6 +160,7 @@ class Agent(AbstractAgent):
         self.cognition.reflect()
 
         elapsed_time = perf_counter() - start_time
+        profiler.record(self.get_name(), 'reflect', elapsed_time * 1000)
         debug("Agent [%s] took [%s] ms for reflect()" % (self.get_name(), elapsed_time * 1000))
 
     def update_identity(self) -> None:
@@ -176,7 +195,8 @@ class Agent(AbstractAgent):
     def debug_timer(self) -> None:
         """ _summary_ Function to debug the agent's timer
         """
-        debug("[DEBUG_TIMER - %s] Private Memory(len=%s):\n%s" % (self.get_name(), len(self.memory), self.memory))
+        debug("[DEBUG_TIMER - %s] Private Memory(len=%s):\n%s" % (self.get_name(), len(self.l_mem.id_to_node), self.l_mem.id_to_node))
+        debug("[DEBUG_TIMER - %s] Memory insert latency: %s" % (self.get_name(), self.l_mem.get_insert_latency()))
 
     def __str__(self) -> str:
         return self.get_name()
@@ -232,27 +252,50 @@ class Agent(AbstractAgent):
         """
         log_transcript("System", clock.get_time_str(), 'Whsiper(Message)', message)
         self.l_mem.add_concept(message, event_type=EventType.WhisperEvent)
+        self.agent_mgr.wake(self.get_name())
 
 
     def save_to_file(self, file_path: str) -> None:
-        """ _summary_ Save the agent's state to a file
+        """ _summary_ Save the agent's state to a snapshot directory
         
         Args:
-            file_path (str): File path to save to
+            file_path (str): Directory to save to
         """
-        # TODO - should be 2 saves : 1 for state and other for base persona ??
-        pass
+        makedirs(file_path, exist_ok=True)
+        with open(path.join(file_path, PERSONA_FILE), 'w') as f:
+            dump(self.persona.to_dict(), f)
+        self.s_mem.save_to_file(path.join(file_path, SHORT_TERM_FILE))
+        self.l_mem.save_to_file(file_path)
+        debug("Saved Agent [%s] to [%s]" % (self.get_name(), file_path))
     
     def load_from_file(self, file_path: str) -> bool:
-        """ _summary_ Load the agent's state from a file
+        """ _summary_ Load the agent's state from a snapshot directory
 
         Args:
-            file_path (str): File path to load from
+            file_path (str): Directory to load from
         
         Returns:
             bool: True if successful, False otherwise
         """
-        pass
+        persona_file = path.join(file_path, PERSONA_FILE)
+        if not path.exists(persona_file) or not path.exists(path.join(file_path, SHORT_TERM_FILE)):
+            warn("No snapshot of Agent [%s] found at [%s]" % (self.get_name(), file_path))
+            return False
+
+        with open(persona_file, 'r') as f:
+            persona = Persona.from_dict(load(f))
+
+        # the long term memory only swaps in a consistent snapshot, so the agent is untouched if it fails
+        if not self.l_mem.load_from_file(file_path) or not self.s_mem.load_from_file(path.join(file_path, SHORT_TERM_FILE)):
+            return False
+
+        self.persona = persona
+        self.s_mem.persona = persona
+        self.l_mem.persona = persona
+        self.common_set = self.get_common_set_str()
+
+        info("Loaded Agent [%s] with [%d] memories from [%s]" % (self.get_name(), len(self.l_mem.id_to_node), file_path))
+        return True
 
     def get_common_set_str(self) -> str:
         """ _summary_ Get the agent's common set as a string
@@ -280,5 +323,4 @@ class Agent(AbstractAgent):
         Args:
             memories (List[ConceptNode]): Memories to load
         """
-        for mem in memories:
-            self.l_mem.add_concept(mem)
\ No newline at end of file
+        self.l_mem.bulk_load(memories)
\ No newline at end of file
@@ -1,15 +1,25 @@
-from typing import List, Set, Dict
+from typing import List, Set, Dict, Tuple
 from queue import Queue
+from heapq import heappush, heappop
+from threading import Lock
+from json import dump, load
+from os import path, makedirs
 from concurrent.futures import ThreadPoolExecutor, wait, ALL_COMPLETED
+from asyncio import gather, get_running_loop
 from numpy import uint64
 
 from rtai.utils.config import Config
+from rtai.utils.datetime import datetime
 from rtai.agent.agent import Agent
 from rtai.agent.abstract_agent import AbstractAgent
 from rtai.core.event import Event
 from rtai.utils.timer_manager import TimerManager
 from rtai.utils.logging import info, debug, error
+from rtai.utils.stats import profiler
 from rtai.llm.llm_client import LLMClient
+from rtai.llm.embedding_service import EmbeddingService
+from rtai.agent.memory.embedding_store import IndexConfig
+from rtai.world.clock import clock, DAY_BOUNDARY
 from rtai.world.world import World
 from rtai.agent.behavior.chat import Chat
 from rtai.agent.behavior.chat_message import ChatMessage
@@ -19,6 +29,14 @@ from tests.mock.llm.llm_client_mock import LLMTestClient
 DEFAULT_NUM_AGENTS = 4
 NUM_AGENTS_CONFIG = "NumAgents"
 AGENT_STATIC_FILES = "LoadFiles"
+LONG_TERM_MEMORY_CONFIG = "LongTermMemory"
+INDEX_CONFIG = "Index"
+MIN_IMPORTANCE_CONFIG = "ForgetBelowImportance"
+SKIP_IDLE_AGENTS_CONFIG = "SkipIdleAgents"
+PARALLEL_ACT_CONFIG = "ParallelAct"
+
+AGENTS_SNAPSHOT_DIR = "agents"
+AGENT_MANAGER_SNAPSHOT_FILE = "agent_manager.json"
 
 class AgentManager:
     """ _summary_ Class to manage all the different agents, facilitating communication between them, and provide shared memory between them.
@@ -32,7 +50,7 @@ class AgentManager:
     
     """
 
-    def __init__(self, event_queue: Queue, cfg: Config, client: LLMClient, world: World):
+    def __init__(self, event_queue: Queue, cfg: Config, client: LLMClient, world: World, embedding_service: EmbeddingService=None):
         """_summary_ Constructor for the Agent Manager.
 
         Args:
@@ -40,6 +58,7 @@ class AgentManager:
             cfg (Config): Config object for the Agent Manager.
             client (LLMClient): LLM Client for the Agent Manager.
             world (World): World object for the Agent Manager.
+            embedding_service (EmbeddingService, optional): Embeddings model shared by all agents. Defaults to the process-wide EmbeddingService.
         """
         self.queue: Queue = event_queue
         self.cfg: Config = cfg
@@ -51,6 +70,24 @@ class AgentManager:
         self.cycle_count: uint64 = uint64(0)
         self.world: World = world
         self.chat_mgr: ChatManager = ChatManager()
+        self.embedding_service: EmbeddingService = embedding_service if embedding_service is not None else EmbeddingService()
+
+        memory_cfg: Config = cfg.expand(LONG_TERM_MEMORY_CONFIG)
+        self.index_config: IndexConfig = IndexConfig.from_config(memory_cfg.expand(INDEX_CONFIG))
+        self.min_importance: float = float(memory_cfg.get_value(MIN_IMPORTANCE_CONFIG, "0"))
+        self.memory_sweeps: List[Dict[str, int]] = []
+        self.sweep_due: bool = False
+        clock.subscribe(DAY_BOUNDARY, self._on_new_day)
+
+        # Agents mid-action sleep until their action's end time unless an event wakes them up
+        self.skip_idle_agents: bool = cfg.get_value(SKIP_IDLE_AGENTS_CONFIG, "True") == "True"
+        self.parallel_act: bool = cfg.get_value(PARALLEL_ACT_CONFIG, "True") == "True"
+        self.wakeup_heap: List[Tuple[int, str]] = [] # (action end timestamp, agent name)
+        self.wakeup_times: Dict[str, int] = dict() # latest end timestamp of each sleeping agent, older heap entries are stale
+        self.woken: Set[str] = set() # agents due next cycle regardless of their action
+        self.woken_lock: Lock = Lock()
+        self.agent_steps: int = 0
+        self.skipped_agent_steps: int = 0
 
     def initialize(self) -> bool:
         """_summary_ Initialize the Agent Manager.
@@ -59,12 +96,7 @@ class AgentManager:
             bool: True if initialization was successful, False otherwise.
         """
         num_agents = int(self.cfg.get_value(NUM_AGENTS_CONFIG, DEFAULT_NUM_AGENTS))
-
-        static_persona_files = self.cfg.get_value(AGENT_STATIC_FILES, [])
-        if len(static_persona_files) > 0:
-            static_persona_files = static_persona_files[1:-1]
-            static_persona_files = [f.strip().replace("'", "") for f in static_persona_files.split(',')]
-            static_persona_files = [static_persona_files[i] if i < len(static_persona_files) else '' for i in range(num_agents)]
+        static_persona_files = self.get_persona_files(num_agents)
 
         for i in range(num_agents):
             a = Agent(self, self.client, file_path=static_persona_files[i])
@@ -74,10 +106,34 @@ class AgentManager:
         if len(self.agents) != num_agents:
             error("There was an error initializing some agents.")
 
+        self.wake(*self.agents.keys())
         info("Initialized Agent Manager with [%d] agents" % len(self.agents))
         self.tp = ThreadPoolExecutor(len(self.agents))
         return True
     
+    def get_persona_files(self, num_agents: int) -> List[str]:
+        """ _summary_ Get the persona file of every agent from the config
+
+        Args:
+            num_agents (int): number of agents
+
+        Returns:
+            List[str]: persona file of each agent, empty for agents generated by the LLM
+        """
+        static_persona_files = self.cfg.get_value(AGENT_STATIC_FILES, "")
+        if len(static_persona_files) > 0:
+            static_persona_files = static_persona_files[1:-1]
+            static_persona_files = [f.strip().replace("'", "") for f in static_persona_files.split(',')]
+        return [static_persona_files[i] if i < len(static_persona_files) else '' for i in range(num_agents)]
+
+    def get_agent_names(self) -> List[str]:
+        """ _summary_ Get the names of all the agents
+
+        Returns:
+            List[str]: names of the agents, in registration order
+        """
+        return list(self.agents.keys())
+
     def start(self) -> None:
         """_summary_ Start each agent individually in parallel with a process
         TODO: rearchitect AgentManager - Agent relationship
@@ -115,10 +171,11 @@ class AgentManager:
             
         recipient = event.get_receiver()
         try:
-            self.agents[recipient].agent_queue.put(event)
+            self.agents[recipient].agent_queue.put(event.retain())
         except KeyError:
             error("Agent [%s] not registered with Agent Manager" % recipient)
             return False
+        self.wake(recipient)
         return True
 
     def dispatch_to_queue(self, event: Event) -> None:
@@ -138,8 +195,12 @@ class AgentManager:
         Args:
             event (Event): Narration event to dispatch
         """
+        # retain first - releasing first would recycle the event if it is the last narration dispatched again
+        event.retain()
+        self.last_narration.release()
         self.last_narration = event
         [a.narration_event_trigger(event) for a in self.agents.values()]
+        self.wake(*self.agents.keys())
 
     def register(self, agent: AbstractAgent) -> bool:
         """ _summary_ Register an agent with the Agent Manager
@@ -171,31 +232,175 @@ class AgentManager:
             test_llm_client (LLMTestClient, optional): Test LLM Client to use for static initialization once. Defaults to None.
         """
         # debug("Updating Agents")
-        agents = self.agents.values()
+        agents = self.get_due_agents(force=first_day or new_day)
 
         if test_llm_client is not None: # TODO delete - super hacky and just for testing
-            for a in agents:
+            for a in self.agents.values():
                 a.s_mem.llm_client = test_llm_client
                 a.llm_client = test_llm_client
 
+        # LLM requests issued by the agents during the cycle are accounted by the scheduler
+        self.client.scheduler.begin_cycle()
+
         # First update the state of all the agents    
         wait([self.tp.submit(a.update) for a in agents])
 
         # TODO - have agents communicate with one another and actions inform other agents action in a reactive manner 
-        #Then generate actions (Thoughts, Actions, Chats) sequentially for all the agents
-        # I guess this can be in parallel if all agents have perceived/updated already
-        [a.act(first_day, new_day) for a in agents]
+        # Then generate actions (Thoughts, Actions, Chats) for all the agents
+        # Agents only mutate their own state while acting - chats are shared through the chat manager, which holds back
+        # new messages until every agent acted, and chat requests reach other agents through the event queue
+        if self.parallel_act:
+            with self.chat_mgr.defer_writes():
+                wait([self.tp.submit(a.act, first_day, new_day) for a in agents])
+        else:
+            [a.act(first_day, new_day) for a in agents]
             
         # Then generate reflections / reveries for all the agents
         wait([self.tp.submit(a.reflect) for a in agents])
 
         if test_llm_client is not None: # TODO delete - super hacky and just for testing
-            for a in agents:
+            for a in self.agents.values():
                 a.s_mem.llm_client = self.client
                 a.llm_client = self.client
 
+        self._end_cycle(agents)
+
+    async def update_async(self, first_day: bool=False, new_day: bool=False) -> None:
+        """ _summary_ Update all the agents in Agent Manager from an asyncio loop
+
+        Same phases as update(), but the blocking agent work (LLM and embedding calls) is awaited on the
+        agent thread pool, so the loop keeps driving the clock and event dispatch in the meantime.
+
+        Args:
+            first_day (bool, optional): Whether or not it is the first day. Defaults to False.
+            new_day (bool, optional): Whether or not it is a new day. Defaults to False.
+        """
+        loop = get_running_loop()
+        agents = self.get_due_agents(force=first_day or new_day)
+
+        self.client.scheduler.begin_cycle()
+        await gather(*[loop.run_in_executor(self.tp, a.update) for a in agents])
+        if self.parallel_act:
+            with self.chat_mgr.defer_writes():
+                await gather(*[loop.run_in_executor(self.tp, a.act, first_day, new_day) for a in agents])
+        else:
+            for a in agents:
+                await loop.run_in_executor(self.tp, a.act, first_day, new_day)
+        await gather(*[loop.run_in_executor(self.tp, a.reflect) for a in agents])
+        self._end_cycle(agents)
+
+    def wake(self, *names: str) -> None:
+        """ _summary_ Wake agents up, so they are updated next cycle even if their current action is still running
+
+        Args:
+            names (str): names of the agents to wake up
+        """
+        with self.woken_lock:
+            self.woken.update(names)
+
+    def get_due_agents(self, force: bool=False) -> List[Agent]:
+        """ _summary_ Get the agents to update this cycle
+
+        An agent is due when its current action completed, it was woken up by an event, or it is chatting.
+        The others are mid-action with nothing to react to, and are skipped.
+
+        Args:
+            force (bool, optional): Whether or not to update every agent regardless. Defaults to False.
+
+        Returns:
+            List[Agent]: agents to update, in registration order
+        """
+        with self.woken_lock:
+            due, self.woken = self.woken, set()
+
+        if force or not self.skip_idle_agents:
+            due = set(self.agents.keys())
+        else:
+            now = clock.peek().timestamp()
+            while len(self.wakeup_heap) > 0 and self.wakeup_heap[0][0] <= now:
+                end_time, name = heappop(self.wakeup_heap)
+                if self.wakeup_times.get(name) == end_time:
+                    due.add(name)
+        [self.wakeup_times.pop(name, None) for name in due]
+
+        self.agent_steps += len(due)
+        self.skipped_agent_steps += len(self.agents) - len(due)
+        return [a for name, a in self.agents.items() if name in due]
+
+    def _schedule_wakeup(self, agent: Agent) -> None:
+        """ _summary_ Put an agent to sleep until its current action ends, or keep it due if it has no running action
+
+        Args:
+            agent (Agent): agent that was just updated
+        """
+        name = agent.get_name()
+        action = agent.s_mem.current_action
+        if len(agent.s_mem.chatting_with) > 0 or not agent.agent_queue.empty() or not action.address or action.end_time is None:
+            self.wake(name)
+            return
+
+        end_time = action.end_time.timestamp()
+        self.wakeup_times[name] = end_time
+        heappush(self.wakeup_heap, (end_time, name))
+
+    def get_schedule_stats(self) -> Dict[str, int]:
+        """ _summary_ Get the number of agent steps run and skipped since the start
+
+        Returns:
+            Dict[str, int]: agent steps run and skipped because the agent was idle
+        """
+        return {'agent_steps': self.agent_steps, 'skipped_agent_steps': self.skipped_agent_steps}
+
+    def get_profile(self) -> Dict[str, Dict[str, dict]]:
+        """ _summary_ Get the per-phase latency profile of the agents, LLM calls and embeddings
+
+        Returns:
+            Dict[str, Dict[str, dict]]: summary of the profiled sections keyed by scope (agent name, 'llm', ...) then section name
+        """
+        return profiler.get_stats()
+
+    def _end_cycle(self, agents: List[Agent]) -> None:
+        """ _summary_ Finish an agent cycle - schedule the next wakeup of the updated agents, sweep memories on a new day and account LLM throughput
+
+        Args:
+            agents (List[Agent]): agents updated this cycle
+        """
+        [self._schedule_wakeup(a) for a in agents]
+
+        # Forget expired memories once per simulated day
+        if self.sweep_due:
+            self.sweep_memories()
+
+        llm_stats = self.client.scheduler.end_cycle()
+        if llm_stats.requests > 0:
+            debug("Cycle [%d] LLM throughput: %s" % (self.cycle_count, llm_stats))
+
         self.cycle_count += 1
     
+    def _on_new_day(self, day_start: datetime) -> None:
+        """ _summary_ Clock subscriber - schedule a memory sweep for the end of the next agent cycle
+
+        Args:
+            day_start (datetime): midnight of the new day
+        """
+        self.sweep_due = True
+
+    def sweep_memories(self) -> int:
+        """ _summary_ Sweep the long term memory of all agents, forgetting expired and low importance concepts
+
+        Returns:
+            int: number of concepts forgotten across all agents
+        """
+        day = int(clock.get_day_count())
+        self.sweep_due = False
+        agents = self.agents.values()
+
+        reclaimed = sum(a.l_mem.sweep() for a in agents)
+        index_size = sum(len(a.l_mem.embedding_store) for a in agents)
+        self.memory_sweeps.append({'day': day, 'reclaimed': reclaimed, 'index_size': index_size})
+        info("Day [%d] memory sweep reclaimed [%d] concepts, [%d] concepts remain indexed across [%d] agents" % (day, reclaimed, index_size, len(self.agents)))
+        return reclaimed
+
     def get_last_narration(self) -> Event:
         """ _summary_ Get the last narration event
 
@@ -208,6 +413,32 @@ class AgentManager:
         """ _summary_ Calls debug timer for all agents
         """
         [a.debug_timer() for a in self.agents.values()]
+        debug("[DEBUG_TIMER - AgentManager] Agent steps: %s" % self.get_schedule_stats())
+
+    def next_wakeup(self) -> datetime:
+        """ _summary_ Get the world time at which the next agent has something to do, if every agent is idle
+
+        An agent is idle while its current action is running, it is not chatting and its event queue is empty.
+        Until the earliest action end time, agent updates have nothing to react to, so the clock can jump straight to it.
+
+        Returns:
+            datetime: earliest end time of the agents' current actions, or None if any agent is not idle
+        """
+        with self.woken_lock:
+            if len(self.woken) > 0:
+                return None
+
+        wakeup: datetime = None
+        for a in self.agents.values():
+            action = a.s_mem.current_action
+            if len(a.s_mem.chatting_with) > 0 or not a.agent_queue.empty() or not action.address or action.end_time is None:
+                return None
+            if wakeup is None or action.end_time < wakeup:
+                wakeup = action.end_time
+
+        if wakeup is None or wakeup <= clock.peek():
+            return None
+        return wakeup
 
     def get_cycle_count(self) -> uint64:
         """ _summary_ Get the cycle count
@@ -217,10 +448,67 @@ class AgentManager:
         """
         return self.cycle_count
     
+    def save_to_dir(self, dir_path: str) -> None:
+        """ _summary_ Save the state of the Agent Manager and every agent to a snapshot directory
+
+        Args:
+            dir_path (str): Directory to save to
+        """
+        makedirs(dir_path, exist_ok=True)
+        with open(path.join(dir_path, AGENT_MANAGER_SNAPSHOT_FILE), 'w') as f:
+            dump({'cycle_count': int(self.cycle_count), 'memory_sweeps': self.memory_sweeps}, f)
+        self.save_agents(dir_path)
+
+    def save_agents(self, dir_path: str) -> None:
+        """ _summary_ Save every agent to the agents directory of a snapshot
+
+        Args:
+            dir_path (str): Snapshot directory
+        """
+        [a.save_to_file(path.join(dir_path, AGENTS_SNAPSHOT_DIR, name)) for name, a in self.agents.items()]
+
+    def load_from_dir(self, dir_path: str) -> bool:
+        """ _summary_ Restore the state of the Agent Manager and every agent from a snapshot directory
+
+        Args:
+            dir_path (str): Directory to load from
+
+        Returns:
+            bool: True if every agent was restored, False otherwise
+        """
+        state_file = path.join(dir_path, AGENT_MANAGER_SNAPSHOT_FILE)
+        if not path.exists(state_file):
+            error("No Agent Manager snapshot found at [%s]" % dir_path)
+            return False
+
+        with open(state_file, 'r') as f:
+            state = load(f)
+        self.cycle_count = uint64(state['cycle_count'])
+        self.memory_sweeps = state['memory_sweeps']
+        return self.load_agents(dir_path)
+
+    def load_agents(self, dir_path: str) -> bool:
+        """ _summary_ Restore every agent from the agents directory of a snapshot
+
+        Args:
+            dir_path (str): Snapshot directory
+
+        Returns:
+            bool: True if every agent was restored, False otherwise
+        """
+        self.wake(*self.agents.keys())
+        return all([a.load_from_file(path.join(dir_path, AGENTS_SNAPSHOT_DIR, name)) for name, a in self.agents.items()])
+
     def load_initial_memories(self, memories: List[str]) -> None:
         """ _summary_ Load the initial memories for the agents
 
         Args:
             memories (List[str]): List of memories to load
         """
-        [a.load_initial_memories(memories) for a in self.agents.values()]
\ No newline at end of file
+        [a.load_initial_memories(memories) for a in self.agents.values()]
+
+    def stop(self) -> None:
+        """ _summary_ Stop the agent thread pool """
+        clock.unsubscribe(DAY_BOUNDARY, self._on_new_day)
+        if self.tp is not None:
+            self.tp.shutdown(wait=False)
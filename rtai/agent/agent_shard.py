@@ -0,0 +1,346 @@
+'''
+This module contains the ShardedAgentManager class, which spreads the agents of the simulation across worker processes.
+'''
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from multiprocessing.context import SpawnProcess
+from multiprocessing.queues import Queue as ProcessQueue
+from queue import Queue
+from asyncio import get_running_loop
+from os import getpid
+from functools import partial
+from logging import INFO, DEBUG
+from typing import List, Dict, Tuple
+from numpy import uint16, uint64
+
+from rtai.utils.config import Config
+from rtai.utils.datetime import datetime
+from rtai.utils.logging import setup_logging, shutdown_logging, info, debug, error
+from rtai.utils.timer_manager import TimerManager
+from rtai.utils.stats import profiler
+from rtai.core.event import Event
+from rtai.world.clock import clock, DAY_BOUNDARY
+from rtai.world.world import World
+from rtai.agent.abstract_agent import AbstractAgent
+from rtai.agent.behavior.chat import Chat
+from rtai.agent.behavior.chat_message import ChatMessage
+from rtai.agent.agent_manager import AgentManager, NUM_AGENTS_CONFIG, AGENT_STATIC_FILES, DEFAULT_NUM_AGENTS
+from rtai.llm.llm_client import LLMClient
+from rtai.llm.embedding_service import EmbeddingService
+from tests.mock.llm.llm_client_mock import LLMTestClient
+
+SHARDS_CONFIG = "Shards"
+
+# Sections of the root config a shard process needs to rebuild its agents
+AGENTS_SECTION = 'Agents'
+CLOCK_SECTION = 'Clock'
+LLM_CLIENT_SECTION = 'LLMClient'
+EMBEDDINGS_SECTION = 'Embeddings'
+LOGGER_SECTION = 'Logger'
+
+SHARD_CHAT_ID_SHIFT = 40 # chat IDs of shard k start at (k + 1) << 40 so they never collide across shards
+
+CMD_UPDATE = 'update'
+CMD_CHAT_EVENT = 'chat_event'
+CMD_CREATE_CHAT = 'create_chat'
+CMD_NARRATION = 'narration'
+CMD_CHAT_MESSAGES = 'chat_messages'
+CMD_MEMORIES = 'memories'
+CMD_SAVE = 'save'
+CMD_LOAD = 'load'
+CMD_DEBUG = 'debug'
+CMD_PROFILE = 'profile'
+CMD_STOP = 'stop'
+
+@dataclass
+class ShardResult:
+    """ _summary_ Class to hold what a shard sends back after an agent cycle """
+    events: List[Event] = field(default_factory=list) # events the agents sent to the story engine
+    chat_messages: List[Tuple[uint64, ChatMessage]] = field(default_factory=list) # chat messages to pass on to the other shards
+    agent_steps: int = 0
+    skipped_agent_steps: int = 0
+    wakeup: int = None # timestamp the shard's agents are idle until, None if any is busy
+
+def run_shard(shard_id: int, root_cfg: dict, agents_cfg: dict, test_mode: bool, first_agent_id: int, persona_files: List[str], commands: ProcessQueue, results: ProcessQueue,
+              embeddings_model=None) -> None:
+    """ _summary_ Entry point of a shard process - build an Agent Manager for a slice of the agents and serve commands until stopped
+
+    Commands are handled strictly in the order they were sent, so events and narrations sent before an update are seen by that update.
+
+    Args:
+        shard_id (int): index of the shard
+        root_cfg (dict): root config of the simulation
+        agents_cfg (dict): agents config section of the parent's Agent Manager, with any overrides it was given
+        test_mode (bool): whether or not to answer from the LLMTestClient
+        first_agent_id (int): ID of the agent created before the shard's first agent, so agent IDs match a single process run
+        persona_files (List[str]): persona file of each agent of the shard
+        commands (ProcessQueue): queue of commands from the parent
+        results (ProcessQueue): queue of results to the parent
+        embeddings_model (optional): embeddings model to use instead of loading the configured one. Defaults to None.
+    """
+    cfg = Config(root_cfg)
+    if cfg.contains(LOGGER_SECTION):
+        log_cfg = cfg.expand(LOGGER_SECTION)
+        transcript_log_name = log_cfg.get_value('TranscriptLogName', '')
+        setup_logging(log_cfg.get_value('LogDirectory', 'logs'), '%s_shard%d' % (log_cfg.get_value('LogName', 'rtai'), shard_id),
+                      INFO if log_cfg.get_value('Level', 'INFO') == 'INFO' else DEBUG, '%s_shard%d' % (transcript_log_name, shard_id) if transcript_log_name else '',
+                      log_cfg.get_value('UseCalleeStack', 'False') == 'True', log_cfg.get_value('PipeToStdout', 'False') == 'True',
+                      log_cfg.get_value('StructuredTranscript', 'False') == 'True')
+
+    clock(cfg.expand(CLOCK_SECTION))
+    client: LLMClient = LLMTestClient() if test_mode else LLMClient()
+    embedding_service = EmbeddingService()
+    if not client.initialize(cfg.expand(LLM_CLIENT_SECTION)) or not embedding_service.initialize(cfg.expand(EMBEDDINGS_SECTION), embeddings_model):
+        error("Shard [%d] failed to initialize its LLMClient or EmbeddingService" % shard_id)
+        results.put(None)
+        shutdown_logging()
+        return
+
+    AbstractAgent.id = uint16(first_agent_id)
+    Chat.seq_num = uint64((shard_id + 1) << SHARD_CHAT_ID_SHIFT)
+
+    agents_cfg = dict(agents_cfg)
+    agents_cfg.update({NUM_AGENTS_CONFIG: len(persona_files), AGENT_STATIC_FILES: persona_files, SHARDS_CONFIG: 0})
+    agent_mgr = AgentManager(Queue(), Config(agents_cfg, AGENTS_SECTION), client, None, embedding_service)
+    agent_mgr.chat_mgr.written = []
+    agent_mgr.initialize()
+    info("Shard [%d] (pid %d) owns agents %s" % (shard_id, getpid(), agent_mgr.get_agent_names()))
+    results.put(agent_mgr.get_agent_names())
+
+    static_client: LLMClient = None
+    while True:
+        cmd, args = commands.get()
+        if cmd == CMD_UPDATE:
+            clock_state, first_day, new_day, static_init = args
+            clock.set_state(clock_state)
+            if static_init and static_client is None:
+                static_client = LLMTestClient()
+            steps, skipped = agent_mgr.agent_steps, agent_mgr.skipped_agent_steps
+            agent_mgr.update(first_day=first_day, new_day=new_day, test_llm_client=static_client if static_init else None)
+
+            result = ShardResult(chat_messages=agent_mgr.chat_mgr.take_written(), agent_steps=agent_mgr.agent_steps - steps, skipped_agent_steps=agent_mgr.skipped_agent_steps - skipped)
+            while not agent_mgr.queue.empty():
+                result.events.append(agent_mgr.queue.get(block=False))
+            wakeup = agent_mgr.next_wakeup()
+            result.wakeup = wakeup.timestamp() if wakeup is not None else None
+            results.put(result)
+        elif cmd == CMD_CHAT_EVENT:
+            agent_mgr.dispatch_chat_event(args)
+        elif cmd == CMD_CREATE_CHAT:
+            agent_mgr.chat_mgr.create_chat(args)
+        elif cmd == CMD_NARRATION:
+            agent_mgr.dispatch_narration(args)
+        elif cmd == CMD_CHAT_MESSAGES:
+            agent_mgr.chat_mgr.receive(args)
+        elif cmd == CMD_MEMORIES:
+            agent_mgr.load_initial_memories(args)
+        elif cmd == CMD_SAVE:
+            agent_mgr.save_agents(args)
+            results.put(True)
+        elif cmd == CMD_LOAD:
+            results.put(agent_mgr.load_agents(args))
+        elif cmd == CMD_DEBUG:
+            agent_mgr.debug_timer()
+        elif cmd == CMD_PROFILE:
+            results.put(profiler.get_stats())
+        elif cmd == CMD_STOP:
+            agent_mgr.stop()
+            # the process ends with os._exit, which skips the exit handlers flushing the log
+            shutdown_logging()
+            return
+
+class ShardedAgentManager(AgentManager):
+    """ _summary_ Class to manage agents spread across worker processes, so their non-LLM work is not serialized by the GIL
+
+    Every shard process owns a contiguous slice of the agents along with their memories and indexes, and runs a regular
+    Agent Manager over them. The parent only routes messages over multiprocessing queues:
+        - each cycle the world clock is sent to every shard, which update their agents in parallel
+        - events the agents send to the story engine come back with the cycle results, in shard order
+        - chat requests are sent to the shard of the receiving agent, narrations to every shard
+        - chat messages written in a shard are passed on to the other shards before the next cycle
+
+    Agents can not be interrogated or whispered to, since they do not live in the parent process.
+    """
+
+    def __init__(self, event_queue: Queue, cfg: Config, root_cfg: Config, client: LLMClient, world: World, embedding_service: EmbeddingService=None, shard_embeddings_model=None):
+        """ _summary_ Constructor for the Sharded Agent Manager
+
+        Args:
+            event_queue (Queue): Event queue of the story engine
+            cfg (Config): Agents config section
+            root_cfg (Config): Root config, sent to the shard processes to rebuild their clock, LLM client and embeddings
+            client (LLMClient): LLM Client of the parent, only used to decide whether the shards run in test mode
+            world (World): World object for the Agent Manager
+            embedding_service (EmbeddingService, optional): Embeddings model of the parent. Defaults to the process-wide EmbeddingService.
+            shard_embeddings_model (optional): picklable embeddings model sent to every shard instead of loading the configured one (e.g. a test model). Defaults to None.
+        """
+        super().__init__(event_queue, cfg, client, world, embedding_service)
+        self.root_cfg: Config = root_cfg
+        self.shard_embeddings_model = shard_embeddings_model
+        self.num_shards: int = int(cfg.get_value(SHARDS_CONFIG, "0"))
+        self.processes: List[SpawnProcess] = []
+        self.commands: List[ProcessQueue] = []
+        self.results: List[ProcessQueue] = []
+        self.agent_shards: Dict[str, int] = dict()
+        self.wakeups: List[int] = []
+        self.dirty: bool = True # whether events were routed to the shards since their last cycle
+
+    def initialize(self) -> bool:
+        """ _summary_ Start the shard processes and wait for them to create their agents
+
+        Returns:
+            bool: True if every shard created its agents, False otherwise
+        """
+        num_agents = int(self.cfg.get_value(NUM_AGENTS_CONFIG, DEFAULT_NUM_AGENTS))
+        persona_files = self.get_persona_files(num_agents)
+        num_shards = max(1, min(self.num_shards, num_agents))
+        bounds = [num_agents * k // num_shards for k in range(num_shards + 1)]
+        first_agent_id = int(AbstractAgent.id)
+
+        ctx = get_context('spawn') # forking would copy the parent's threads and model handles
+        for k in range(num_shards):
+            self.commands.append(ctx.Queue())
+            self.results.append(ctx.Queue())
+            p = ctx.Process(target=run_shard, name='AgentShard-%d' % k, daemon=True,
+                            args=(k, self.root_cfg.getDict(), self.cfg.getDict(), isinstance(self.client, LLMTestClient), first_agent_id + bounds[k],
+                                  persona_files[bounds[k]:bounds[k + 1]], self.commands[k], self.results[k], self.shard_embeddings_model))
+            p.start()
+            self.processes.append(p)
+
+        for k in range(num_shards):
+            names = self.results[k].get()
+            if names is None:
+                error("Shard [%d] failed to start" % k)
+                return False
+            for name in names:
+                if name in self.registry:
+                    error("Unable to register agent [%s] of shard [%d]. Name likely already taken" % (name, k))
+                    continue
+                self.registry.add(name)
+                self.agent_shards[name] = k
+
+        # keep IDs handed out in the parent after the agents in line with a single process run
+        AbstractAgent.id = uint16(first_agent_id + num_agents)
+
+        if len(self.agent_shards) != num_agents:
+            error("There was an error initializing some agents.")
+
+        info("Initialized Sharded Agent Manager with [%d] agents across [%d] processes" % (len(self.agent_shards), num_shards))
+        return True
+
+    def _send(self, shard: int, cmd: str, args=None) -> None:
+        self.commands[shard].put((cmd, args))
+
+    def _broadcast(self, cmd: str, args=None) -> None:
+        [self._send(k, cmd, args) for k in range(len(self.commands))]
+
+    @TimerManager.timer_callback
+    def update(self, first_day: bool=False, new_day: bool=False, test_llm_client: LLMTestClient=None) -> None:
+        """ _summary_ Run an agent cycle in every shard in parallel, then route the results
+
+        Args:
+            first_day (bool, optional): Whether or not it is the first day. Defaults to False.
+            new_day (bool, optional): Whether or not it is a new day. Defaults to False.
+            test_llm_client (LLMTestClient, optional): Whether the shards should use a test LLM Client for this cycle. Defaults to None.
+        """
+        self._broadcast(CMD_UPDATE, (clock.get_state(), first_day, new_day, test_llm_client is not None))
+        results: List[ShardResult] = [r.get() for r in self.results]
+        self.dirty = False
+
+        for k, result in enumerate(results):
+            [self.queue.put(e) for e in result.events]
+            self.agent_steps += result.agent_steps
+            self.skipped_agent_steps += result.skipped_agent_steps
+
+            # chat messages are only appended to chats the other shards know about
+            others = [m for j, r in enumerate(results) if j != k for m in r.chat_messages]
+            if len(others) > 0:
+                self._send(k, CMD_CHAT_MESSAGES, sorted(others, key=lambda m: m[1].get_sender_id()))
+                self.dirty = True
+
+        self.wakeups = [r.wakeup for r in results]
+        self.cycle_count += 1
+
+    async def update_async(self, first_day: bool=False, new_day: bool=False) -> None:
+        """ _summary_ Run an agent cycle in every shard from an asyncio loop, waiting for the shards on an executor """
+        await get_running_loop().run_in_executor(None, partial(self.update, first_day=first_day, new_day=new_day))
+
+    def next_wakeup(self) -> datetime:
+        """ _summary_ Get the world time at which the next agent has something to do, if every agent of every shard is idle
+
+        Returns:
+            datetime: earliest wakeup reported by the shards, or None if any agent is busy or events were routed since
+        """
+        if self.dirty or len(self.wakeups) == 0 or any(w is None for w in self.wakeups):
+            return None
+        wakeup = datetime.fromtimestamp(min(self.wakeups))
+        return wakeup if clock.peek() < wakeup else None
+
+    def dispatch_chat_event(self, event: Event) -> None:
+        """ _summary_ Route a chat event to the shard of the receiving agent
+
+        Dispatching a chat request (re)creates the chat, so the other shards recreate their copy of it too,
+        as they would share the registry of a single Agent Manager.
+
+        Args:
+            event (Event): Chat event to dispatch
+        """
+        shard = self.agent_shards.get(event.get_receiver())
+        if shard is not None:
+            self.dirty = True
+            # the queue pickles the event on its feeder thread after this returns, so it must never go back to the pool
+            self._send(shard, CMD_CHAT_EVENT, event.retain())
+            [self._send(k, CMD_CREATE_CHAT, event.get_message()) for k in range(len(self.commands)) if k != shard]
+
+    def dispatch_narration(self, event: Event) -> None:
+        """ _summary_ Dispatch a narration event to every shard
+
+        Args:
+            event (Event): Narration event to dispatch
+        """
+        event.retain()
+        self.last_narration.release()
+        self.last_narration = event
+        self.dirty = True
+        self._broadcast(CMD_NARRATION, event)
+
+    def load_initial_memories(self, memories: List[str]) -> None:
+        self._broadcast(CMD_MEMORIES, memories)
+
+    def debug_timer(self) -> None:
+        self._broadcast(CMD_DEBUG)
+        debug("[DEBUG_TIMER - AgentManager] Agent steps: %s" % self.get_schedule_stats())
+
+    def get_agent_names(self) -> List[str]:
+        return list(self.agent_shards.keys())
+
+    def get_profile(self) -> Dict[str, Dict[str, dict]]:
+        """ _summary_ Get the latency profile of this process merged with the profile of every shard - timers must be paused or stopped
+
+        Agents are profiled in their shard. Shared scopes such as 'llm' are profiled per process, so the ones of a shard are suffixed with it.
+
+        Returns:
+            Dict[str, Dict[str, dict]]: summary of the profiled sections keyed by scope then section name
+        """
+        stats = profiler.get_stats()
+        self._broadcast(CMD_PROFILE)
+        for k, r in enumerate(self.results):
+            for scope, sections in r.get().items():
+                stats[scope if scope in self.agent_shards else '%s/shard%d' % (scope, k)] = sections
+        return stats
+
+    def save_agents(self, dir_path: str) -> None:
+        self._broadcast(CMD_SAVE, dir_path)
+        [r.get() for r in self.results]
+
+    def load_agents(self, dir_path: str) -> bool:
+        self.dirty = True
+        self._broadcast(CMD_LOAD, dir_path)
+        return all([r.get() for r in self.results])
+
+    def stop(self) -> None:
+        """ _summary_ Stop the shard processes """
+        clock.unsubscribe(DAY_BOUNDARY, self._on_new_day)
+        self._broadcast(CMD_STOP)
+        [p.join() for p in self.processes]
+        info("Joined [%d] agent shards" % len(self.processes))
@@ -1,3 +1,5 @@
+from typing import Any, Dict
+
 from rtai.utils.datetime import datetime, timedelta
 from rtai.world.clock import clock
 from rtai.utils.logging import debug
@@ -42,8 +44,6 @@ class Action(AbstractBehavior):
         Returns:
             datetime: End time of the action.
         """
-        if start_time._data.second != 0:
-            start_time.replace_time(seconds=0)
         return (start_time + duration)
     
     def has_completed(self) -> bool:
@@ -58,4 +58,35 @@ class Action(AbstractBehavior):
     def mark_completed(self) -> None:
         """_summary_ Mark the action as completed and calculate the action duration."""
         self.completion_time = datetime.now()
-        self.action_duration = self.completion_time.calc_timedelta_diff(self.start_time)
\ No newline at end of file
+        self.action_duration = self.completion_time.calc_timedelta_diff(self.start_time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """_summary_ Serialize the planned action to a JSON friendly dictionary.
+
+        Returns:
+            Dict[str, Any]: action with times as epoch seconds and durations as seconds.
+        """
+        return {
+            'description': self.description,
+            'address': self.address,
+            'start_time': self.start_time.timestamp() if self.start_time else None,
+            'end_time': self.end_time.timestamp() if self.end_time else None,
+            'duration': self.plan_duration.total_seconds() if self.plan_duration is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Action':
+        """_summary_ Deserialize an action serialized with to_dict().
+
+        Args:
+            data (Dict[str, Any]): serialized action.
+        Returns:
+            Action: An action object.
+        """
+        return cls(
+            description=data['description'],
+            address=data['address'],
+            start_time=datetime.fromtimestamp(data['start_time']) if data['start_time'] is not None else None,
+            duration=timedelta(seconds=data['duration']) if data['duration'] is not None else None,
+            end_time=datetime.fromtimestamp(data['end_time']) if data['end_time'] is not None else None,
+        )
@@ -1,5 +1,6 @@
 from numpy import uint64, uint16
-from typing import Set, List
+from typing import Set, List, Tuple
+from threading import Lock
 
 from rtai.utils.datetime import datetime, timedelta
 from rtai.agent.behavior.action import Action
@@ -8,6 +9,7 @@ class Chat(Action):
     """_summary_ Class to represent a chat behavior."""
 
     seq_num: uint64 = uint64(0)
+    _seq_lock: Lock = Lock() # chats are created by agents acting in parallel
 
     def __init__(self, description: str, creator_id: uint16, address: str, start_time: datetime, duration: timedelta, end_time: datetime=None):
         """_summary_ Constructor for a chat object, representing a conversation between agents.
@@ -27,8 +29,9 @@ class Chat(Action):
         self.alive: bool = False
         self.finished_conversation: List[str] = []
 
-        self.seq_num = Chat.seq_num
-        Chat.seq_num += 1
+        with Chat._seq_lock:
+            self.seq_num = Chat.seq_num
+            Chat.seq_num += 1
 
     def __str__(self) -> str:
         return f"Chat [{self.description}]" if len(self.finished_conversation) == 0 else f"Chat [{self.description}] [{self.finished_conversation}]"
@@ -57,6 +60,17 @@ class Chat(Action):
         """
         return self.seq_num
     
+    def get_priority(self) -> Tuple[int, int]:
+        """_summary_ Get the priority of the chat when two chats conflict - lower wins.
+
+        Unlike the ID, which depends on which agent thread created its chat first, the priority only depends on
+        the simulation: the earliest start time wins, then the lowest creator ID.
+
+        Returns:
+            Tuple[int, int]: start timestamp and creator ID of the chat.
+        """
+        return (self.start_time.timestamp(), int(self.creator_id))
+
     def get_creator_id(self) -> uint16:
         """_summary_ Get the ID of the creator agent.
 
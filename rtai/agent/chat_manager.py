@@ -1,5 +1,7 @@
 from numpy import uint64
-from typing import List, Dict, TypeAlias
+from typing import List, Dict, Tuple, TypeAlias
+from threading import RLock
+from contextlib import contextmanager
 
 from rtai.agent.behavior.chat_message import ChatMessage
 from rtai.agent.behavior.chat import Chat
@@ -8,10 +10,18 @@ ChatHistory: TypeAlias = List[ChatMessage]
 ChatRegistry: TypeAlias = Dict[uint64, ChatHistory]
 
 class ChatManager:
-    """ _summary_ Class to manage all the different chats between agents"""
+    """ _summary_ Class to manage all the different chats between agents
+
+    Agents act in parallel, so every access to the registry holds a lock. While writes are deferred (see defer_writes),
+    new messages are held back and only appended once the phase ends, so every agent reads the chats as they were
+    at the start of the phase, whatever order the agents ran in.
+    """
     def __init__(self):
         """ _summary_ Constructor for the Chat Manager. """
         self.chat_registry: ChatRegistry = dict()
+        self.lock: RLock = RLock()
+        self.outbox: List[Tuple[uint64, ChatMessage]] = None # messages written while writes are deferred
+        self.written: List[Tuple[uint64, ChatMessage]] = None # messages to share with other shards, only recorded when sharded
 
     def write_to_chat(self, chat: Chat, message: ChatMessage) -> None:
         """ _summary_ Write a message to a chat
@@ -20,7 +30,54 @@ class ChatManager:
             chat (Chat): Chat to write to
             message (ChatMessage): Message to write
         """
-        self.chat_registry[chat.get_id()].append(message)
+        with self.lock:
+            if self.outbox is not None:
+                self.outbox.append((chat.get_id(), message))
+                return
+            self.chat_registry[chat.get_id()].append(message)
+            if self.written is not None:
+                self.written.append((chat.get_id(), message))
+
+    @contextmanager
+    def defer_writes(self):
+        """ _summary_ Hold back messages written to chats until the end of the block
+
+        Held back messages are then appended ordered by sender ID, so the chat histories come out the same for any thread interleaving.
+        Messages to chats deleted in the meantime are dropped.
+        """
+        with self.lock:
+            self.outbox = []
+        try:
+            yield
+        finally:
+            with self.lock:
+                outbox, self.outbox = self.outbox, None
+                for chat_id, message in sorted(outbox, key=lambda m: m[1].get_sender_id()):
+                    if chat_id in self.chat_registry:
+                        self.chat_registry[chat_id].append(message)
+                        if self.written is not None:
+                            self.written.append((chat_id, message))
+
+    def take_written(self) -> List[Tuple[uint64, ChatMessage]]:
+        """ _summary_ Take the messages written since the last call, to pass them on to other shards
+
+        Returns:
+            List[Tuple[uint64, ChatMessage]]: chat IDs and messages, in the order they were appended
+        """
+        with self.lock:
+            written, self.written = self.written, []
+        return written if written is not None else []
+
+    def receive(self, messages: List[Tuple[uint64, ChatMessage]]) -> None:
+        """ _summary_ Append messages written by another shard to the chats this shard knows about
+
+        Args:
+            messages (List[Tuple[uint64, ChatMessage]]): chat IDs and messages
+        """
+        with self.lock:
+            for chat_id, message in messages:
+                if chat_id in self.chat_registry:
+                    self.chat_registry[chat_id].append(message)
 
     def get_chat_history(self, chat: Chat) -> ChatHistory:
         """ _summary_ Get the history of a chat
@@ -30,7 +87,8 @@ class ChatManager:
         Returns:
             ChatHistory: History of chat
         """
-        return self.chat_registry[chat.get_id()]
+        with self.lock:
+            return self.chat_registry[chat.get_id()]
     
     def create_chat(self, chat: Chat) -> None:
         """ _summary_ Create a new chat
@@ -38,7 +96,8 @@ class ChatManager:
         Args:
             chat (Chat): Chat to create
         """
-        self.chat_registry[chat.get_id()] = []
+        with self.lock:
+            self.chat_registry[chat.get_id()] = []
 
     def delete_chat(self, chat: Chat) -> None:
         """ _summary_ Delete a chat
@@ -46,4 +105,5 @@ class ChatManager:
         Args:
             chat (Chat): Chat to delete
         """
-        del self.chat_registry[chat.get_id()]
\ No newline at end of file
+        with self.lock:
+            del self.chat_registry[chat.get_id()]
\ No newline at end of file
@@ -21,7 +21,6 @@ class Cognition:
         - perceive -> retrieve -> observe -> think -> plan -> act -> reflect
     
     """
-    counter: int = 0 # TODO delete
 
     def __init__(self, agent: 'Agent'):
         """_summary_ Constructor for Cognition class.
@@ -159,7 +158,7 @@ class Cognition:
             else:
                 self.agent.l_mem.add_concept(completed_action, EventType.ActionEvent)
 
-        log_transcript(self.agent.get_name(), action_start_str, 'Action', action_desc)
+        log_transcript(self.agent.get_name(), action_start_str, 'Action', action_desc, event_time=action_start)
         
         # Increment index to next action
         self.agent.s_mem.current_action = new_action
@@ -222,16 +221,14 @@ class Cognition:
         
         if len(history) == 0 and self.agent.s_mem.current_chat.get_creator_id() == self.agent.get_id():
             # Generate first chat of conversation
-            new_msg = ChatMessage(sender_id=self.agent.get_id(), sender_name=self.agent.get_name(), message='Chat[%s][%s]' % (self.agent.get_name(), Cognition.counter))
-            history.append(new_msg)
-            Cognition.counter += 1
+            new_msg = ChatMessage(sender_id=self.agent.get_id(), sender_name=self.agent.get_name(), message='Chat[%s][%s]' % (self.agent.get_name(), len(history)))
+            self.agent.agent_mgr.chat_mgr.write_to_chat(self.agent.s_mem.current_chat, new_msg)
             self.agent.s_mem.current_chat.set_alive(True)
             log_transcript(self.agent.get_name(), clock.get_time_str(), 'Chat', new_msg)
         elif len(history) > 0 and history[-1].sender_id != self.agent.get_id():
             # your turn to generate chat
-            new_msg = ChatMessage(sender_id=self.agent.get_id(), sender_name=self.agent.get_name(), message='Chat[%s][%s]' % (self.agent.get_name(), Cognition.counter))
-            history.append(new_msg)
-            Cognition.counter += 1
+            new_msg = ChatMessage(sender_id=self.agent.get_id(), sender_name=self.agent.get_name(), message='Chat[%s][%s]' % (self.agent.get_name(), len(history)))
+            self.agent.agent_mgr.chat_mgr.write_to_chat(self.agent.s_mem.current_chat, new_msg)
             log_transcript(self.agent.get_name(), clock.get_time_str(), 'Chat', new_msg)
         else:
             # wait for other person to generate chat
@@ -42,20 +42,12 @@ class ConceptNode:
     @property
     def last_accessed(self):
         return self._last_accessed
-    
-    # @property
-    # def content(self):
-    #     return self.content
-    
-    def __getattribute__(self, name: str) -> Any:
-        # Check if the attribute being accessed is 'last_accessed'
-        if name == 'last_accessed':
-            return object.__getattribute__(self, '_last_accessed')
-        
-        # Update _last_accessed when any attribute (except last_accessed) is accessed
-        object.__setattr__(self, '_last_accessed', datetime.now())
-        return object.__getattribute__(self, name)
-    
+
+    def touch(self) -> None:
+        """_summary_ Mark the agent concept as accessed. Reading attributes never does this implicitly.
+        """
+        self._last_accessed = datetime.now()
+
     def __str__(self) -> None:
         return self.content # todo print out a nice string rep?
 
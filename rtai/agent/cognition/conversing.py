@@ -35,8 +35,8 @@ class Conversing:
     
         if len(self.agent.s_mem.chatting_with) > 0:
             if self.agent.s_mem.chatting_with == event.get_sender():
-                # If already chatting with requester, then chose which chat to use based on lowest seq num
-                if self.agent.s_mem.current_chat.get_id() > event.get_message().get_id():
+                # If already chatting with requester, then chose which chat to use based on priority, so both agents pick the same one
+                if self.agent.s_mem.current_chat.get_priority() > event.get_message().get_priority():
                     # Accept received chat, discard owned chat
                     self.agent.agent_mgr.chat_mgr.delete_chat(self.agent.s_mem.current_chat)
                     self.initiate_chat(event.get_message(), event.get_sender())
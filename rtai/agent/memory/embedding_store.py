@@ -0,0 +1,312 @@
+import faiss
+from dataclasses import dataclass
+from os import path
+from time import perf_counter
+from typing import List, Tuple
+from numpy import ndarray, float32, int64, ascontiguousarray, empty, ones, resize, arange, asarray, flatnonzero, unique, save, load, savez
+
+from rtai.utils.config import Config
+from rtai.utils.logging import info, warn
+from rtai.utils.stats import LatencyStats, profiler
+
+EMBEDDINGS_DIM = 768
+INITIAL_CAPACITY = 1024
+
+INDEX_FLAT = 'Flat'
+INDEX_HNSW = 'HNSW'
+INDEX_IVFPQ = 'IVFPQ'
+INDEX_TYPES = (INDEX_FLAT, INDEX_HNSW, INDEX_IVFPQ)
+
+EMBEDDINGS_FILE = 'embeddings.npy'
+INDEX_FILE = 'index.faiss'
+STATE_FILE = 'embedding_store.npz'
+
+MIN_POINTS_PER_CENTROID = 39 # below this faiss k-means training is unreliable
+
+@dataclass
+class IndexConfig:
+    """ _summary_ Class to hold the configuration of an embedding index
+
+    Every index starts out flat (exact search). Once it holds promote_threshold embeddings it is rebuilt
+    as the configured approximate index from the raw embedding matrix.
+    """
+    index_type: str = INDEX_FLAT
+    promote_threshold: int = 10000
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 40
+    hnsw_ef_search: int = 128
+    ivf_nlist: int = 1024
+    ivf_nprobe: int = 16
+    pq_m: int = 64
+    pq_bits: int = 8
+
+    @classmethod
+    def from_config(cls, cfg: Config) -> 'IndexConfig':
+        """ _summary_ Factory method to generate an IndexConfig from a config section
+
+        Args:
+            cfg (Config): index config section
+
+        Returns:
+            IndexConfig: index configuration, with defaults for missing keys
+        """
+        default = cls()
+        index_type = cfg.get_value('Type', default.index_type)
+        if index_type not in INDEX_TYPES:
+            warn("Unknown embedding index type [%s], expected one of %s. Falling back to [%s]" % (index_type, INDEX_TYPES, INDEX_FLAT))
+            index_type = INDEX_FLAT
+
+        return cls(
+            index_type=index_type,
+            promote_threshold=int(cfg.get_value('PromoteThreshold', str(default.promote_threshold))),
+            hnsw_m=int(cfg.get_value('HNSWM', str(default.hnsw_m))),
+            hnsw_ef_construction=int(cfg.get_value('HNSWEfConstruction', str(default.hnsw_ef_construction))),
+            hnsw_ef_search=int(cfg.get_value('HNSWEfSearch', str(default.hnsw_ef_search))),
+            ivf_nlist=int(cfg.get_value('IVFNList', str(default.ivf_nlist))),
+            ivf_nprobe=int(cfg.get_value('IVFNProbe', str(default.ivf_nprobe))),
+            pq_m=int(cfg.get_value('PQM', str(default.pq_m))),
+            pq_bits=int(cfg.get_value('PQBits', str(default.pq_bits))),
+        )
+
+def build_index(embeddings: ndarray, dim: int, cfg: IndexConfig, ids: ndarray=None) -> faiss.Index:
+    """ _summary_ Build the configured index over a set of normalized embeddings
+
+    Args:
+        embeddings (ndarray): normalized embeddings of shape (n, dim)
+        dim (int): dimension of the embeddings
+        cfg (IndexConfig): index configuration
+        ids (ndarray, optional): ids of the embeddings. Defaults to their positions.
+
+    Returns:
+        faiss.Index: ID-mapped inner product index holding every embedding
+    """
+    if cfg.index_type == INDEX_HNSW:
+        index = faiss.IndexHNSWFlat(dim, cfg.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = cfg.hnsw_ef_construction
+        index.hnsw.efSearch = cfg.hnsw_ef_search
+    elif cfg.index_type == INDEX_IVFPQ:
+        # keep enough training points per list, and a sub-quantizer count that divides the dimension
+        nlist = max(1, min(cfg.ivf_nlist, len(embeddings) // MIN_POINTS_PER_CENTROID))
+        pq_m = cfg.pq_m if dim % cfg.pq_m == 0 else 1
+        if pq_m != cfg.pq_m:
+            warn("PQM [%d] does not divide embeddings dim [%d], using [%d]" % (cfg.pq_m, dim, pq_m))
+        index = faiss.IndexIVFPQ(faiss.IndexFlatIP(dim), dim, nlist, pq_m, cfg.pq_bits, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+        index.nprobe = min(cfg.ivf_nprobe, nlist)
+    else:
+        index = faiss.IndexFlatIP(dim)
+
+    # ids stay stable across removals, so they can address rows of the memory table
+    index = faiss.IndexIDMap(index)
+    if len(embeddings) > 0:
+        index.add_with_ids(embeddings, arange(len(embeddings), dtype=int64) if ids is None else asarray(ids, dtype=int64))
+    return index
+
+class EmbeddingStore:
+    """ _summary_ Class to hold the embedding index of a memory and grow it incrementally.
+
+    Only the newly inserted content is encoded on every insert, and appended to the existing faiss index,
+    so insertion cost stays flat as the memory grows.
+    Embeddings are L2 normalized and searched by inner product, so search scores are cosine similarities (higher is better).
+    The raw embedding matrix is kept alongside the index so it can be rebuilt as an approximate index without re-encoding.
+    Every embedding gets a stable id (its insertion position) so removals never shift the ids of other embeddings.
+    """
+
+    def __init__(self, embeddings_model, dim: int=EMBEDDINGS_DIM, index_config: IndexConfig=None, name: str='embeddings'):
+        """ _summary_ Constructor for the EmbeddingStore
+
+        Args:
+            embeddings_model: model exposing encode(List[str]) -> ndarray
+            dim (int, optional): dimension of the embeddings. Defaults to EMBEDDINGS_DIM.
+            index_config (IndexConfig, optional): index configuration. Defaults to a flat index.
+            name (str, optional): owner of the store (e.g. the agent name), used as the profiler scope of its encodes and searches. Defaults to 'embeddings'.
+        """
+        self.name: str = name
+        self.embeddings_model = embeddings_model
+        self.dim: int = dim
+        self.index_config: IndexConfig = index_config if index_config is not None else IndexConfig()
+        self.index: faiss.Index = build_index(empty((0, dim), dtype=float32), dim, IndexConfig())
+        self.promoted: bool = False
+        self.size: int = 0 # number of ids handed out, including removed embeddings
+        self.embeddings: ndarray = empty((INITIAL_CAPACITY, dim), dtype=float32)
+        self.alive: ndarray = ones(INITIAL_CAPACITY, dtype=bool)
+        self.insert_latency: LatencyStats = LatencyStats()
+
+    @property
+    def promote_threshold(self) -> int:
+        """ _summary_ Number of embeddings at which the flat index is rebuilt as the configured index """
+        cfg = self.index_config
+        if cfg.index_type == INDEX_IVFPQ:
+            # product quantizer training needs at least one point per centroid
+            return max(cfg.promote_threshold, 1 << cfg.pq_bits)
+        return cfg.promote_threshold
+
+    def encode(self, sentences: List[str]) -> ndarray:
+        """ _summary_ Encode sentences into normalized embeddings
+
+        Args:
+            sentences (List[str]): sentences to encode
+
+        Returns:
+            ndarray: normalized embeddings of shape (len(sentences), dim)
+        """
+        with profiler.measure(self.name, 'encode'):
+            embeddings = ascontiguousarray(self.embeddings_model.encode(sentences), dtype=float32)
+            faiss.normalize_L2(embeddings)
+        return embeddings
+
+    def get_embeddings(self) -> ndarray:
+        """ _summary_ Get the raw embedding matrix, indexed by id
+
+        Returns:
+            ndarray: normalized embeddings of shape (size, dim), including removed embeddings
+        """
+        return self.embeddings[:self.size]
+
+    def get_alive_ids(self) -> ndarray:
+        """ _summary_ Get the ids of the embeddings still held by the index
+
+        Returns:
+            ndarray: ids of the live embeddings
+        """
+        return flatnonzero(self.alive[:self.size])
+
+    def _append(self, embeddings: ndarray, normalize: bool=False) -> None:
+        """ _summary_ Append embeddings to the raw matrix and the index, promoting the index when it crosses the threshold
+
+        Args:
+            embeddings (ndarray): embeddings of shape (n, dim)
+            normalize (bool, optional): L2 normalize the embeddings in the raw matrix, leaving the input untouched. Defaults to False (already normalized).
+        """
+        size, n = self.size, len(embeddings)
+        if size + n > len(self.embeddings):
+            capacity = max(size + n, 2 * len(self.embeddings))
+            self.embeddings = resize(self.embeddings, (capacity, self.dim))
+            self.alive = resize(self.alive, capacity)
+        self.embeddings[size:size + n] = embeddings
+        self.alive[size:size + n] = True
+        if normalize:
+            faiss.normalize_L2(self.embeddings[size:size + n])
+        self.size += n
+
+        if not self.promoted and self.index_config.index_type != INDEX_FLAT and self.index.ntotal + n >= self.promote_threshold:
+            # built straight from the raw matrix, so a bulk load crossing the threshold is never added to the flat index first
+            self._promote()
+        else:
+            self.index.add_with_ids(self.embeddings[size:size + n], arange(size, size + n, dtype=int64))
+
+    def _promote(self) -> None:
+        """ _summary_ Rebuild the flat index as the configured approximate index """
+        start_time = perf_counter()
+        ids = self.get_alive_ids()
+        self.index = build_index(self.embeddings[ids], self.dim, self.index_config, ids)
+        self.promoted = True
+        info("Promoted embedding index to [%s] at [%d] embeddings in [%s] ms" % (self.index_config.index_type, self.index.ntotal, (perf_counter() - start_time) * 1000))
+
+    def remove(self, ids: ndarray) -> int:
+        """ _summary_ Remove embeddings from the index. Ids of the remaining embeddings are unchanged.
+
+        Args:
+            ids (ndarray): ids of the embeddings to remove
+
+        Returns:
+            int: number of embeddings removed
+        """
+        ids = unique(asarray(ids, dtype=int64))
+        ids = ids[self.alive[ids]]
+        if len(ids) == 0:
+            return 0
+        self.alive[ids] = False
+
+        if self.promoted and self.index_config.index_type == INDEX_HNSW:
+            # HNSW graphs do not support removal, rebuild from the remaining raw embeddings instead
+            alive = self.get_alive_ids()
+            self.index = build_index(self.embeddings[alive], self.dim, self.index_config, alive)
+        else:
+            self.index.remove_ids(ids)
+        return len(ids)
+
+    def add(self, content: str) -> int:
+        """ _summary_ Encode a single piece of content and append it to the index
+
+        Args:
+            content (str): content to embed
+
+        Returns:
+            int: id of the content in the index
+        """
+        start_time = perf_counter()
+
+        self._append(self.encode([content]))
+
+        self.insert_latency.record((perf_counter() - start_time) * 1000)
+        return self.size - 1
+
+    def extend(self, embeddings: ndarray) -> ndarray:
+        """ _summary_ Append precomputed embeddings to the index without encoding, e.g. to bulk load a memory
+
+        Args:
+            embeddings (ndarray): embeddings of shape (n, dim), normalized on insert
+
+        Returns:
+            ndarray: ids of the embeddings in the index
+        """
+        start = self.size
+        with profiler.measure(self.name, 'bulk_insert'):
+            self._append(embeddings, normalize=True)
+        return arange(start, self.size, dtype=int64)
+
+    def rebuild(self, contents: List[str]) -> None:
+        """ _summary_ Re-encode all contents and rebuild the index from scratch
+
+        Args:
+            contents (List[str]): contents to embed, in id order
+        """
+        self.index = build_index(empty((0, self.dim), dtype=float32), self.dim, IndexConfig())
+        self.promoted = False
+        self.size = 0
+        if len(contents) > 0:
+            self._append(self.encode(contents))
+
+    def search(self, query: str, k: int) -> Tuple[ndarray, ndarray]:
+        """ _summary_ Search the index for the k most similar embeddings to the query
+
+        Args:
+            query (str): query to search for
+            k (int): number of results to return
+
+        Returns:
+            Tuple[ndarray, ndarray]: cosine similarities and indices of the top k results
+        """
+        query_embedding = self.encode([query])
+        with profiler.measure(self.name, 'search'):
+            return self.index.search(query_embedding, k)
+
+    def save(self, dir_path: str) -> None:
+        """ _summary_ Save the raw embedding matrix, the serialized index and the id state to a directory
+
+        Args:
+            dir_path (str): directory to save to
+        """
+        save(path.join(dir_path, EMBEDDINGS_FILE), self.get_embeddings())
+        faiss.write_index(self.index, path.join(dir_path, INDEX_FILE))
+        savez(path.join(dir_path, STATE_FILE), alive=self.alive[:self.size], promoted=self.promoted)
+
+    def load(self, dir_path: str) -> None:
+        """ _summary_ Restore a store saved with save(), without re-encoding anything
+
+        The raw embedding matrix is memory mapped copy-on-write, so it is only paged in when the index is rebuilt.
+
+        Args:
+            dir_path (str): directory to load from
+        """
+        self.embeddings = load(path.join(dir_path, EMBEDDINGS_FILE), mmap_mode='c')
+        self.size = len(self.embeddings)
+        self.index = faiss.read_index(path.join(dir_path, INDEX_FILE))
+        with load(path.join(dir_path, STATE_FILE)) as state:
+            self.alive = state['alive'].copy()
+            self.promoted = bool(state['promoted'])
+
+    def __len__(self) -> int:
+        # live embeddings only - removed ids are not counted
+        return self.index.ntotal
@@ -1,5 +1,6 @@
 from typing import Tuple, Set, Dict, List, OrderedDict
-from numpy import uint64, float32
+from numpy import uint64, float32, flatnonzero, ndarray, arange, int64
+from os import path
 
 from rtai.utils.datetime import datetime, timedelta
 from rtai.core.event import EventType, Event
@@ -10,10 +11,17 @@ from rtai.agent.persona import Persona
 from rtai.world.clock import clock
 from collections import OrderedDict
 from rtai.agent.retriever import Retriever
-import faiss
-from sentence_transformers import SentenceTransformer
+from rtai.agent.memory.embedding_store import EmbeddingStore, IndexConfig
+from rtai.agent.memory.memory_table import MemoryTable, ConceptView, NO_EXPIRATION
 from rtai.llm.llm_client import LLMClient
+from rtai.llm.embedding_service import EmbeddingService
 from rtai.utils.config import YamlLoader
+from rtai.utils.stats import LatencyStats
+from rtai.utils.logging import warn
+
+TABLE_FILE = 'long_term.npz'
+DEFAULT_IMPORTANCE = 7
+DEFAULT_EXPIRATION = timedelta(days=15)
 # storage class to manage concept insertion
 # class ConceptStorage(dict):
 #     def __init__(self, *args, **kwargs):
@@ -29,59 +37,65 @@ from rtai.utils.config import YamlLoader
 class LongTermMemory:
     """_summary_ Class to represent the long term memory of an agent."""
 
-    def __init__(self, persona: Persona, llm_client: LLMClient):
+    def __init__(self, persona: Persona, llm_client: LLMClient, embedding_service: EmbeddingService=None, index_config: IndexConfig=None, min_importance: float=0):
         """_summary_ Constructor for an agent's long term memory.
 
         Args:
             persona (Persona): persona of the agent
+            llm_client (LLMClient): LLM interfacing client
+            embedding_service (EmbeddingService, optional): shared embeddings model. Defaults to the process-wide EmbeddingService.
+            index_config (IndexConfig, optional): configuration of the embedding index. Defaults to a flat index.
+            min_importance (float, optional): concepts less important than this are forgotten by sweeps. Defaults to 0.
         """
         self.persona = persona
         self.llm_client = llm_client
 
-        self.id_to_node: OrderedDict[int, ConceptNode] = {}
+        # concept metadata lives in the columnar table, the containers below hold lightweight views into it
+        self.table: MemoryTable = MemoryTable()
+        self.id_to_node: OrderedDict[int, ConceptView] = {}
         
-        self.seq_action: List[ConceptNode] = []
-        self.seq_thought: List[ConceptNode] = []
-        self.seq_chat: List[ConceptNode] = []
+        self.seq_action: List[ConceptView] = []
+        self.seq_thought: List[ConceptView] = []
+        self.seq_chat: List[ConceptView] = []
 
-        self.embeddings_model = SentenceTransformer('sentence-transformers/all-mpnet-base-v2')
-        embeddings_dim = 768
-        self.index = faiss.IndexFlatL2(embeddings_dim)
-        self.retriever = Retriever(self.embeddings_model, self.index, self.id_to_node)
+        self.embeddings_model = embedding_service if embedding_service is not None else EmbeddingService()
+        self.embedding_store = EmbeddingStore(self.embeddings_model, index_config=index_config, name=persona.get_name())
+        self.retriever = Retriever(self.embedding_store, self.table)
 
         self.current_narration: str = ""
-        
+
+        self.min_importance: float = min_importance
+        self.num_forgotten: int = 0
+
+    @property
+    def index(self):
+        return self.embedding_store.index
 
     def create_embeddings(self):
         '''
-        Creates embeddings of all the content in long term memory and adds the index
+        Re-creates embeddings of all the content in long term memory and rebuilds the index from scratch.
+        Only needed to recover the index - add_concept embeds incrementally.
         '''
-        # grab the content from storage
-        sentences = [concept.content for concept in self.id_to_node.values()]
-        embeddings = self.embeddings_model.encode(sentences)
-
-        # faiss set index
-        faiss.normalize_L2(embeddings) # generate embeddings on the entire storage
-        # self.index = None
-
-        # create a new index
-        index = faiss.IndexFlatL2(768)
-        index.add(embeddings)
-        self.index = index
-        self.retriever.update_index(self.index)
+        self.embedding_store.rebuild([self.table.content(row) for row in range(len(self.table))])
+        self.embedding_store.remove(flatnonzero(~self.table.alive[:len(self.table)]))
      
     def search_embeddings(self, query: str, k: int) -> Tuple[List[int], List[float]]:
         '''
         searches the embeddings for the query and returns the distances and indices of the top k results
         '''
-        query_embedding = self.embeddings_model.encode([query]) # query needs to be a list as it is converted to a vector
-        faiss.normalize_L2(query_embedding)
-        distances, indices = self.index.search(query_embedding, k) # get the top k serarch embeddings
-        return distances, indices  # we probably want the raw content?
+        return self.embedding_store.search(query, k)
+
+    def get_insert_latency(self) -> LatencyStats:
+        """_summary_ Get the latency stats of embedding new concepts into the index
 
-    def add_concept(self, content: str, event_type: EventType = None, expiration: timedelta = None) -> ConceptNode:
+        Returns:
+            LatencyStats: insert latency stats in milliseconds
+        """
+        return self.embedding_store.insert_latency
+
+    def add_concept(self, content: str, event_type: EventType = None, expiration: timedelta = None) -> ConceptView:
         # print(content)
-        node_id = len(self.id_to_node.keys())
+        node_id = len(self.table) # never reused, concepts forgotten by sweeps keep their row
 
         if event_type == EventType.ChatEvent:
             # TODO if chat event, summarize the chat and add to long term memory
@@ -90,26 +104,92 @@ class LongTermMemory:
         Removing the importance LLM call right now for easy debugging
         '''
         # importance = generate_importance(content) # importance function of content
-        importance = 7
+        importance = DEFAULT_IMPORTANCE
         
-        expiration = timedelta(days=15) # expiration function of importance
+        expiration = DEFAULT_EXPIRATION # expiration function of importance
 
-        node = ConceptNode(node_id=node_id, content=content, event_type=event_type, importance=importance, expiration=expiration)  # TODO: do the call
+        created_sim_time = clock.peek().timestamp()
+        expires_at = created_sim_time + int(expiration.total_seconds()) if expiration else NO_EXPIRATION
+        row = self.table.append(node_id, content, event_type, importance, created_sim_time, expires_at)  # TODO: do the call
+        node = self._cache_node(self.table.view(row))
 
-        # TODO: decide when to update embedding index - convert agent concept to embedding and store
-        
-        # Fast Access dictionary caches
-        self.id_to_node[node_id] = node
+        # only embed the new concept - index id matches the table row since both are append only
+        self.embedding_store.add(node.content)
+        return node
+
+    def bulk_load(self, contents: List[str], embeddings: ndarray=None, event_type: EventType=None) -> List[ConceptView]:
+        """_summary_ Add many concepts at once, e.g. initial or synthetic memories
+
+        Unlike add_concept, the table rows are appended in one go and the contents are embedded in one batch,
+        or not at all when their embeddings are precomputed.
+
+        Args:
+            contents (List[str]): contents of the concepts
+            embeddings (ndarray, optional): embeddings of the contents, of shape (len(contents), dim). Defaults to encoding the contents.
+            event_type (EventType, optional): type of event the concepts represent. Defaults to None.
+
+        Returns:
+            List[ConceptView]: views of the added concepts
+        """
+        if len(contents) == 0:
+            return []
+        if embeddings is None:
+            embeddings = self.embedding_store.encode(contents)
+        elif embeddings.shape != (len(contents), self.embedding_store.dim):
+            raise ValueError("Got embeddings of shape %s for [%d] concepts of dim [%d]" % (embeddings.shape, len(contents), self.embedding_store.dim))
+
+        # index ids match the table rows since both are append only - the table only grows once the index has
+        self.embedding_store.extend(embeddings)
+        created_sim_time = clock.peek().timestamp()
+        first_id = len(self.table)
+        rows = self.table.extend(arange(first_id, first_id + len(contents), dtype=int64), contents, event_type, DEFAULT_IMPORTANCE,
+                                 created_sim_time, created_sim_time + int(DEFAULT_EXPIRATION.total_seconds()))
+        return [self._cache_node(self.table.view(int(row))) for row in rows]
+
+    def _cache_node(self, node: ConceptView) -> ConceptView:
+        """_summary_ Add a concept to the fast access caches
+
+        Args:
+            node (ConceptView): view of the concept
+
+        Returns:
+            ConceptView: the input view
+        """
+        self.id_to_node[node.node_id] = node
+        event_type = node.event_type
         if event_type == EventType.ThoughtEvent:
             self.seq_thought.append(node)
         elif event_type == EventType.ActionEvent:
             self.seq_action.append(node)
         elif event_type == EventType.ChatEvent:
             self.seq_chat.append(node)
-
-        # recalculate the embeddings everytime a new concept node is added
-        self.create_embeddings()
         return node
+
+    def sweep(self, now: int=None) -> int:
+        """_summary_ Forget expired and low importance concepts, removing them from the containers and the embedding index
+
+        Args:
+            now (int, optional): current simulation time in epoch seconds. Defaults to the world clock.
+
+        Returns:
+            int: number of concepts forgotten
+        """
+        rows = self.table.select_forgettable(clock.peek().timestamp() if now is None else now, self.min_importance)
+        if len(rows) == 0:
+            return 0
+
+        self.table.remove(rows)
+        self.embedding_store.remove(rows)
+
+        forgotten = set(int(node_id) for node_id in self.table.node_id[rows])
+        for node_id in forgotten:
+            self.id_to_node.pop(node_id, None)
+        self.seq_action = [node for node in self.seq_action if node.node_id not in forgotten]
+        self.seq_thought = [node for node in self.seq_thought if node.node_id not in forgotten]
+        self.seq_chat = [node for node in self.seq_chat if node.node_id not in forgotten]
+
+        self.num_forgotten += len(rows)
+        return len(rows)
     
     def process_narration(self, narration: str) -> ConceptNode:
         """ TODO : implement function to add a new narration change to long term memory long term memory
@@ -137,20 +217,50 @@ class LongTermMemory:
         pass
 
     def save_to_file(self, file_path: str) -> None:
-        """_summary_ Save the long term memory to a file.
+        """_summary_ Save the long term memory to a snapshot directory.
+
+        The memory table is written as an npz file, and the embedding store as a raw embedding matrix
+        plus the serialized faiss index, so loading never has to re-run the embeddings model.
 
         Args:
-            file_path (str): path to the file to write long term memory to
+            file_path (str): path to the directory to write long term memory to
         """
-        pass
+        self.table.save(path.join(file_path, TABLE_FILE))
+        self.embedding_store.save(file_path)
 
     def load_from_file(self, file_name: str) -> bool:
-        """_summary_ Load the long term memory from a file.
+        """_summary_ Load the long term memory from a snapshot directory.
 
         Args:
-            file_name (str): name of the file to load long term memory from
+            file_name (str): path to the directory to load long term memory from
 
         Returns:
             bool: True if the long term memory was loaded successfully, False otherwise
         """
-        pass
\ No newline at end of file
+        table_file = path.join(file_name, TABLE_FILE)
+        if not path.exists(table_file):
+            warn("No long term memory snapshot found at [%s]" % file_name)
+            return False
+
+        # load into a fresh table and store, and only swap them in once the snapshot is known to be consistent
+        table = MemoryTable.load(table_file)
+        embedding_store = EmbeddingStore(self.embeddings_model, index_config=self.embedding_store.index_config, name=self.embedding_store.name)
+        try:
+            embedding_store.load(file_name)
+        except (OSError, RuntimeError) as err:
+            warn("Unable to load the embeddings of the long term memory snapshot at [%s]: %s" % (file_name, err))
+            return False
+        if embedding_store.size != len(table):
+            warn("Long term memory snapshot at [%s] has [%d] concepts but [%d] embeddings" % (file_name, len(table), embedding_store.size))
+            return False
+
+        embedding_store.insert_latency = self.embedding_store.insert_latency
+        self.table = table
+        self.embedding_store = embedding_store
+        self.retriever.table = table
+        self.retriever.embedding_store = embedding_store
+        self.id_to_node = {}
+        self.seq_action, self.seq_thought, self.seq_chat = [], [], []
+        [self._cache_node(self.table.view(int(row))) for row in flatnonzero(self.table.alive[:len(self.table)])]
+        self.num_forgotten = len(self.table) - self.table.num_alive()
+        return True
@@ -0,0 +1,279 @@
+from threading import Lock
+from time import time
+from typing import List
+from numpy import ndarray, zeros, ones, resize, flatnonzero, frombuffer, fromiter, cumsum, arange, savez, load, int64, int32, uint8, uint16, float32, float64
+
+from rtai.core.event import EventType
+
+INITIAL_CAPACITY = 1024
+NO_EXPIRATION = -1
+
+class MemoryTable:
+    """ _summary_ Class to store concept metadata as NumPy columns, with the content of all concepts in one string arena
+
+    Row i of every column describes the concept at position i of the embedding index, so retrieval can score
+    concepts with array operations instead of reading attributes off of objects.
+    Access times are only updated through touch() - reading a column or a view never changes them.
+    Removed concepts are tombstoned rather than compacted, so rows stay aligned with the ids of the embedding index.
+    """
+
+    COLUMNS = ('node_id', 'event_type', 'importance', 'created_sim_time', 'last_accessed', 'expiration', 'content_offset', 'content_length', 'alive')
+
+    def __init__(self, capacity: int=INITIAL_CAPACITY):
+        """ _summary_ Constructor for the MemoryTable
+
+        Args:
+            capacity (int, optional): number of rows to preallocate. Defaults to INITIAL_CAPACITY.
+        """
+        self._lock: Lock = Lock()
+        self.size: int = 0
+
+        self.node_id: ndarray = zeros(capacity, dtype=int64)
+        self.event_type: ndarray = zeros(capacity, dtype=uint16)
+        self.importance: ndarray = zeros(capacity, dtype=float32)
+        self.created_sim_time: ndarray = zeros(capacity, dtype=int64) # sim epoch seconds
+        self.last_accessed: ndarray = zeros(capacity, dtype=float64) # real epoch seconds
+        self.expiration: ndarray = zeros(capacity, dtype=int64) # sim epoch seconds, NO_EXPIRATION if never
+        self.content_offset: ndarray = zeros(capacity, dtype=int64)
+        self.content_length: ndarray = zeros(capacity, dtype=int32)
+        self.alive: ndarray = ones(capacity, dtype=bool)
+        self.arena: bytearray = bytearray()
+
+    def _grow(self, capacity: int) -> None:
+        """ _summary_ Grow every column to the input capacity. Must hold the lock."""
+        for name in MemoryTable.COLUMNS:
+            setattr(self, name, resize(getattr(self, name), capacity))
+
+    def append(self, node_id: int, content: str, event_type: EventType, importance: float, created_sim_time: int, expiration: int=NO_EXPIRATION, last_accessed: float=None) -> int:
+        """ _summary_ Append a concept to the table
+
+        Args:
+            node_id (int): ID of the concept
+            content (str): content of the concept
+            event_type (EventType): type of event the concept represents
+            importance (float): importance of the concept
+            created_sim_time (int): simulation time the concept was created at, in epoch seconds
+            expiration (int, optional): simulation time the concept expires at, in epoch seconds. Defaults to NO_EXPIRATION.
+            last_accessed (float, optional): real time the concept was last accessed at. Defaults to now.
+
+        Returns:
+            int: row of the concept
+        """
+        encoded = str(content).encode('utf-8')
+        with self._lock:
+            row = self.size
+            if row >= len(self.node_id):
+                self._grow(2 * len(self.node_id))
+
+            self.node_id[row] = node_id
+            self.event_type[row] = (event_type or EventType.InvalidEvent).value
+            self.importance[row] = importance
+            self.created_sim_time[row] = created_sim_time
+            self.last_accessed[row] = time() if last_accessed is None else last_accessed
+            self.expiration[row] = expiration
+            self.content_offset[row] = len(self.arena)
+            self.content_length[row] = len(encoded)
+            self.alive[row] = True
+            self.arena += encoded
+            self.size += 1
+        return row
+
+    def extend(self, node_ids, contents: List[str], event_type: EventType, importance, created_sim_time, expiration=NO_EXPIRATION, last_accessed: float=None) -> ndarray:
+        """ _summary_ Append many concepts at once - every column is written as one slice and the contents are joined into the arena in one copy
+
+        Args:
+            node_ids: IDs of the concepts
+            contents (List[str]): contents of the concepts
+            event_type (EventType): type of event the concepts represent
+            importance: importance of the concepts, one value or one per concept
+            created_sim_time: simulation time the concepts were created at in epoch seconds, one value or one per concept
+            expiration (optional): simulation time the concepts expire at in epoch seconds, one value or one per concept. Defaults to NO_EXPIRATION.
+            last_accessed (float, optional): real time the concepts were last accessed at. Defaults to now.
+
+        Returns:
+            ndarray: rows of the concepts
+        """
+        encoded = [str(content).encode('utf-8') for content in contents]
+        lengths = fromiter((len(e) for e in encoded), dtype=int64, count=len(encoded))
+        n = len(encoded)
+        with self._lock:
+            start = self.size
+            if start + n > len(self.node_id):
+                self._grow(max(start + n, 2 * len(self.node_id)))
+
+            rows = slice(start, start + n)
+            self.node_id[rows] = node_ids
+            self.event_type[rows] = (event_type or EventType.InvalidEvent).value
+            self.importance[rows] = importance
+            self.created_sim_time[rows] = created_sim_time
+            self.last_accessed[rows] = time() if last_accessed is None else last_accessed
+            self.expiration[rows] = expiration
+            self.content_offset[rows] = len(self.arena) + cumsum(lengths) - lengths
+            self.content_length[rows] = lengths
+            self.alive[rows] = True
+            self.arena += b''.join(encoded)
+            self.size += n
+        return arange(start, start + n, dtype=int64)
+
+    def content(self, row: int) -> str:
+        """ _summary_ Get the content of a concept
+
+        Args:
+            row (int): row of the concept
+
+        Returns:
+            str: content of the concept
+        """
+        offset = int(self.content_offset[row])
+        return self.arena[offset:offset + int(self.content_length[row])].decode('utf-8')
+
+    def touch(self, rows, accessed_at: float=None) -> None:
+        """ _summary_ Mark concepts as accessed
+
+        Args:
+            rows: row or array of rows to mark
+            accessed_at (float, optional): real time of the access. Defaults to now.
+        """
+        self.last_accessed[rows] = time() if accessed_at is None else accessed_at
+
+    def select_forgettable(self, now: int, min_importance: float=0) -> ndarray:
+        """ _summary_ Select the live concepts that have expired or fall below the importance floor
+
+        Args:
+            now (int): current simulation time, in epoch seconds
+            min_importance (float, optional): concepts less important than this are forgettable. Defaults to 0.
+
+        Returns:
+            ndarray: rows of the forgettable concepts
+        """
+        n = self.size
+        expiration = self.expiration[:n]
+        expired = (expiration != NO_EXPIRATION) & (expiration <= now)
+        return flatnonzero(self.alive[:n] & (expired | (self.importance[:n] < min_importance)))
+
+    def remove(self, rows) -> None:
+        """ _summary_ Tombstone concepts
+
+        Args:
+            rows: row or array of rows to remove
+        """
+        self.alive[rows] = False
+
+    def num_alive(self) -> int:
+        """ _summary_ Get the number of concepts that have not been removed """
+        return int(self.alive[:self.size].sum())
+
+    def view(self, row: int) -> 'ConceptView':
+        """ _summary_ Get a lightweight view of a concept
+
+        Args:
+            row (int): row of the concept
+
+        Returns:
+            ConceptView: view of the concept
+        """
+        return ConceptView(self, row)
+
+    def save(self, file_path: str) -> None:
+        """ _summary_ Save the table to an uncompressed npz file
+
+        Args:
+            file_path (str): path to the npz file
+        """
+        with self._lock:
+            columns = {name: getattr(self, name)[:self.size] for name in MemoryTable.COLUMNS}
+            savez(file_path, arena=frombuffer(bytes(self.arena), dtype=uint8), **columns)
+
+    @classmethod
+    def load(cls, file_path: str) -> 'MemoryTable':
+        """ _summary_ Factory method to load a table saved with save()
+
+        Args:
+            file_path (str): path to the npz file
+
+        Returns:
+            MemoryTable: loaded table
+        """
+        with load(file_path) as data:
+            size = len(data['node_id'])
+            table = cls(max(size, INITIAL_CAPACITY))
+            for name in MemoryTable.COLUMNS:
+                getattr(table, name)[:size] = data[name]
+            table.arena = bytearray(data['arena'].tobytes())
+        table.size = size
+        return table
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, row: int) -> 'ConceptView':
+        return ConceptView(self, row)
+
+class ConceptView:
+    """ _summary_ Lightweight read view of a concept stored in a MemoryTable """
+
+    __slots__ = ['table', 'row']
+
+    def __init__(self, table: MemoryTable, row: int):
+        """ _summary_ Constructor for the ConceptView
+
+        Args:
+            table (MemoryTable): table the concept is stored in
+            row (int): row of the concept
+        """
+        self.table: MemoryTable = table
+        self.row: int = row
+
+    @property
+    def node_id(self) -> int:
+        return int(self.table.node_id[self.row])
+
+    @property
+    def content(self) -> str:
+        return self.table.content(self.row)
+
+    @property
+    def event_type(self) -> EventType:
+        return EventType(self.table.event_type[self.row])
+
+    @property
+    def importance(self) -> float32:
+        return self.table.importance[self.row]
+
+    @property
+    def created_sim_time(self) -> int:
+        return int(self.table.created_sim_time[self.row])
+
+    @property
+    def expiration(self) -> int:
+        return int(self.table.expiration[self.row])
+
+    @property
+    def last_accessed(self) -> float:
+        return float(self.table.last_accessed[self.row])
+
+    def touch(self) -> None:
+        """ _summary_ Mark the concept as accessed """
+        self.table.touch(self.row)
+
+    def summary(self) -> str:
+        """ _summary_ Get a summary of the concept """
+        return self.content
+
+    def __str__(self) -> str:
+        return self.content
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __lt__(self, other) -> bool:
+        return self.node_id < other.node_id
+
+    def __eq__(self, other) -> bool:
+        return self.node_id == other.node_id
+
+    def __le__(self, other) -> bool:
+        return self.node_id <= other.node_id
+
+    def __hash__(self) -> int:
+        return hash(self.node_id)
@@ -1,3 +1,5 @@
+from json import dump, load
+from os import path
 from numpy import uint8, uint16, float32
 from numpy.random import normal
 from typing import Dict, List, Tuple
@@ -243,10 +245,22 @@ class ShortTermMemory:
     def save_to_file(self, file_path: str) -> None:
         """_summary_ Save the short term memory to a file.
 
+        Only the plan and the current action are saved - a chat in progress is not, so the agent resumes outside of any chat.
+
         Args:
             file_path (str): path to the file to write short term memory to
         """
-        pass
+        state = {
+            'retention': self.retention,
+            'daily_plan': self.daily_plan,
+            'daily_req': self.daily_req,
+            'daily_schedule': self.daily_schedule,
+            'daily_schedule_idx': self.daily_schedule_idx,
+            'daily_completed': self.daily_completed,
+            'current_action': self.current_action.to_dict(),
+        }
+        with open(file_path, 'w') as f:
+            dump(state, f, default=str)
 
     def load_from_file(self, file_name: str) -> bool:
         """_summary_ Load the short term memory from a file.
@@ -257,4 +271,19 @@ class ShortTermMemory:
         Returns:
             bool: True if the short term memory was loaded successfully, False otherwise
         """
-        pass
\ No newline at end of file
+        if not path.exists(file_name):
+            warn("No short term memory snapshot found at [%s]" % file_name)
+            return False
+
+        with open(file_name, 'r') as f:
+            state = load(f)
+
+        self.retention = state['retention']
+        self.daily_plan = state['daily_plan']
+        self.daily_req = state['daily_req']
+        self.daily_schedule = [tuple(task) for task in state['daily_schedule']]
+        self.daily_schedule_idx = state['daily_schedule_idx']
+        self.daily_completed = state['daily_completed']
+        self.current_action = Action.from_dict(state['current_action'])
+        self.chatting_with = ''
+        return True
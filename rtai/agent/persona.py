@@ -1,5 +1,5 @@
-from typing import List
-from dataclasses import dataclass, fields
+from typing import List, Dict, Any
+from dataclasses import dataclass, fields, asdict
 from numpy import uint8
 
 @dataclass
@@ -32,6 +32,27 @@ class Persona:
         """
         return self.name
 
+    def to_dict(self) -> Dict[str, Any]:
+        """_summary_ Serialize the persona to a JSON friendly dictionary.
+
+        Returns:
+            Dict[str, Any]: persona with the age as a plain int.
+        """
+        data = asdict(self)
+        data['age'] = int(self.age)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Persona":
+        """_summary_ Deserialize a persona serialized with to_dict().
+
+        Args:
+            data (Dict[str, Any]): serialized persona.
+        Returns:
+            Persona: A persona object.
+        """
+        return cls(**dict(data, age=uint8(int(data['age']))))
+
     @classmethod
     def generate(cls) -> "Persona":
         """_summary_ Generate a persona using LLM and randomization
@@ -1,136 +1,110 @@
-
-import faiss
 import numpy as np
-from rtai.utils.datetime import datetime
-from typing import List
+from time import time
+from typing import Tuple
+
+from rtai.agent.memory.embedding_store import EmbeddingStore
+from rtai.agent.memory.memory_table import MemoryTable
+from rtai.utils.stats import profiler
 
 '''
 https://www.pinecone.io/learn/series/faiss/faiss-tutorial/
 '''
 
+SEC_PER_HOUR = 3600.0
+
 class Retriever:
-    def __init__(self, embeddings_model, index, storage):
-        self.index = index
-        self.embeddings_model = embeddings_model
-        self.storage = storage
+    def __init__(self, embedding_store: EmbeddingStore, table: MemoryTable):
+        self.embedding_store = embedding_store
+        self.table = table # row i holds the metadata of the concept at position i of the index
         self.max_retrieval = 1000 # the max number of concepts to retrieve
         self.max_context = 5 # the max number of concepts to use to create a context
         self.decay_rate = 0.01 # the decay rate for recency score
-    def update_index(self, index):
-        self.index = index
-        
+
+    @property
+    def index(self):
+        # always the live index of the store, so inserts are visible without re-syncing
+        return self.embedding_store.index
+
     def _text_to_vector(self, text):
-        query_embedding = self.embeddings_model.encode([text])
-        faiss.normalize_L2(query_embedding)
-        return query_embedding
-    
-    def _top_k_similiary_search(self, index, query: str):
-        '''
-        Searches the faiss index for the k nearest neighbors to the query
-        '''
-        query_embedding = self._text_to_vector(query)
-        num_search_results = min(self.max_retrieval, len(self.storage))
-        distances, indices = index.search(query_embedding, num_search_results)
-        
-        # we just want the distances as lists
-        distances_list = distances[0].tolist()
-        indices_list = indices[0].tolist()
-        
-        return distances_list, indices_list
-
-    def _retrieve_concepts_from_indices(self, indices_list):
+        return self.embedding_store.encode([text])
+
+    def _top_k_similiary_search(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
         '''
-        Gets the a list of concepts from a list of indices
+        Searches the faiss index for the k most similar concepts to the query, scored by cosine similarity
         '''
-        # print(f"Storage is here {self.storage.items()}")
-        res = []
-        for index in indices_list:
-            res.append(self.storage[index])
-        # return [self.storage[index] for index in indices_list]
-        return res
-
-    def _recency_score(self, concepts) -> List[float]:
+        num_search_results = min(self.max_retrieval, len(self.embedding_store))
+        if num_search_results == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        similarities, indices = self.embedding_store.search(query, num_search_results)
+
+        # faiss pads with -1 when there are fewer results than requested
+        valid = indices[0] >= 0
+        return similarities[0][valid], indices[0][valid]
+
+    def _recency_score(self, indices: np.ndarray, current_time: float) -> np.ndarray:
         '''
-        Scores the concept based on how recently it was accessed
+        Scores the concepts based on how recently they were accessed
         '''
-        current_time = datetime.now()
-        recency_scores = []
-
-        for concept in concepts:
-            last_accessed = concept._last_accessed
-            recency = last_accessed.calc_timedelta_diff(current_time)
-            
-            num_hours_passed = recency.total_seconds() // 3600
-            recency_score = ((1.0 - self.decay_rate) ** num_hours_passed) * 10 # normalization expects it to be roughly between 0 and 10
-            print (f"recency score for {concept} is {recency_score}")
-            recency_scores.append(recency_score * 10)
-
-        # print(f"recency scores are {recency_scores}")
-        # return [ for concept in concepts]
-        return recency_scores
-    
-    def _importance_score(self, concepts):
+        num_hours_passed = np.floor((current_time - self.table.last_accessed[indices]) / SEC_PER_HOUR)
+        # normalization expects it to be roughly between 0 and 10, then scaled to weigh against importance
+        return ((1.0 - self.decay_rate) ** num_hours_passed) * 10 * 10
+
+    def _importance_score(self, indices: np.ndarray) -> np.ndarray:
         '''
-        Scores the concepts on how frequently it is used
+        Scores the concepts on how important they are
         '''
-        return [concept.importance for concept in concepts]
-    
-    def _min_max_normalize_scores(self, scores):
+        return self.table.importance[indices]
+
+    def _min_max_normalize_scores(self, scores: np.ndarray) -> np.ndarray:
         '''
         Normalizes scores to be between 0 and 1 based off min max
         '''
-        min_score = min(scores)
-        max_score = max(scores)
-        return [(score - min_score) / (max_score - min_score) for score in scores]
+        min_score = scores.min()
+        score_range = scores.max() - min_score
+        if score_range == 0:
+            return np.zeros_like(scores)
+        return (scores - min_score) / score_range
 
-    def _calculate_combined_score(self, distances, indices, concepts):
+    def _calculate_combined_score(self, similarities: np.ndarray, indices: np.ndarray, k: int, current_time: float) -> Tuple[np.ndarray, np.ndarray]:
         '''
-        given retrieved concepts, calculates final normalized score
+        given retrieved concepts, calculates final normalized score and returns the indices and scores of the top k, best first
         '''
         # relevancy + recency + imporance
-        relevance_scores = [1 - distance for distance in distances]
-        recency_scores = self._recency_score(concepts)
-        importance_scores = self._importance_score(concepts)
-
-        # normalize and sort concepts by score
-        raw_score = [sum(score) for score in zip(recency_scores, importance_scores, relevance_scores)]
-        # print(f"raw score for all retrieved is {raw_score}")
+        raw_score = similarities + self._recency_score(indices, current_time) + self._importance_score(indices)
         normalized_score = self._min_max_normalize_scores(raw_score) # map scores to [0, 1]
-        # print(f"normalized score for all retrieved is {normalized_score}")
-        
-        # sort the indices by score
-        sorted_scores = list(sorted(zip(indices, normalized_score), key=lambda x: x[1], reverse=True)) # indices of the top k
-        return sorted_scores
-    
-    def _create_context(self, sorted_scores, k) -> str:
+
+        # partial sort - only the top k are ordered
+        k = min(k, len(normalized_score))
+        top = np.argpartition(-normalized_score, k - 1)[:k] if k < len(normalized_score) else np.arange(k)
+        top = top[np.argsort(-normalized_score[top], kind='stable')]
+        return indices[top], normalized_score[top]
+
+    def _create_context(self, top_indices: np.ndarray) -> str:
         '''
         creates a context string from the top k concepts
         '''
-        context = ""
-        # print(f"fetching the top {k} results to create a context string")
-        for i, a in enumerate(sorted_scores[:k]):
-            # print(f"The {i}th result is {self.storage[a[0]]} at index {a[0]} and has score: {a[1]}")
-            context += self.storage[a[0]].content
-        
-        return context
-    
+        return "".join(self.table.content(int(i)) for i in top_indices)
+
     def retrieve_context(self, query, k=3):
         '''
         retrieves a context string composed of the top k concept nodes based off query
-        
+
         fetches up to max retrival contents (similarity to query), then weights importance and recency to further filter to k concepts
         '''
-        distances, indices = self._top_k_similiary_search(self.index, query)
-        # print("faiss distances are", distances)
-        # print("indices are", indices)
-        
-        concepts = self._retrieve_concepts_from_indices(indices)
-        
+        with profiler.measure(self.embedding_store.name, 'retrieve'):
+            return self._retrieve_context(query, k)
+
+    def _retrieve_context(self, query, k):
+        similarities, indices = self._top_k_similiary_search(query)
+        if len(indices) == 0:
+            return ""
+
         # create final score based off of relevancy, recency, and importance
-        sorted_scores = self._calculate_combined_score(distances, indices, concepts)
-        # print("sorted scores are", sorted_scores)
+        current_time = time()
+        top_indices, _ = self._calculate_combined_score(similarities, indices, k, current_time)
+
+        # concepts used in the context count as accessed - the only place retrieval touches them
+        self.table.touch(top_indices, current_time)
 
         # take the top k results and create a context string to be inserted into a prompt
-        context = self._create_context(sorted_scores, k)
-        
-        return context
\ No newline at end of file
+        return self._create_context(top_indices)
@@ -1,38 +1,128 @@
-from enum import Enum
-from numpy import uint16
+from enum import IntEnum
+from threading import Lock
+from time import monotonic_ns
+from typing import Dict, List, Type
 
-from rtai.utils.datetime import datetime
 from rtai.agent.abstract_agent import AbstractAgent
-from rtai.utils.datetime import datetime
 
-class EventType(Enum):
+DEFAULT_MAX_POOLED_EVENTS = 1024 # per event class
+
+class EventType(IntEnum):
     """ _summary_ Enum to represent event types"""
-    InvalidEvent=uint16(0)
-    ThoughtEvent=uint16(1)
-    ReverieEvent=uint16(2)
-    ActionEvent=uint16(3)
-    ChatEvent=uint16(4)
-    NarrationEvent=uint16(5)
-    WhisperEvent=uint16(6)
-    EventTypeLength=uint16(7)
+    InvalidEvent=0
+    ThoughtEvent=1
+    ReverieEvent=2
+    ActionEvent=3
+    ChatEvent=4
+    NarrationEvent=5
+    WhisperEvent=6
+    EventTypeLength=7
+
+class EventPool:
+    """ _summary_ Class to recycle events instead of allocating a new one for every message
+
+    Events are reference counted: acquire() hands out an event holding one reference, owned by whoever publishes it
+    (the event bus releases it once dispatched). Anything keeping an event past its dispatch must retain() it, and
+    release() it when done - the event is cleared and returned to the pool when its last reference is released.
+    An event that is never released is simply garbage collected.
+    """
+
+    def __init__(self, max_size: int=DEFAULT_MAX_POOLED_EVENTS):
+        """ _summary_ Constructor for the EventPool
+
+        Args:
+            max_size (int, optional): maximum number of free events kept per event class. Defaults to DEFAULT_MAX_POOLED_EVENTS.
+        """
+        self.max_size: int = max_size
+        self.free: Dict[Type['Event'], List['Event']] = dict()
+        self.lock: Lock = Lock()
+
+        self.allocated: int = 0
+        self.reused: int = 0
+        self.recycled: int = 0
+
+    def acquire(self, cls: Type['Event']) -> 'Event':
+        """ _summary_ Take a free event of a class from the pool, allocating one if there is none
+
+        Args:
+            cls (Type[Event]): class of the event
+
+        Returns:
+            Event: event holding one reference
+        """
+        with self.lock:
+            free = self.free.get(cls)
+            if free:
+                e = free.pop()
+                self.reused += 1
+            else:
+                e = cls.__new__(cls)
+                self.allocated += 1
+            e.refs = 1
+        return e
+
+    def retain(self, event: 'Event') -> 'Event':
+        """ _summary_ Add a reference to an event
+
+        Args:
+            event (Event): event to keep
+
+        Returns:
+            Event: the event
+        """
+        with self.lock:
+            event.refs += 1
+        return event
+
+    def release(self, event: 'Event') -> None:
+        """ _summary_ Drop a reference to an event, returning it to the pool when it was the last one
+
+        Args:
+            event (Event): event to release
+        """
+        with self.lock:
+            event.refs -= 1
+            if event.refs > 0:
+                return
+            free = self.free.setdefault(type(event), [])
+            if len(free) >= self.max_size:
+                return
+            event.clear()
+            free.append(event)
+            self.recycled += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """ _summary_ Get the counters of the pool
+
+        Returns:
+            Dict[str, int]: events allocated, reused and recycled, and the number of free events
+        """
+        with self.lock:
+            return {'allocated': self.allocated, 'reused': self.reused, 'recycled': self.recycled,
+                    'free': sum(len(free) for free in self.free.values())}
+
+event_pool = EventPool()
 
 class Event:
     """ _summary_ Class to represent an event
 
-    TODO make this an abstract class, and subtype Event for each EventType implementing abstract methods dispatch(), releaseMeToPool()
+    Each EventType has its own subclass - the type is a class attribute, and events are recycled through the event_pool.
+    The timestamp is the monotonic clock in nanoseconds when the event was created.
     """
 
-    __slots__ = ['timestamp', 'event_type', 'sender', 'msg', 'receiver']
+    __slots__ = ['timestamp', 'sender', 'msg', 'receiver', 'refs']
+
+    event_type: EventType = EventType.InvalidEvent
 
     def __init__(self):
         raise RuntimeError('Use Factory Methods Instead')
     
     @classmethod
-    def _create_event(cls, event_type: EventType, sender: AbstractAgent, msg: str, receiver: str='') -> 'Event':
+    def _create_event(cls, event_cls: Type['Event'], sender: AbstractAgent, msg: str, receiver: str='') -> 'Event':
         """ _summary_ Factory method to create an event
         
         Args:
-            event_type (EventType): Event type
+            event_cls (Type[Event]): Event class of the event type
             sender (AbstractAgent): Sender of event
             msg (str): Message of event
             receiver (str, optional): Receiver of event. Defaults to ''.
@@ -40,9 +130,8 @@ class Event:
         Returns:
             Event: Event object
         """
-        e =  cls.__new__(cls)
-        e.timestamp: datetime = datetime.now()
-        e.event_type: EventType = event_type
+        e = event_pool.acquire(event_cls)
+        e.timestamp: int = monotonic_ns()
         e.sender: str = sender.get_name()
         e.msg: str = msg
         # Receiver should only be used for chats, and should contain the agent name to send the chat request to
@@ -60,7 +149,7 @@ class Event:
         Returns:
             Event: Event object
         """
-        return cls._create_event(EventType.ThoughtEvent, sender, msg)
+        return cls._create_event(ThoughtEvent, sender, msg)
     
     @classmethod
     def create_reverie_event(cls, sender: AbstractAgent, msg: str) -> 'Event':
@@ -73,7 +162,7 @@ class Event:
         Returns:
             Event: Event object
         """
-        return cls._create_event(EventType.ReverieEvent, sender, msg)
+        return cls._create_event(ReverieEvent, sender, msg)
     
     @classmethod
     def create_action_event(cls, sender: AbstractAgent, msg: str) -> 'Event':
@@ -86,7 +175,7 @@ class Event:
         Returns:
             Event: Event object
         """
-        return cls._create_event(EventType.ActionEvent, sender, msg)
+        return cls._create_event(ActionEvent, sender, msg)
     
     @classmethod
     def create_chat_event(cls, sender: AbstractAgent, msg: str, receiver: str) -> 'Event':
@@ -99,7 +188,7 @@ class Event:
         Returns:
             Event: Event object
         """
-        return cls._create_event(EventType.ChatEvent, sender, msg, receiver)
+        return cls._create_event(ChatEvent, sender, msg, receiver)
     
     @classmethod
     def create_narration_event(cls, sender: AbstractAgent, msg: str) -> 'Event':
@@ -112,7 +201,7 @@ class Event:
         Returns:
             Event: Event object
         """
-        return cls._create_event(EventType.NarrationEvent, sender, msg)
+        return cls._create_event(NarrationEvent, sender, msg)
     
     @classmethod
     def create_empty_event(cls) -> 'Event':
@@ -121,20 +210,28 @@ class Event:
         Returns:
             Event: Event object
         """
-        e =  cls.__new__(cls)
-        e.timestamp = None
-        e.event_type = EventType.InvalidEvent
-        e.sender = ""
-        e.msg = ""
+        e = event_pool.acquire(Event)
+        e.clear()
         return e
 
-    # TODO Make Event an abstract class and make this method virtual
     def clear(self) -> None:
         """ _summary_ Method to clear an event"""
-        self.timestamp = ""
-        self.event_type = EventType.InvalidEvent
+        self.timestamp = 0
         self.sender = ""
         self.msg = ""
+        self.receiver = ""
+
+    def retain(self) -> 'Event':
+        """ _summary_ Method to keep the event past its dispatch - see EventPool
+
+        Returns:
+            Event: the event
+        """
+        return event_pool.retain(self)
+
+    def release(self) -> None:
+        """ _summary_ Method to drop a reference to the event, returning it to the pool when it was the last one"""
+        event_pool.release(self)
 
     def get_message(self) -> str:
         """ _summary_ Method to get the event's message
@@ -151,11 +248,11 @@ class Event:
         """
         return self.event_type
     
-    def get_timestamp(self) -> datetime:
+    def get_timestamp(self) -> int:
         """ _summary_ Method to get the event's timestamp
         
         Returns:
-            datetime: Event timestamp
+            int: Monotonic clock in nanoseconds when the event was created
         """
         return self.timestamp
     
@@ -176,7 +273,26 @@ class Event:
         return self.receiver
 
     def __str__(self) -> str:
-        return "[%s] [%s] (%s) %s" % (self.timestamp, self.event_type, self.sender, self.msg)
+        return "[%d] [%s] (%s) %s" % (self.timestamp, self.event_type.name, self.sender, self.msg)
     
     def __repr__(self) -> str:
-        return "%s: %s" % (self.sender, self.msg)
\ No newline at end of file
+        return "%s: %s" % (self.sender, self.msg)
+class ThoughtEvent(Event):
+    __slots__ = []
+    event_type: EventType = EventType.ThoughtEvent
+
+class ReverieEvent(Event):
+    __slots__ = []
+    event_type: EventType = EventType.ReverieEvent
+
+class ActionEvent(Event):
+    __slots__ = []
+    event_type: EventType = EventType.ActionEvent
+
+class ChatEvent(Event):
+    __slots__ = []
+    event_type: EventType = EventType.ChatEvent
+
+class NarrationEvent(Event):
+    __slots__ = []
+    event_type: EventType = EventType.NarrationEvent
@@ -0,0 +1,150 @@
+from queue import Queue, Full
+from threading import Lock
+from typing import Callable, Dict, List, Tuple
+
+from rtai.core.event import Event, EventType
+from rtai.utils.logging import debug, warn, error
+
+Subscriber = Callable[[Event], None]
+SubscriberKey = Tuple[EventType, str] # (event type, receiver topic - empty for every receiver)
+
+class EventBus(Queue):
+    """ _summary_ Class to publish events to subscribers registered per event type
+
+    Publishers put events on the bus like on any queue, and the consumer drains them in batches, calling the subscribers
+    of each event. Subscribers are registered for an event type, optionally narrowed to the events sent to one receiver
+    (e.g. the chats sent to one agent), so dispatching an event is two dictionary lookups however many subscribers there are.
+
+    The bus is bounded by max_pending - publishers block up to publish_timeout seconds while it is full, after which the event is dropped.
+    Publishing hands the event's reference over to the bus, which releases it once dispatched - subscribers keeping the event must retain() it.
+    A failing subscriber is logged and skipped, and every drained event is marked done, so join() waits until every published event was dispatched.
+    """
+
+    def __init__(self, max_pending: int=0, publish_timeout: float=1.0):
+        """ _summary_ Constructor for the EventBus
+
+        Args:
+            max_pending (int, optional): maximum number of events waiting to be drained, 0 for unbounded. Defaults to 0.
+            publish_timeout (float, optional): seconds a publisher waits for room on a full bus before the event is dropped. Defaults to 1.0.
+        """
+        super().__init__(maxsize=max_pending)
+        self.publish_timeout: float = publish_timeout
+        self.subscribers: Dict[SubscriberKey, List[Subscriber]] = dict()
+        self.subscribers_lock: Lock = Lock()
+
+        self.published: int = 0
+        self.dispatched: int = 0
+        self.dropped: int = 0 # events dropped because the bus was full
+        self.unhandled: int = 0 # events nobody subscribed to
+        self.failed: int = 0 # subscriber calls that raised
+        self.max_depth: int = 0
+
+    def subscribe(self, event_type: EventType, subscriber: Subscriber, topic: str="") -> None:
+        """ _summary_ Subscribe to the events of a type
+
+        Args:
+            event_type (EventType): type of the events to receive
+            subscriber (Subscriber): callback receiving each event
+            topic (str, optional): only receive the events sent to this receiver. Defaults to every receiver.
+        """
+        with self.subscribers_lock:
+            self.subscribers.setdefault((event_type, topic), []).append(subscriber)
+
+    def unsubscribe(self, event_type: EventType, subscriber: Subscriber, topic: str="") -> bool:
+        """ _summary_ Unsubscribe from the events of a type
+
+        Args:
+            event_type (EventType): type of the events subscribed to
+            subscriber (Subscriber): callback to remove
+            topic (str, optional): receiver the subscription was narrowed to. Defaults to every receiver.
+
+        Returns:
+            bool: True if the subscriber was removed, False if it was not subscribed
+        """
+        with self.subscribers_lock:
+            subscribers = self.subscribers.get((event_type, topic), [])
+            if subscriber not in subscribers:
+                return False
+            # copy on write, so a drain in progress keeps iterating over the previous list
+            self.subscribers[(event_type, topic)] = [s for s in subscribers if s != subscriber]
+        return True
+
+    def put(self, event: Event, block: bool=True, timeout: float=None) -> None:
+        """ _summary_ Publish an event, waiting for room if the bus is full
+
+        Args:
+            event (Event): event to publish
+            block (bool, optional): whether or not to wait for room. Defaults to True.
+            timeout (float, optional): seconds to wait for room. Defaults to the bus publish_timeout.
+        """
+        try:
+            super().put(event, block, timeout if timeout is not None else self.publish_timeout)
+        except Full:
+            self.dropped += 1
+            warn("Event bus full with [%d] pending events, dropped event: %s" % (self.maxsize, event))
+            event.release()
+            return
+        self.published += 1
+
+    publish = put
+
+    def drain(self, max_events: int=0) -> int:
+        """ _summary_ Take a batch of pending events off the bus and dispatch each to its subscribers
+
+        Args:
+            max_events (int, optional): maximum number of events to dispatch, 0 for every pending event. Defaults to 0.
+
+        Returns:
+            int: number of events dispatched
+        """
+        with self.mutex:
+            depth = len(self.queue)
+            count = depth if max_events <= 0 else min(depth, max_events)
+            batch = [self.queue.popleft() for _ in range(count)]
+            if count > 0:
+                self.not_full.notify_all()
+        self.max_depth = max(self.max_depth, depth)
+
+        for event in batch:
+            try:
+                self.dispatch(event)
+            finally:
+                self.task_done()
+        return count
+
+    def dispatch(self, event: Event) -> None:
+        """ _summary_ Call the subscribers of an event
+
+        Args:
+            event (Event): event to dispatch
+        """
+        event_type = event.get_event_type()
+        subscribers = self.subscribers.get((event_type, ""), [])
+        receiver = event.get_receiver()
+        if len(receiver) > 0:
+            subscribers = subscribers + self.subscribers.get((event_type, receiver), [])
+
+        try:
+            if len(subscribers) == 0:
+                self.unhandled += 1
+                debug("No subscribers for event type [%s], ignoring event: %s" % (event_type.name, event))
+                return
+
+            for subscriber in subscribers:
+                try:
+                    subscriber(event)
+                except Exception as err:
+                    self.failed += 1
+                    error("Subscriber [%s] failed on event %s: %s" % (getattr(subscriber, '__qualname__', subscriber), event, err))
+            self.dispatched += 1
+        finally:
+            event.release()
+
+    def get_stats(self) -> Dict[str, int]:
+        """ _summary_ Get the counters of the bus
+
+        Returns:
+            Dict[str, int]: events published, dispatched, dropped and unhandled, failed subscriber calls, and the current and maximum number of pending events
+        """
+        return {'published': self.published, 'dispatched': self.dispatched, 'dropped': self.dropped, 'unhandled': self.unhandled, 'failed': self.failed,
+                'pending': self.qsize(), 'max_depth': self.max_depth}
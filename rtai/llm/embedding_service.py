@@ -0,0 +1,169 @@
+'''
+This module contains the EmbeddingService class, which shares a single sentence embeddings model across all agents and the world.
+'''
+from concurrent.futures import Future
+from queue import Queue, Empty
+from threading import Thread, Lock, current_thread
+from time import perf_counter
+from resource import getrusage, RUSAGE_SELF
+from sys import platform
+from typing import List, Tuple
+from numpy import ndarray
+
+from rtai.utils.config import Config
+from rtai.utils.logging import info, error
+from rtai.utils.stats import LatencyStats
+
+DEFAULT_EMBEDDINGS_MODEL = 'sentence-transformers/all-mpnet-base-v2'
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_BATCH_WAIT_MS = 2
+
+MODEL_NAME_CONFIG = 'ModelName'
+MAX_BATCH_SIZE_CONFIG = 'MaxBatchSize'
+MAX_BATCH_WAIT_CONFIG = 'MaxBatchWaitMs'
+
+EMBEDDING_THREAD_NAME = 'EmbeddingThread'
+
+EncodeRequest = Tuple[List[str], Future]
+
+def max_rss_mb() -> float:
+    """ _summary_ Get the peak resident memory of the process
+
+    Returns:
+        float: peak resident set size in MB
+    """
+    rss = getrusage(RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on linux
+    return rss / (1024 * 1024) if platform == 'darwin' else rss / 1024
+
+class EmbeddingService:
+    """ _summary_ Singleton class to share one embeddings model between every agent memory and the world
+
+    Encode requests from any thread are put on a queue and drained by a single worker thread,
+    which coalesces all pending requests into one forward pass of the model.
+    """
+
+    def __new__(cls) -> 'EmbeddingService':
+        """ _summary_ Singleton constructor for the EmbeddingService"""
+        if not hasattr(cls, '_instance'):
+            cls._instance = super().__new__(cls)
+            cls._instance.model = None
+            cls._instance.model_name: str = DEFAULT_EMBEDDINGS_MODEL
+            cls._instance.max_batch_size: int = DEFAULT_MAX_BATCH_SIZE
+            cls._instance.max_batch_wait: float = DEFAULT_MAX_BATCH_WAIT_MS / 1000.0
+            cls._instance.requests: Queue = Queue()
+            cls._instance.worker: Thread = None
+            cls._instance.load_lock: Lock = Lock()
+            cls._instance.encode_latency: LatencyStats = LatencyStats()
+            cls._instance.num_requests: int = 0
+            cls._instance.num_batches: int = 0
+        return cls._instance
+
+    def initialize(self, cfg: Config=None, embeddings_model=None) -> bool:
+        """ _summary_ Load the embeddings model and start the encoding thread
+
+        Args:
+            cfg (Config, optional): Embeddings config. Defaults to None.
+            embeddings_model (optional): already constructed model exposing encode(List[str]) -> ndarray. Defaults to None.
+
+        Returns:
+            bool: True if the model was loaded, False otherwise
+        """
+        with self.load_lock:
+            if cfg is not None:
+                self.model_name = cfg.get_value(MODEL_NAME_CONFIG, DEFAULT_EMBEDDINGS_MODEL)
+                self.max_batch_size = int(cfg.get_value(MAX_BATCH_SIZE_CONFIG, DEFAULT_MAX_BATCH_SIZE))
+                self.max_batch_wait = float(cfg.get_value(MAX_BATCH_WAIT_CONFIG, DEFAULT_MAX_BATCH_WAIT_MS)) / 1000.0
+
+            if embeddings_model is not None:
+                self.model = embeddings_model
+            elif self.model is None:
+                if not self._load_model():
+                    return False
+
+            if self.worker is None:
+                self.worker = Thread(target=self._run, name=EMBEDDING_THREAD_NAME, daemon=True)
+                self.worker.start()
+        return True
+
+    def _load_model(self) -> bool:
+        """ _summary_ Load the sentence transformer model, logging the time and memory it took
+
+        Returns:
+            bool: True if the model was loaded, False otherwise
+        """
+        start_time = perf_counter()
+        start_rss = max_rss_mb()
+        try:
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(self.model_name)
+        except Exception as err:
+            error("Failed to load embeddings model [%s]: %s" % (self.model_name, err))
+            return False
+
+        info("Loaded embeddings model [%s] in [%s] ms, peak RSS [%.1f] MB -> [%.1f] MB" % (self.model_name, (perf_counter() - start_time) * 1000, start_rss, max_rss_mb()))
+        return True
+
+    def encode(self, sentences: List[str]) -> ndarray:
+        """ _summary_ Encode sentences with the shared model, batched with concurrent requests from other threads
+
+        Args:
+            sentences (List[str]): sentences to encode
+
+        Returns:
+            ndarray: embeddings of shape (len(sentences), dim)
+        """
+        if self.worker is None and not self.initialize():
+            raise RuntimeError("EmbeddingService failed to initialize")
+
+        if current_thread() is self.worker or len(sentences) == 0:
+            return self.model.encode(sentences)
+
+        future: Future = Future()
+        self.requests.put((list(sentences), future))
+        return future.result()
+
+    def _next_batch(self) -> List[EncodeRequest]:
+        """ _summary_ Block for the next request and coalesce it with any requests arriving within the batch window
+
+        Returns:
+            List[EncodeRequest]: requests to encode in one forward pass
+        """
+        batch = [self.requests.get()]
+        size = len(batch[0][0])
+        deadline = perf_counter() + self.max_batch_wait
+
+        while size < self.max_batch_size:
+            try:
+                remaining = deadline - perf_counter()
+                request = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except Empty:
+                break
+            batch.append(request)
+            size += len(request[0])
+        return batch
+
+    def _run(self) -> None:
+        """ _summary_ Worker loop encoding batches of requests """
+        while True:
+            batch = self._next_batch()
+            sentences = [s for request in batch for s in request[0]]
+
+            start_time = perf_counter()
+            try:
+                embeddings = self.model.encode(sentences)
+            except Exception as err:
+                [future.set_exception(err) for _, future in batch]
+                continue
+            self.encode_latency.record((perf_counter() - start_time) * 1000)
+            self.num_requests += len(batch)
+            self.num_batches += 1
+
+            offset = 0
+            for request_sentences, future in batch:
+                n = len(request_sentences)
+                future.set_result(embeddings[offset:offset + n])
+                offset += n
+
+    def __str__(self) -> str:
+        return "EmbeddingService[%s] requests=%d batches=%d encode=[%s]" % (self.model_name, self.num_requests, self.num_batches, self.encode_latency)
@@ -1,16 +1,57 @@
 '''
 This module contains the LLMClient class, which is responsible for communicating with the LLM server.
 '''
-from typing import List, Tuple, TYPE_CHECKING
+from concurrent.futures import Future
+from typing import Any, Dict, List, Tuple, TYPE_CHECKING
 from guidance import models, gen
 import guidance
 # from guidance.models.llama_cpp.llama_cpp import LlamaCpp
 
 from rtai.utils.config import Config
+from rtai.utils.stats import profiler
+from rtai.llm.model_pool import ModelPool, DEFAULT_MAX_LIVE_CONTEXTS, DEFAULT_MAX_CONTEXTS_PER_MODEL
+from rtai.llm.llm_scheduler import LLMScheduler
+from rtai.llm.response_cache import ResponseCache, make_cache_key, DEFAULT_MAX_ENTRIES, DEFAULT_TTL_SEC
+
+PROFILER_SCOPE = 'llm'
 
 if TYPE_CHECKING:
     from rtai.agent.agent import Agent
 
+MODEL_PATH_CONFIG = "local_model_path"
+MAX_LIVE_CONTEXTS_CONFIG = "MaxLiveContexts"
+MAX_CONTEXTS_PER_MODEL_CONFIG = "MaxContextsPerModel"
+MODEL_NAME_CONFIG = "model_name"
+RESPONSE_CACHE_CONFIG = "ResponseCache"
+CACHE_ENABLED_CONFIG = "Enabled"
+CACHE_MAX_ENTRIES_CONFIG = "MaxEntries"
+CACHE_TTL_CONFIG = "TTLSec"
+CACHE_FILE_CONFIG = "FilePath"
+
+SCHEDULE_N_CTX = 20000
+GENERATION_N_CTX = 2048
+
+# Sampling parameters of each prompt template - part of the response cache key
+TASKS_SAMPLING = dict(temperature=1.0)
+DURATION_SAMPLING = dict(temperature=0.7, max_tokens=10)
+START_TIME_SAMPLING = dict(temperature=0.7, max_tokens=10)
+INTERROGATION_SAMPLING = dict(max_tokens=1000)
+DIALOGUE_SAMPLING = dict(max_tokens=1000)
+IMPORTANCE_SAMPLING = dict(temperature=0.7, max_tokens=10)
+
+def load_llama_cpp(path: str, n_ctx: int) -> models.LlamaCpp:
+    """ _summary_ Load a local gguf model with llama.cpp
+
+    Args:
+        path (str): path to the model weights
+        n_ctx (int): context size of the model
+
+    Returns:
+        models.LlamaCpp: loaded model
+    """
+    model = models.LlamaCpp(path, n_gpu_layers=-1, n_ctx=n_ctx)
+    model.echo = False
+    return model
 
 class LLMClient:
     model = None
@@ -25,37 +66,136 @@ class LLMClient:
     
     def __init__(self) -> None:
         LLMClient.model = None
+        # Requests from all agents go through the scheduler so they share the live contexts of the local model
+        self.scheduler: LLMScheduler = LLMScheduler()
+        self.response_cache: ResponseCache = None
 
     def initialize(self, cfg: Config) -> bool:
         self.cfg: Config = cfg
-        LLMClient.model = models.LlamaCpp(cfg.get_value("local_model_path", ""), n_gpu_layers=-1, n_ctx=20000)
-        LLMClient.model.echo = False
+        self.model_path: str = cfg.get_value(MODEL_PATH_CONFIG, "")
+        self.model_pool: ModelPool = ModelPool(load_llama_cpp,
+                                               max_live_contexts=int(cfg.get_value(MAX_LIVE_CONTEXTS_CONFIG, DEFAULT_MAX_LIVE_CONTEXTS)),
+                                               max_contexts_per_model=int(cfg.get_value(MAX_CONTEXTS_PER_MODEL_CONFIG, DEFAULT_MAX_CONTEXTS_PER_MODEL)))
+        self.scheduler.configure(max_concurrency=self.model_pool.max_live_contexts)
+        self.model_name: str = cfg.get_value(MODEL_NAME_CONFIG, self.model_path)
+
+        # Opt-in cache of responses, keyed by the hash of the request
+        cache_cfg = cfg.expand(RESPONSE_CACHE_CONFIG)
+        if cache_cfg.get_value(CACHE_ENABLED_CONFIG, "False") == "True":
+            self.response_cache = ResponseCache(max_entries=int(cache_cfg.get_value(CACHE_MAX_ENTRIES_CONFIG, DEFAULT_MAX_ENTRIES)),
+                                                ttl_sec=float(cache_cfg.get_value(CACHE_TTL_CONFIG, DEFAULT_TTL_SEC)),
+                                                file_path=cache_cfg.get_value(CACHE_FILE_CONFIG, ""))
+
+        self.model_pool.preload(self.model_path, SCHEDULE_N_CTX)
         return True
+
+    def _run_program(self, n_ctx: int, program, names: Tuple[str]) -> Dict[str, Any]:
+        """ _summary_ Run a guidance program on a pooled model
+
+        Args:
+            n_ctx (int): context size of the model to run on
+            program: guidance program to run
+            names (Tuple[str]): names of the generated variables to return
+
+        Returns:
+            Dict[str, Any]: generated variables of the program
+        """
+        with self.model_pool.acquire(self.model_path, n_ctx) as model:
+            out = model + program
+        return {name: out[name] for name in names}
+
+    def submit(self, n_ctx: int, program, *names: str) -> Future:
+        """ _summary_ Schedule a guidance program to run on the local model, sharing its live contexts with requests from other agents
+
+        Args:
+            n_ctx (int): context size of the model to run on
+            program: guidance program to run
+            names (str): names of the generated variables to return
+
+        Returns:
+            Future: future resolved with the generated variables of the program
+        """
+        return self.scheduler.submit(self._run_program, n_ctx, program, names)
+
+    def generate(self, n_ctx: int, program, *names: str) -> Dict[str, Any]:
+        """ _summary_ Run a guidance program through the scheduler and wait for its output
+
+        Args:
+            n_ctx (int): context size of the model to run on
+            program: guidance program to run
+            names (str): names of the generated variables to return
+
+        Returns:
+            Dict[str, Any]: generated variables of the program
+        """
+        return self.submit(n_ctx, program, *names).result()
+
+    def generate_cached(self, template: str, args: Dict[str, Any], sampling: Dict[str, Any], n_ctx: int, program, *names: str) -> Dict[str, Any]:
+        """ _summary_ Run a guidance program, reusing a cached response of an identical earlier request if the cache is enabled
+
+        Args:
+            template (str): name of the prompt template
+            args (Dict[str, Any]): rendered arguments of the prompt
+            sampling (Dict[str, Any]): sampling parameters of the generation
+            n_ctx (int): context size of the model to run on
+            program: guidance program to run
+            names (str): names of the generated variables to return
+
+        Returns:
+            Dict[str, Any]: generated variables of the program
+        """
+        # calls are profiled per prompt template, cache hits included
+        with profiler.measure(PROFILER_SCOPE, template):
+            if self.response_cache is None:
+                return self.generate(n_ctx, program, *names)
+
+            key = make_cache_key(self.model_name, template, args, sampling)
+            found, out = self.response_cache.get(key)
+            if not found:
+                out = self.generate(n_ctx, program, *names)
+                self.response_cache.put(key, out)
+            return out
+
+    def get_cache_stats(self) -> dict:
+        """ _summary_ Get the hit/miss stats of the response cache
+
+        Returns:
+            dict: stats of the response cache, empty if the cache is disabled
+        """
+        return self.response_cache.get_stats() if self.response_cache is not None else dict()
+
+    def get_model_stats(self) -> dict:
+        """ _summary_ Get the load/reuse counters of the local model pool
+
+        Returns:
+            dict: counters of the model pool
+        """
+        return self.model_pool.get_stats()
             
     @guidance
     def create_daily_tasks(lm, self, persona, num_tasks=3):
         for i in range(num_tasks):
-            lm += f'''Briefly describe a task {i+1} that {persona} does in a day in 10 or less words: "{gen(stop=".", name="tasks", temperature=1.0, list_append=True)}"\n'''
+            lm += f'''Briefly describe a task {i+1} that {persona} does in a day in 10 or less words: "{gen(stop=".", name="tasks", list_append=True, **TASKS_SAMPLING)}"\n'''
         return lm
 
     @guidance
     def estimate_duration(lm, self, persona, tasks):
         lm += f"Estimate a realistic duration, in hours, of how much time a {persona} would take for each task: \n"
         for i in range(len(tasks)):
-            lm += f'''Task {i+1} will take {persona} {gen(stop='"', regex="[0-9]", name="duration", temperature=0.7, max_tokens=10, list_append=True)} hours\n'''
+            lm += f'''Task {i+1} will take {persona} {gen(stop='"', regex="[0-9]", name="duration", list_append=True, **DURATION_SAMPLING)} hours\n'''
         return lm
 
     @guidance
     def estimate_start_times(lm, self, persona, tasks):
         lm +=  f"Generate a start time for when {persona} will start each task: \n"
         for i in range(len(tasks)):
-            lm += f'''Task {i+1} will start at {gen(stop='"', regex="[0-9]:[0-9][0-9]", name="start_time", temperature=0.7, max_tokens=10, list_append=True)} hours\n'''
+            lm += f'''Task {i+1} will start at {gen(stop='"', regex="[0-9]:[0-9][0-9]", name="start_time", list_append=True, **START_TIME_SAMPLING)} hours\n'''
         return lm
 
     @guidance
     def create_interrogation(lm, self, persona, context, question, history):
         # print(f"Type of lm is {type(lm)}, {type(persona)}, {type(context)}, {type(question)}")
-        lm += f'''You are {persona}. Answer the question like you are {persona} in 2 lines max, given the history: {history} and context: {context}. Q: {question} A: \n{gen(stop='Q:', name="interrogation", max_tokens=1000)}'''
+        lm += f'''You are {persona}. Answer the question like you are {persona} in 2 lines max, given the history: {history} and context: {context}. Q: {question} A: \n{gen(stop='Q:', name="interrogation", **INTERROGATION_SAMPLING)}'''
         return lm
 
     @guidance
@@ -74,16 +214,15 @@ class LLMClient:
         Claire: Good, what about you?
 
         Here is the short dialogue:
-        {gen('dialogue', max_tokens=1000)}"""
+        {gen('dialogue', **DIALOGUE_SAMPLING)}"""
         # lm = LLMClient.model + dialogue_prompt
         return lm
 
     def generate_dialogue(self, agent1: 'Agent', agent2: 'Agent', location: str, topic: str):
         retrieved_context1, retrieved_context2 = agent1.l_mem.retriever.retrieve_context(topic), agent2.l_mem.retriever.retrieve_context(topic)
         context = f"{agent1.get_name()} Context: {retrieved_context1}\n{agent2.get_name()} Context: {retrieved_context2}"
-        mistral2 = models.LlamaCpp(self.cfg.get_value("local_model_path", ""), n_gpu_layers=-1, n_ctx=2048)
-        mistral2.echo = False
-        out = mistral2 + self.create_dialogue(agent1, agent2, context, location, topic)
+        args = dict(agent1=agent1.get_common_set_str(), agent2=agent2.get_common_set_str(), context=context, location=location, topic=topic)
+        out = self.generate_cached('create_dialogue', args, DIALOGUE_SAMPLING, GENERATION_N_CTX, self.create_dialogue(agent1, agent2, context, location, topic), "dialogue")
         resp = out["dialogue"]
         return resp
 
@@ -99,16 +238,15 @@ class LLMClient:
     
     def generate_daily_schedule(self, persona) -> List[Tuple[str, str, str]]:
         # generate the tasks
-        mistral = LLMClient.model
-        out1 = mistral + self.create_daily_tasks(persona)
+        out1 = self.generate_cached('create_daily_tasks', dict(persona=persona, num_tasks=3), TASKS_SAMPLING, SCHEDULE_N_CTX, self.create_daily_tasks(persona), "tasks")
         tasks = out1['tasks']
         # print(tasks)
         # estimate the duration
-        out2 = mistral + self.estimate_duration(persona, tasks)
+        out2 = self.generate_cached('estimate_duration', dict(persona=persona, tasks=tasks), DURATION_SAMPLING, SCHEDULE_N_CTX, self.estimate_duration(persona, tasks), "duration")
         duration = out2["duration"]
         # print(duration)
         # estimate the start times
-        out3 = mistral + self.estimate_start_times(persona, tasks)
+        out3 = self.generate_cached('estimate_start_times', dict(persona=persona, tasks=tasks), START_TIME_SAMPLING, SCHEDULE_N_CTX, self.estimate_start_times(persona, tasks), "start_time")
         start_time = out3["start_time"]
         # print(start_time)
         # return a list of triples
@@ -118,22 +256,19 @@ class LLMClient:
         # print("persona", persona)
         # print("retrieved context", context)
         # print("question", question)
-        mistral2 = models.LlamaCpp(self.cfg.get_value("local_model_path", ""), n_gpu_layers=-1, n_ctx=2048)
-        mistral2.echo = False
-        out = mistral2 + self.create_interrogation(persona=persona, context=context, question=question, history=history)
+        args = dict(persona=persona, context=context, question=question, history=history)
+        out = self.generate_cached('create_interrogation', args, INTERROGATION_SAMPLING, GENERATION_N_CTX, self.create_interrogation(**args), "interrogation")
         resp = out["interrogation"]
         return resp
 
     @guidance
     def estimate_importance(lm, self, concept):
         lm += f"On the scale of 0 to 9, where 0 is purely mundane (e.g., brushing teeth, making bed) and 9 is extremely poignant (e.g., a break up, college acceptance), rate the likely importance of the following piece of memory. Respond with a single integer."
-        lm += f'''The piece of memory is {concept} and the importance of the event is {gen(stop='"', regex="[0-9]", name="importance", temperature=0.7, max_tokens=10)}'''
+        lm += f'''The piece of memory is {concept} and the importance of the event is {gen(stop='"', regex="[0-9]", name="importance", **IMPORTANCE_SAMPLING)}'''
         return lm
 
     def generate_importance(self, concept):
-        mistral3 = models.LlamaCpp(self.cfg.get_value("local_model_path", ""), n_gpu_layers=-1, n_ctx=2048) # TODO: change this to be configurable
-        mistral3.echo = False
-        out = mistral3 + self.estimate_importance(concept)
+        out = self.generate_cached('estimate_importance', dict(concept=concept), IMPORTANCE_SAMPLING, GENERATION_N_CTX, self.estimate_importance(concept), "importance")
         resp = out["importance"]
         try:
             importance = int(resp)
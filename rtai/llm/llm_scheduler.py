@@ -0,0 +1,156 @@
+'''
+This module contains the LLMScheduler class, which runs the LLM requests issued by all agents during a cycle on the local model.
+'''
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Dict
+
+DEFAULT_MAX_CONCURRENCY = 1
+
+def count_words(output: Any) -> int:
+    """ _summary_ Count the words generated by an LLM request, a cheap proxy for its tokens
+
+    Args:
+        output (Any): output of an LLM request
+
+    Returns:
+        int: number of words
+    """
+    if isinstance(output, dict):
+        return sum(count_words(o) for o in output.values())
+    if isinstance(output, (list, tuple)):
+        return sum(count_words(o) for o in output)
+    return len(str(output).split())
+
+@dataclass
+class LLMRequest:
+    """ _summary_ Class to represent a pending LLM request"""
+    fn: Callable
+    args: tuple
+    kwargs: dict
+    future: Future = field(default_factory=Future)
+    submit_time: float = field(default_factory=perf_counter)
+
+@dataclass
+class CycleStats:
+    """ _summary_ Class to hold the LLM throughput of one agent cycle"""
+    requests: int = 0
+    words: int = 0
+    busy_sec: float = 0.0
+    elapsed_sec: float = 0.0
+
+    def words_per_sec(self) -> float:
+        return self.words / self.elapsed_sec if self.elapsed_sec > 0 else 0.0
+
+    def __str__(self) -> str:
+        return "requests=%d words=%d elapsed=%.3fs throughput=%.2f words/sec" % (self.requests, self.words, self.elapsed_sec, self.words_per_sec())
+
+class LLMScheduler:
+    """ _summary_ Class to schedule LLM requests from all agents onto the local model
+
+    Agents submit requests and get a Future back. Requests are dispatched to the backend as soon as they are
+    submitted, across max_concurrency workers (one per live model context) - the backend decodes one request
+    per context, so holding requests back to group them would only add latency.
+    """
+
+    def __init__(self, max_concurrency: int=DEFAULT_MAX_CONCURRENCY, word_counter: Callable[[Any], int]=count_words):
+        """ _summary_ Constructor for the LLMScheduler
+
+        Args:
+            max_concurrency (int, optional): max requests running on the backend at once. Defaults to DEFAULT_MAX_CONCURRENCY.
+            word_counter (Callable[[Any], int], optional): function counting the words of a request output. Defaults to count_words.
+        """
+        self.max_concurrency: int = max(1, max_concurrency)
+        self.word_counter: Callable[[Any], int] = word_counter
+
+        self.executor: ThreadPoolExecutor = None
+        self._start_lock: Lock = Lock()
+
+        self._stats_lock: Lock = Lock()
+        self._cycle: CycleStats = CycleStats()
+        self._cycle_start: float = perf_counter()
+        self.last_cycle: CycleStats = CycleStats()
+
+    def configure(self, max_concurrency: int=None) -> None:
+        """ _summary_ Update the scheduling parameters. Must be called before the first request is submitted.
+
+        Args:
+            max_concurrency (int, optional): max requests running on the backend at once. Defaults to None (unchanged).
+        """
+        if max_concurrency is not None:
+            self.max_concurrency = max(1, max_concurrency)
+
+    def _start(self) -> None:
+        """ _summary_ Lazily start the backend workers """
+        with self._start_lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix='LLMWorker')
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """ _summary_ Submit an LLM request
+
+        Args:
+            fn (Callable): function running the request against the model
+            args (list): arguments of the request
+            kwargs (dict): keyword arguments of the request
+
+        Returns:
+            Future: future resolved with the output of the request
+        """
+        if self.executor is None:
+            self._start()
+        request = LLMRequest(fn, args, kwargs)
+        self.executor.submit(self._execute, request)
+        return request.future
+
+    def _execute(self, request: LLMRequest) -> None:
+        """ _summary_ Run one request on the backend and resolve its future
+
+        Args:
+            request (LLMRequest): request to run
+        """
+        if not request.future.set_running_or_notify_cancel():
+            return
+        start_time = perf_counter()
+        try:
+            output = request.fn(*request.args, **request.kwargs)
+        except Exception as err:
+            request.future.set_exception(err)
+            return
+
+        words = self.word_counter(output)
+        with self._stats_lock:
+            self._cycle.requests += 1
+            self._cycle.words += words
+            self._cycle.busy_sec += perf_counter() - start_time
+        request.future.set_result(output)
+
+    def begin_cycle(self) -> None:
+        """ _summary_ Start accounting a new agent cycle """
+        with self._stats_lock:
+            self._cycle = CycleStats()
+            self._cycle_start = perf_counter()
+
+    def end_cycle(self) -> CycleStats:
+        """ _summary_ Finish accounting the current agent cycle
+
+        Returns:
+            CycleStats: LLM throughput of the cycle
+        """
+        with self._stats_lock:
+            self._cycle.elapsed_sec = perf_counter() - self._cycle_start
+            self.last_cycle = self._cycle
+            self._cycle = CycleStats()
+            self._cycle_start = perf_counter()
+        return self.last_cycle
+
+    def get_stats(self) -> Dict[str, float]:
+        """ _summary_ Get the throughput of the last completed cycle
+
+        Returns:
+            Dict[str, float]: throughput of the last cycle
+        """
+        c = self.last_cycle
+        return {'requests': c.requests, 'words': c.words, 'elapsed_sec': c.elapsed_sec, 'words_per_sec': c.words_per_sec()}
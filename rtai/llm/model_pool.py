@@ -0,0 +1,162 @@
+'''
+This module contains the ModelPool class, which keeps loaded local models alive between LLM calls.
+'''
+from contextlib import contextmanager
+from threading import Condition
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Tuple
+
+from rtai.utils.logging import info, debug
+
+ModelKey = Tuple[str, int]
+ModelLoader = Callable[[str, int], Any]
+
+DEFAULT_MAX_LIVE_CONTEXTS = 2
+DEFAULT_MAX_CONTEXTS_PER_MODEL = 1
+
+class ModelPool:
+    """ _summary_ Class to pool loaded models keyed by (model path, context size)
+
+    Each model is loaded once and handed out to one caller at a time. Callers get the base model,
+    which guidance never mutates (lm + prompt returns a new lm), so every handle starts from a clean state.
+    The total number of live contexts is bounded - idle models of other keys are evicted to make room,
+    otherwise callers wait for a model to be released.
+    """
+
+    def __init__(self, loader: ModelLoader, max_live_contexts: int=DEFAULT_MAX_LIVE_CONTEXTS, max_contexts_per_model: int=DEFAULT_MAX_CONTEXTS_PER_MODEL):
+        """ _summary_ Constructor for the ModelPool
+
+        Args:
+            loader (ModelLoader): function loading a model from (path, n_ctx)
+            max_live_contexts (int, optional): max number of models loaded at once. Defaults to DEFAULT_MAX_LIVE_CONTEXTS.
+            max_contexts_per_model (int, optional): max number of copies of the same model loaded at once. Defaults to DEFAULT_MAX_CONTEXTS_PER_MODEL.
+        """
+        self.loader: ModelLoader = loader
+        self.max_live_contexts: int = max(1, max_live_contexts)
+        self.max_contexts_per_model: int = max(1, max_contexts_per_model)
+
+        self._cond: Condition = Condition()
+        self._idle: Dict[ModelKey, List[Any]] = dict()
+        self._live: Dict[ModelKey, int] = dict()
+
+        self.num_loads: int = 0
+        self.num_reuses: int = 0
+        self.num_waits: int = 0
+        self.num_evictions: int = 0
+
+    def _total_live(self) -> int:
+        return sum(self._live.values())
+
+    def _evict_idle(self) -> bool:
+        """ _summary_ Drop one idle model to free up a context. Must hold the lock.
+
+        Returns:
+            bool: True if a model was evicted, False if no model was idle
+        """
+        for key, models in self._idle.items():
+            if len(models) > 0:
+                models.pop()
+                self._live[key] -= 1
+                self.num_evictions += 1
+                debug("ModelPool evicted idle model [%s] n_ctx=[%s]" % key)
+                return True
+        return False
+
+    def _checkout(self, key: ModelKey) -> Any:
+        """ _summary_ Take an idle model for key, loading it if there is room
+
+        Args:
+            key (ModelKey): (path, n_ctx) of the model
+
+        Returns:
+            Any: model handle
+        """
+        with self._cond:
+            waited = False
+            while True:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) > 0:
+                    self.num_reuses += 1
+                    return idle.pop()
+
+                live = self._live.get(key, 0)
+                if live < self.max_contexts_per_model and (self._total_live() < self.max_live_contexts or self._evict_idle()):
+                    # Reserve the context, then load outside of the lock
+                    self._live[key] = live + 1
+                    break
+
+                if not waited:
+                    self.num_waits += 1
+                    waited = True
+                self._cond.wait()
+
+        start_time = perf_counter()
+        try:
+            model = self.loader(*key)
+        except Exception:
+            with self._cond:
+                self._live[key] -= 1
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            self.num_loads += 1
+        info("ModelPool loaded model [%s] n_ctx=[%s] in [%s] ms" % (key[0], key[1], (perf_counter() - start_time) * 1000))
+        return model
+
+    def _checkin(self, key: ModelKey, model: Any) -> None:
+        """ _summary_ Return a model to the pool
+
+        Args:
+            key (ModelKey): (path, n_ctx) of the model
+            model (Any): model handle
+        """
+        with self._cond:
+            self._idle.setdefault(key, []).append(model)
+            self._cond.notify_all()
+
+    @contextmanager
+    def acquire(self, path: str, n_ctx: int):
+        """ _summary_ Context manager to borrow a model from the pool
+
+        Args:
+            path (str): path to the model weights
+            n_ctx (int): context size of the model
+
+        Yields:
+            Any: model handle, returned to the pool on exit
+        """
+        key = (path, int(n_ctx))
+        model = self._checkout(key)
+        try:
+            yield model
+        finally:
+            self._checkin(key, model)
+
+    def preload(self, path: str, n_ctx: int) -> None:
+        """ _summary_ Load a model ahead of its first use
+
+        Args:
+            path (str): path to the model weights
+            n_ctx (int): context size of the model
+        """
+        with self.acquire(path, n_ctx):
+            pass
+
+    def get_stats(self) -> Dict[str, int]:
+        """ _summary_ Get the load/reuse counters of the pool
+
+        Returns:
+            Dict[str, int]: counters of the pool
+        """
+        with self._cond:
+            return {
+                'loads': self.num_loads,
+                'reuses': self.num_reuses,
+                'waits': self.num_waits,
+                'evictions': self.num_evictions,
+                'live': self._total_live(),
+            }
+
+    def __str__(self) -> str:
+        return "ModelPool%s" % self.get_stats()
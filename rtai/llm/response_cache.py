@@ -0,0 +1,154 @@
+'''
+This module contains the ResponseCache class, which caches LLM responses keyed by a hash of the request.
+'''
+from collections import OrderedDict
+from hashlib import sha256
+from json import dumps
+from os import path, makedirs
+from pickle import dumps as pickle_dumps, loads as pickle_loads
+from sqlite3 import connect, Connection
+from threading import Lock
+from time import time
+from typing import Any, Dict, Tuple
+
+from rtai.utils.logging import debug, warn
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL_SEC = 0 # 0 means entries never expire
+
+def make_cache_key(model: str, template: str, args: Dict[str, Any], sampling: Dict[str, Any]) -> str:
+    """ _summary_ Hash an LLM request into a content addressed cache key
+
+    Args:
+        model (str): name of the model
+        template (str): name of the prompt template
+        args (Dict[str, Any]): rendered arguments of the prompt
+        sampling (Dict[str, Any]): sampling parameters of the generation
+
+    Returns:
+        str: hex digest of the request
+    """
+    payload = dumps({'model': model, 'template': template, 'args': args, 'sampling': sampling}, sort_keys=True, default=str)
+    return sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """ _summary_ Class to cache LLM responses with LRU + TTL eviction and an optional on-disk backing store
+
+    The in-memory LRU holds the hottest entries. When a file path is given every entry is also written
+    to a sqlite database, which is read through on memory misses so responses survive restarts.
+    """
+
+    def __init__(self, max_entries: int=DEFAULT_MAX_ENTRIES, ttl_sec: float=DEFAULT_TTL_SEC, file_path: str=''):
+        """ _summary_ Constructor for the ResponseCache
+
+        Args:
+            max_entries (int, optional): max entries held in memory. Defaults to DEFAULT_MAX_ENTRIES.
+            ttl_sec (float, optional): time to live of an entry in seconds, 0 to never expire. Defaults to DEFAULT_TTL_SEC.
+            file_path (str, optional): path to the on-disk store, empty for memory only. Defaults to ''.
+        """
+        self.max_entries: int = max(1, max_entries)
+        self.ttl_sec: float = ttl_sec
+        self._lock: Lock = Lock()
+        self._entries: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+        self._db: Connection = None
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        if len(file_path) > 0:
+            self._open(file_path)
+
+    def _open(self, file_path: str) -> None:
+        """ _summary_ Open the on-disk store
+
+        Args:
+            file_path (str): path to the sqlite database
+        """
+        dir_name = path.dirname(file_path)
+        if len(dir_name) > 0 and not path.exists(dir_name):
+            makedirs(dir_name)
+        self._db = connect(file_path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, created REAL, value BLOB)")
+        self._db.commit()
+        debug("Opened LLM response cache at [%s]" % file_path)
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_sec > 0 and time() - created > self.ttl_sec
+
+    def _put_memory(self, key: str, created: float, value: Any) -> None:
+        """ _summary_ Insert into the in-memory LRU. Must hold the lock."""
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """ _summary_ Look up a cached response
+
+        Args:
+            key (str): cache key of the request
+
+        Returns:
+            Tuple[bool, Any]: whether the key was found, and the cached response
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT created, value FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (row[0], pickle_loads(row[1]))
+                    self._put_memory(key, *entry)
+
+            if entry is None or self._expired(entry[0]):
+                if entry is not None:
+                    self._delete(key)
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        """ _summary_ Cache a response
+
+        Args:
+            key (str): cache key of the request
+            value (Any): response to cache
+        """
+        created = time()
+        with self._lock:
+            self._put_memory(key, created, value)
+            if self._db is not None:
+                try:
+                    self._db.execute("INSERT OR REPLACE INTO responses (key, created, value) VALUES (?, ?, ?)", (key, created, pickle_dumps(value)))
+                    self._db.commit()
+                except Exception as err:
+                    warn("Failed to persist LLM response to cache: %s" % err)
+
+    def _delete(self, key: str) -> None:
+        """ _summary_ Remove an entry from memory and disk. Must hold the lock."""
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+
+    def close(self) -> None:
+        """ _summary_ Close the on-disk store """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_stats(self) -> Dict[str, int]:
+        """ _summary_ Get the hit/miss stats of the cache
+
+        Returns:
+            Dict[str, int]: stats of the cache
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'entries': len(self._entries)}
+
+    def __str__(self) -> str:
+        return "ResponseCache%s" % self.get_stats()
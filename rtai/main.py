@@ -47,8 +47,9 @@ if __name__ == "__main__":
         log_stdout_pipe: bool = log_cfg.get_value('PipeToStdout', 'False') == 'True'
         use_callee_stack: bool = log_cfg.get_value('UseCalleeStack', 'False') == 'True'
         transcript_log_name: str = log_cfg.get_value('TranscriptLogName', '')
+        structured_transcript: bool = log_cfg.get_value('StructuredTranscript', 'False') == 'True'
 
-        setup_logging(log_dir, log_name, log_level, transcript_log_name, use_callee_stack, log_stdout_pipe)
+        setup_logging(log_dir, log_name, log_level, transcript_log_name, use_callee_stack, log_stdout_pipe, structured_transcript)
 
     # Create Engine
     engine = StoryEngine(cfg, debug_mode=log_level == DEBUG, test_mode=test_mode, static_init=static_init)
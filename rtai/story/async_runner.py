@@ -0,0 +1,145 @@
+'''
+This module contains the AsyncRunner class, which drives the story engine from a single asyncio loop.
+'''
+from asyncio import Event as AsyncEvent, Task, AbstractEventLoop, CancelledError, get_running_loop, create_task, gather, sleep, run, run_coroutine_threadsafe
+from threading import Thread
+from inspect import isawaitable
+from math import floor
+from typing import Awaitable, Callable, Dict, List, Set
+
+from rtai.utils.timer_manager import TimerManager, PeriodicTask
+from rtai.utils.logging import info, warn
+
+CONSOLE_PROMPT = ">>> "
+
+class AsyncRunner:
+    """ _summary_ Class to run the timers registered with the TimerManager as coroutines on one asyncio loop
+
+    Timers keep their registration (period + callback) but are driven by the loop at a fixed rate instead of
+    the TimerManager's scheduler thread. Cheap callbacks (clock tick, event dispatch) run inline on the loop,
+    blocking ones are awaited on an executor, and timers can be replaced by a coroutine function outright.
+    Console lines are read on a daemon thread but handled on the loop, so the loop is the only thread driving the simulation.
+    """
+
+    def __init__(self, timer_mgr: TimerManager, on_command: Callable[[str], None], coroutines: Dict[str, Callable[[], Awaitable]]=None, blocking: Set[str]=None):
+        """ _summary_ Constructor for the AsyncRunner
+
+        Args:
+            timer_mgr (TimerManager): timer manager holding the periodic tasks to run
+            on_command (Callable[[str], None]): handler of a line of console input
+            coroutines (Dict[str, Callable[[], Awaitable]], optional): coroutine functions replacing the callback of a timer, keyed by thread ID. Defaults to None.
+            blocking (Set[str], optional): thread IDs of timers whose callback blocks and must run on an executor. Defaults to None.
+        """
+        self.timer_mgr: TimerManager = timer_mgr
+        self.on_command: Callable[[str], None] = on_command
+        self.coroutines: Dict[str, Callable[[], Awaitable]] = coroutines if coroutines is not None else dict()
+        self.blocking: Set[str] = blocking if blocking is not None else set()
+
+        self.loop: AbstractEventLoop = None
+        self.tasks: List[Task] = []
+        self.is_paused: bool = False
+        self._resumed: AsyncEvent = None
+        self._pause_time: float = 0.0
+
+    def run(self) -> None:
+        """ _summary_ Run the loop until the runner is stopped """
+        run(self._main())
+
+    async def _main(self) -> None:
+        """ _summary_ Start a coroutine per timer plus the console reader, and wait for them to finish """
+        self.loop = get_running_loop()
+        self._resumed = AsyncEvent()
+        self._resumed.set()
+
+        self.tasks = [create_task(self._run_periodic(t), name=t.thread_id) for t in self.timer_mgr.timers.values()]
+        Thread(target=self._read_console, name='ConsoleReader', daemon=True).start()
+        info("Started asyncio runner with [%d] periodic tasks" % len(self.tasks))
+        try:
+            await gather(*self.tasks)
+        except CancelledError:
+            pass
+        finally:
+            [info("Timer stats: %s" % t) for t in self.timer_mgr.timers.values()]
+
+    def _make_step(self, task: PeriodicTask) -> Callable[[], Awaitable]:
+        """ _summary_ Get the function running one step of a timer on the loop
+
+        Args:
+            task (PeriodicTask): timer to run
+
+        Returns:
+            Callable[[], Awaitable]: function running the step, returning an awaitable unless the callback ran inline
+        """
+        if task.thread_id in self.coroutines:
+            return self.coroutines[task.thread_id]
+        if task.thread_id in self.blocking:
+            return lambda: self.loop.run_in_executor(None, task.callback)
+        return task.callback
+
+    async def _run_periodic(self, task: PeriodicTask) -> None:
+        """ _summary_ Run a timer at a fixed rate, recording its jitter and latency
+
+        Args:
+            task (PeriodicTask): timer to run
+        """
+        step = self._make_step(task)
+        deadline = self.loop.time() + task.seconds
+        while True:
+            await sleep(max(0.0, deadline - self.loop.time()))
+            if self.is_paused:
+                remaining = max(0.0, deadline - self._pause_time)
+                await self._resumed.wait()
+                deadline = self.loop.time() + remaining
+                continue
+
+            start_time = self.loop.time()
+            task.jitter.record((start_time - deadline) * 1000)
+            try:
+                result = step()
+                if isawaitable(result):
+                    await result
+            except Exception as err:
+                warn("Timer [%s] callback raised: %s" % (task.thread_id, err))
+            task.latency.record((self.loop.time() - start_time) * 1000)
+            task.runs += 1
+
+            # fixed rate - deadlines passed while the step was running are dropped as overruns
+            deadline += task.seconds
+            now = self.loop.time()
+            if deadline <= now:
+                missed = int(floor((now - deadline) / task.seconds)) + 1
+                task.overruns += missed
+                deadline += missed * task.seconds
+
+    async def _handle_command(self, line: str) -> None:
+        self.on_command(line)
+
+    def _read_console(self) -> None:
+        """ _summary_ Read console lines and handle each one on the loop
+
+        Runs on a daemon thread so it never holds up exit. The next line is only read once the previous command was handled,
+        so interactive commands (interrogate, whisper) can read their own input while the timers are paused.
+        """
+        while True:
+            try:
+                line = input(CONSOLE_PROMPT)
+                run_coroutine_threadsafe(self._handle_command(line), self.loop).result()
+            except (EOFError, OSError, CancelledError, RuntimeError):
+                return
+
+    def pause(self) -> None:
+        """ _summary_ Pause all periodic tasks """
+        self._pause_time = self.loop.time()
+        self._resumed.clear()
+        self.is_paused = True
+        info("All Timers Paused")
+
+    def resume(self) -> None:
+        """ _summary_ Resume all periodic tasks """
+        self.is_paused = False
+        self._resumed.set()
+        info("All Timers Resumed")
+
+    def stop(self) -> None:
+        """ _summary_ Cancel all tasks, ending the loop """
+        [t.cancel() for t in self.tasks]
@@ -1,15 +1,25 @@
-from queue import Queue
 from typing import List
+from collections import deque
 from sys import exit
+from json import dump, load
+from os import path, makedirs
+from time import perf_counter
 from numpy import uint16, uint64
 
 from rtai.utils.config import Config
 from rtai.story.narrator import Narrator
+from rtai.story.async_runner import AsyncRunner
+from rtai.story.fast_forward import FastForwardRunner
 from rtai.agent.agent_manager import AgentManager
+from rtai.agent.agent_shard import ShardedAgentManager, SHARDS_CONFIG
 from rtai.core.event import Event, EventType
+from rtai.core.event_bus import EventBus
 from rtai.utils.timer_manager import TimerManager
 from rtai.utils.logging import info, debug, error, warn
+from rtai.utils.stats import profiler, format_profile
+from rtai.utils.datetime import datetime, now_str
 from rtai.llm.llm_client import LLMClient
+from rtai.llm.embedding_service import EmbeddingService
 from rtai.world.clock import clock
 
 from rtai.world.world import World
@@ -36,6 +46,7 @@ NARRATOR_CONFIG = 'Narrator'
 WORLD_CONFIG = 'World'
 CLOCK_CONFIG = 'Clock'
 LLM_CLIENT_CONFIG = 'LLMClient'
+EMBEDDINGS_CONFIG = 'Embeddings'
 
 WORKER_THREAD_TIMER_CONFIG = 'WorkerThreadTimerMs'
 AGENT_TIMER_CONFIG = 'AgentTimerMillis'
@@ -58,24 +69,55 @@ WORLD_CLOCK_THREAD_NAME = 'WorldClockThread'
 MAX_CYCLES = 'StopAfterCycles'
 MAX_DAYS = 'StopAfterDays'
 
+EXECUTION_MODE_CONFIG = 'ExecutionMode'
+EXECUTION_MODE_THREADED = 'Threaded'
+EXECUTION_MODE_ASYNC = 'Async'
+EXECUTION_MODE_FAST_FORWARD = 'FastForward'
+SKIP_IDLE_CONFIG = 'FastForwardSkipIdle'
+
+MAX_PENDING_EVENTS_CONFIG = 'MaxPendingEvents'
+EVENT_BATCH_SIZE_CONFIG = 'EventBatchSize'
+PUBLISH_TIMEOUT_CONFIG = 'PublishTimeoutMs'
+PUBLIC_MEMORY_SIZE_CONFIG = 'PublicMemorySize'
+
+SNAPSHOT_DIR_CONFIG = 'SnapshotDir'
+RESTORE_SNAPSHOT_CONFIG = 'RestoreSnapshot'
+SNAPSHOT_ON_EXIT_CONFIG = 'SnapshotOnExit'
+PROFILE_FILE_CONFIG = 'ProfileFile'
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MANIFEST_FILE = 'manifest.json'
+NARRATOR_SNAPSHOT_FILE = 'narrator.json'
+
 class StoryEngine:
     """ _summary_ Class to represent the story engine"""
 
-    def __init__(self, cfg: Config, debug_mode: bool=False, test_mode: bool=False, static_init: bool=False):
+    def __init__(self, cfg: Config, debug_mode: bool=False, test_mode: bool=False, static_init: bool=False, client: LLMClient=None):
         """ _summary_ Constructor for the story engine
         
         Args:
             cfg (Config): Config object
             debug_mode (bool, optional): Debug mode flag. Defaults to False.
             test_mode (bool, optional): Test mode flag. Defaults to False.
+            client (LLMClient, optional): LLM client to use instead of the one picked by test_mode (e.g. a benchmark's fake LLM). Defaults to None.
         """
 
         self.cfg: Config = cfg.expand(STORY_CONFIG)
-        self.queue = Queue()
-        self.public_mem: List[Event] = []
+        self.queue: EventBus = EventBus(max_pending=int(self.cfg.get_value(MAX_PENDING_EVENTS_CONFIG, "0")),
+                                        publish_timeout=int(self.cfg.get_value(PUBLISH_TIMEOUT_CONFIG, "1000")) / 1000)
+        self.event_batch_size: int = int(self.cfg.get_value(EVENT_BATCH_SIZE_CONFIG, "0"))
+        self.public_mem: deque[Event] = deque(maxlen=int(self.cfg.get_value(PUBLIC_MEMORY_SIZE_CONFIG, "256")))
         self.use_gui: bool = self.cfg.get_value(USE_GUI_CONFIG, "False") == "True"
         self.max_cycles: uint64 = uint64(self.cfg.get_value(MAX_CYCLES, "0"))
         self.max_days: uint16 = uint16(self.cfg.get_value(MAX_DAYS, "0"))
+        self.execution_mode: str = self.cfg.get_value(EXECUTION_MODE_CONFIG, EXECUTION_MODE_THREADED)
+        self.async_runner: AsyncRunner = None
+        self.fast_forward_runner: FastForwardRunner = None
+        self.skip_idle: bool = self.cfg.get_value(SKIP_IDLE_CONFIG, "True") == "True"
+        self.snapshot_dir: str = self.cfg.get_value(SNAPSHOT_DIR_CONFIG, "")
+        self.snapshot_on_exit: bool = self.cfg.get_value(SNAPSHOT_ON_EXIT_CONFIG, "False") == "True"
+        restore_snapshot: bool = self.cfg.get_value(RESTORE_SNAPSHOT_CONFIG, "False") == "True"
+        self.profile_file: str = self.cfg.get_value(PROFILE_FILE_CONFIG, "")
 
         self.debug_mode: bool = debug_mode
         self.test_mode: bool = test_mode
@@ -87,7 +129,9 @@ class StoryEngine:
         world_clock: clock = clock(clock_config)
         
         # Setup LLM Client
-        if test_mode:
+        if client is not None:
+            self.llm_client: LLMClient = client
+        elif test_mode:
             self.llm_client: LLMClient = LLMTestClient()
             warn("Test mode enabled. LLMClient will leverage test data for responses")
         else:
@@ -103,8 +147,14 @@ class StoryEngine:
             print(type(self.static_client))
             warn("Static Initialization mode enabled. LLMClient will leverage test data for initialization")
         
+        # Setup shared embeddings model - loaded once and used by the world and every agent memory
+        self.embedding_service: EmbeddingService = EmbeddingService()
+        if not self.embedding_service.initialize(cfg.expand(EMBEDDINGS_CONFIG)):
+            error("Unable to initialize EmbeddingService. Exiting.")
+            exit(1)
+
         # Setup World
-        self.world: World = StaticWorld(cfg.expand(WORLD_CONFIG), self.queue) # TODO go back to using real world
+        self.world: World = StaticWorld(cfg.expand(WORLD_CONFIG), self.queue, self.embedding_service) # TODO go back to using real world
         initial_shared_memories: List[str] = self.world.get_shared_memories() # TODO: feed the intial shred memories into the LLMClient
 
         if not self.world.initialize():
@@ -112,7 +162,11 @@ class StoryEngine:
             exit(1)
 
         # Set up Agents
-        self.agent_mgr: AgentManager = AgentManager(self.queue, cfg.expand(AGENTS_CONFIG), client=self.llm_client, world=self.world)
+        agents_config = cfg.expand(AGENTS_CONFIG)
+        if int(agents_config.get_value(SHARDS_CONFIG, "0")) > 0:
+            self.agent_mgr: AgentManager = ShardedAgentManager(self.queue, agents_config, cfg, client=self.llm_client, world=self.world, embedding_service=self.embedding_service)
+        else:
+            self.agent_mgr: AgentManager = AgentManager(self.queue, agents_config, client=self.llm_client, world=self.world, embedding_service=self.embedding_service)
         self.narrator: Narrator = Narrator(self.agent_mgr, self.queue, cfg.expand(NARRATOR_CONFIG), client=self.llm_client)
         if not self.agent_mgr.register(self.narrator):
             error("Unable to register narrator with agent manager. Exiting.")
@@ -122,7 +176,16 @@ class StoryEngine:
             error("Unable to initialize agent manager. Exiting.")
             exit(1)
 
-        self.agent_mgr.load_initial_memories(initial_shared_memories)
+        # Subscribe to the event bus - chats are only routed to the agent they are sent to
+        self.queue.subscribe(EventType.NarrationEvent, self.dispatch_narration)
+        self.queue.subscribe(EventType.ActionEvent, self.dispatch_action)
+        for agent_name in self.agent_mgr.get_agent_names():
+            self.queue.subscribe(EventType.ChatEvent, self.agent_mgr.dispatch_chat_event, topic=agent_name)
+
+        # Restore the simulation from a snapshot, otherwise start fresh from the shared memories
+        restored: bool = restore_snapshot and self.restore_snapshot(self.snapshot_dir)
+        if not restored:
+            self.agent_mgr.load_initial_memories(initial_shared_memories)
 
         # Set up threaded timers (i.e. create a thought every x seconds)
         self.timer_mgr: TimerManager = TimerManager()
@@ -139,17 +202,25 @@ class StoryEngine:
 
         # Generate first narration
         narration: Event = self.narrator.generate_narration("")
-        self.public_mem.append(narration)
+        self.remember(narration)
         self.agent_mgr.dispatch_narration(narration)
 
         # Set initial state of agents
-        # first update generates the plan of the day
-        self.agent_mgr.update(first_day=True, test_llm_client=self.static_client if static_init else None)
+        # first update generates the plan of the day - restored agents already have theirs
+        if not restored:
+            self.agent_mgr.update(first_day=True, test_llm_client=self.static_client if static_init else None)
 
         info("Initialized Story Engine")
 
     def start(self) -> None:
         """ _summary_ Starts the story engine"""
+        if self.execution_mode == EXECUTION_MODE_ASYNC:
+            self.start_async()
+            return
+        if self.execution_mode == EXECUTION_MODE_FAST_FORWARD:
+            self.start_fast_forward()
+            return
+
         self.timer_mgr.start_timers()
         self.agent_mgr.start()
 
@@ -157,58 +228,221 @@ class StoryEngine:
 
         self.poll_input()
 
+    def start_async(self) -> None:
+        """ _summary_ Starts the story engine on an asyncio loop, driving every timer as a coroutine instead of a thread
+
+        Agent cycles are awaited on the agent thread pool and narration on an executor, while the clock tick
+        and event dispatch run inline on the loop.
+        """
+        self.async_runner = AsyncRunner(self.timer_mgr, self.handle_command,
+                                        coroutines={AGENT_THREAD_NAME: self.agent_mgr.update_async},
+                                        blocking={NARRATION_THREAD_NAME, DEBUG_THREAD_NAME})
+        self.agent_mgr.start()
+
+        info("Started story engine in asyncio mode")
+
+        self.async_runner.run()
+
+    def start_fast_forward(self) -> None:
+        """ _summary_ Starts the story engine headless, stepping every timer in virtual time as fast as compute allows
+
+        Timers fire in the same order as in real time but nothing sleeps, so a run is only bound by the agents' compute.
+        With FastForwardSkipIdle the clock also jumps straight to the next action end time while every agent is idle.
+        There is no console - the run ends on StopAfterCycles / StopAfterDays.
+        """
+        if self.max_cycles == 0 and self.max_days == 0:
+            warn("Fast-forward mode without %s or %s will run until interrupted" % (MAX_CYCLES, MAX_DAYS))
+
+        self.fast_forward_runner = FastForwardRunner(self.timer_mgr, WORLD_CLOCK_THREAD_NAME,
+                                                     idle_timers={AGENT_THREAD_NAME, WORKER_THREAD_NAME},
+                                                     next_wakeup=self.next_wakeup if self.skip_idle else None)
+        self.agent_mgr.start()
+
+        info("Started story engine in fast-forward mode")
+
+        self.fast_forward_runner.run()
+
+    def next_wakeup(self) -> datetime:
+        """ _summary_ Get the world time the simulation is idle until
+
+        Returns:
+            datetime: earliest end time of the agents' current actions, or None if there are events to process or any agent is busy
+        """
+        if not self.queue.empty():
+            return None
+        return self.agent_mgr.next_wakeup()
+
     def stop(self, status=0) -> None:
         """ _summary_ Stops the story engine"""
         self.force_stop = True
-        self.timer_mgr.stop_timers()
+        if self.async_runner is not None:
+            self.async_runner.stop()
+        elif self.fast_forward_runner is not None:
+            self.fast_forward_runner.stop()
+        else:
+            self.timer_mgr.stop_timers()
+        if self.snapshot_on_exit:
+            self.save_snapshot(self.snapshot_dir)
+        if len(self.profile_file) > 0:
+            self.save_profile(self.profile_file)
+        self.agent_mgr.stop()
         info("Shutdown complete")
         exit(status)
 
+    def is_paused(self) -> bool:
+        """ _summary_ Whether the simulation timers are paused """
+        return self.async_runner.is_paused if self.async_runner is not None else self.timer_mgr.is_paused
+
+    def pause(self) -> None:
+        """ _summary_ Pauses the simulation timers """
+        if self.async_runner is not None:
+            self.async_runner.pause()
+        else:
+            self.timer_mgr.pause_timers()
+
+    def resume(self) -> None:
+        """ _summary_ Resumes the simulation timers """
+        if self.async_runner is not None:
+            self.async_runner.resume()
+        else:
+            self.timer_mgr.resume_timers()
+
     def poll_input(self) -> None:
         """ _summary_ Polls console for user input"""
         while not self.force_stop:
-            x = input(">>> ")
-            if x == "exit":
-                self.stop()
+            self.handle_command(input(">>> "))
+
+    def handle_command(self, x: str) -> None:
+        """ _summary_ Handles a line of console input
+
+        Args:
+            x (str): console input
+        """
+        if x == "exit":
+            self.stop()
+            return
+        elif "narrate" in x:
+            text = x.split("narrate ")[1]
+            self.manual_narration_change(text)
+        elif x == "snapshot":
+            if not self.is_paused():
+                error("Failed to snapshot simulation - timers must be paused first.")
+                return
+            self.save_snapshot(self.snapshot_dir)
+        elif x == "stats":
+            if isinstance(self.agent_mgr, ShardedAgentManager) and not self.is_paused():
+                error("Failed to collect stats from agent shards - timers must be paused first.")
+                return
+            print(format_profile(self.agent_mgr.get_profile()))
+        elif x.startswith("speed "):
+            try:
+                clock.set_speed(float(x.split("speed ")[1]))
+            except ValueError:
+                error("Invalid clock speed: %s" % x.split("speed ")[1])
+        elif "pause" in x:
+            self.pause()
+        elif "resume" in x:
+            self.resume()
+        elif "interrogate" in x:
+            if not self.is_paused():
+                error("Failed to interrogate agent - timers must be paused first.")
                 return
-            elif "narrate" in x:
-                text = x.split("narrate ")[1]
-                self.manual_narration_change(text)
-            elif "pause" in x:
-                self.timer_mgr.pause_timers()
-            elif "resume" in x:
-                self.timer_mgr.resume_timers()
-            elif "interrogate" in x:
-                if not self.timer_mgr.is_paused:
-                    error("Failed to interrogate agent - timers must be paused first.")
-                    continue
-
-                agent_name = x.split("interrogate ")[1]
-                if agent_name not in self.agent_mgr.agents:
-                    error("Tried to interrogate unknown agent: %s" % agent_name)
-                    continue
-
-                self.enter_interrogation(agent_name)
-                info("Finished interrogating Agent [%s]" % agent_name)
-            elif "whisper" in x:
-                if not self.timer_mgr.is_paused:
-                    error("Failed to whisper agent - timers must be paused first.")
-                    continue
-
-                agent_name = x.split("whisper ")[1]
-                if agent_name not in self.agent_mgr.agents:
-                    error("Tried to whisper to unknown agent: %s" % agent_name)
-                    continue
-
-                self.enter_whisper(agent_name)
-                info("Finished whisper to Agent [%s]" % agent_name)
-            elif x == "h" or x == "help":
-                print("Commands:\n \
-                    help - print this help message\n \
-                    narrate <str> - manually narrate\n \
-                    exit - exit the program")
-            else:
-                print("Unknown command")
+
+            agent_name = x.split("interrogate ")[1]
+            if agent_name not in self.agent_mgr.agents:
+                error("Tried to interrogate unknown agent: %s" % agent_name)
+                return
+
+            self.enter_interrogation(agent_name)
+            info("Finished interrogating Agent [%s]" % agent_name)
+        elif "whisper" in x:
+            if not self.is_paused():
+                error("Failed to whisper agent - timers must be paused first.")
+                return
+
+            agent_name = x.split("whisper ")[1]
+            if agent_name not in self.agent_mgr.agents:
+                error("Tried to whisper to unknown agent: %s" % agent_name)
+                return
+
+            self.enter_whisper(agent_name)
+            info("Finished whisper to Agent [%s]" % agent_name)
+        elif x == "h" or x == "help":
+            print("Commands:\n \
+                help - print this help message\n \
+                narrate <str> - manually narrate\n \
+                snapshot - save the simulation to the snapshot directory (timers must be paused)\n \
+                speed <float> - advance the clock by this many increments per tick\n \
+                stats - print the latency profile of the agent phases, LLM calls and embeddings\n \
+                exit - exit the program")
+        else:
+            print("Unknown command")
+
+    def save_profile(self, file_path: str) -> None:
+        """ _summary_ Write the latency profile of the agent phases, LLM calls and embeddings to a json file
+
+        Args:
+            file_path (str): path of the file to write
+        """
+        if len(path.dirname(file_path)) > 0:
+            makedirs(path.dirname(file_path), exist_ok=True)
+        profiler.dump(file_path, self.agent_mgr.get_profile())
+        info("Saved latency profile to [%s]" % file_path)
+
+    def save_snapshot(self, dir_path: str) -> bool:
+        """ _summary_ Saves the clock, narration and every agent's memory to a snapshot directory
+
+        Args:
+            dir_path (str): Snapshot directory
+
+        Returns:
+            bool: True if the snapshot was saved, False otherwise
+        """
+        if len(dir_path) == 0:
+            error("Unable to save snapshot - no %s configured" % SNAPSHOT_DIR_CONFIG)
+            return False
+
+        start_time = perf_counter()
+        makedirs(dir_path, exist_ok=True)
+        self.agent_mgr.save_to_dir(dir_path)
+        self.narrator.save_to_file(path.join(dir_path, NARRATOR_SNAPSHOT_FILE))
+
+        # manifest is written last, so a partially written snapshot is never restored
+        with open(path.join(dir_path, SNAPSHOT_MANIFEST_FILE), 'w') as f:
+            dump({'version': SNAPSHOT_VERSION, 'created': now_str(), 'clock': clock.get_state(), 'agents': self.agent_mgr.get_agent_names()}, f)
+
+        info("Saved snapshot to [%s] in [%s] ms" % (dir_path, (perf_counter() - start_time) * 1000))
+        return True
+
+    def restore_snapshot(self, dir_path: str) -> bool:
+        """ _summary_ Restores the clock, narration and every agent's memory from a snapshot directory, without re-embedding anything
+
+        Args:
+            dir_path (str): Snapshot directory
+
+        Returns:
+            bool: True if the snapshot was restored, False otherwise
+        """
+        manifest_file = path.join(dir_path, SNAPSHOT_MANIFEST_FILE)
+        if not path.exists(manifest_file):
+            warn("No snapshot found at [%s]. Starting a new simulation" % dir_path)
+            return False
+
+        start_time = perf_counter()
+        with open(manifest_file, 'r') as f:
+            manifest = load(f)
+        if manifest['version'] != SNAPSHOT_VERSION:
+            error("Unable to restore snapshot [%s] - version [%s] does not match [%s]" % (dir_path, manifest['version'], SNAPSHOT_VERSION))
+            return False
+
+        if not self.agent_mgr.load_from_dir(dir_path):
+            error("Unable to restore agents from snapshot [%s]" % dir_path)
+            return False
+        self.narrator.load_from_file(path.join(dir_path, NARRATOR_SNAPSHOT_FILE))
+        clock.set_state(manifest['clock'])
+
+        info("Restored snapshot from [%s] at [%s] in [%s] ms" % (dir_path, clock.get_datetime_str(), (perf_counter() - start_time) * 1000))
+        return True
 
     def enter_interrogation(self, agent_name: str) -> None:
         agent = self.agent_mgr.agents[agent_name]
@@ -253,7 +487,7 @@ class StoryEngine:
         """
 
         info("%sNarration Change: %s" % ("Manual " if manual else "", event.get_message()))
-        self.public_mem.append(event)
+        self.remember(event)
         self.agent_mgr.dispatch_narration(event)
 
     def manual_narration_change(self, text: str) -> None:
@@ -265,16 +499,32 @@ class StoryEngine:
         event = Event.create_narration_event(self.narrator, text)
         self.dispatch_narration(event, True)
 
+    def dispatch_action(self, event: Event) -> None:
+        """ _summary_ Dispatches an action event, recording the new action of an agent in public memory
+
+        Args:
+            event (Event): Action event
+        """
+        debug("Agent [%s] started action: %s" % (event.get_sender(), event.get_message()))
+        self.remember(event)
+
+    def remember(self, event: Event) -> None:
+        """ _summary_ Records an event in public memory, releasing the oldest event once it is full
+
+        Args:
+            event (Event): Event to record
+        """
+        if self.public_mem.maxlen == 0:
+            return
+        if len(self.public_mem) == self.public_mem.maxlen:
+            self.public_mem.popleft().release()
+        self.public_mem.append(event.retain())
+
     @TimerManager.timer_callback
     def poll_event_queue(self) -> None:
-        """ _summary_ Polls the event queue for new events"""
+        """ _summary_ Polls the event bus, dispatching pending events to their subscribers in batches"""
         # debug("Polling Event Queue")
-        event: Event = None
-        while not self.queue.empty():
-            event = self.queue.get(block=False)
-                
-            debug("Received event:\n\t%s" % event)
-            self.process_event(event)
+        self.queue.drain(self.event_batch_size)
 
         # Is this the right place to do this?
         if self.max_cycles > 0 and self.agent_mgr.get_cycle_count() >= self.max_cycles:
@@ -284,24 +534,10 @@ class StoryEngine:
             info("Stopping after %d days" % clock.get_day_count())
             self.stop()
 
-    def process_event(self, event: Event) -> None:
-        """ _summary_ Processes an event from the event queue
-        
-        Args:
-            event (Event): Event to process
-        """
-        if event.get_event_type() == EventType.NarrationEvent:
-            self.dispatch_narration(event)
-        elif event.get_event_type() == EventType.ActionEvent:
-            self.agent_mgr.dispatch_action_event(event)
-        elif event.get_event_type() == EventType.ChatEvent:
-            self.agent_mgr.dispatch_chat_event(event)
-        else:
-            warn("Unknown event type: %s. Ignoring" % event.get_event_type())
-
     @TimerManager.timer_callback
     def debug_timer(self) -> None:
         """ _summary_ Prints out debug information to see state of simulation on a timer"""
         debug("[DEBUG_TIMER - Engine] Public Memory:\n%s" % self.narrator.get_narration())
+        debug("[DEBUG_TIMER - Engine] Event Bus: %s" % self.queue.get_stats())
         self.narrator.debug_timer()
         self.agent_mgr.debug_timer()
\ No newline at end of file
@@ -0,0 +1,122 @@
+'''
+This module contains the FastForwardRunner class, which steps the story engine in virtual time as fast as compute allows.
+'''
+from heapq import heapify, heappush, heappop
+from time import perf_counter
+from math import floor
+from typing import Callable, List, Set, Tuple
+
+from rtai.utils.timer_manager import TimerManager, PeriodicTask
+from rtai.utils.datetime import datetime
+from rtai.world.clock import clock
+from rtai.utils.logging import info, warn, debug
+
+class FastForwardRunner:
+    """ _summary_ Class to run the timers registered with the TimerManager as a deterministic discrete-event simulation
+
+    Every timer keeps its period, but the periods are measured in virtual time - the runner pops the earliest deadline,
+    runs its callback inline and pushes the next one, without ever sleeping. Timers with equal deadlines run in registration order,
+    so a run replays the same interleaving every time.
+
+    When next_wakeup reports that every agent is idle, the runner only ticks the clock until the reported world time,
+    fast-forwarding the deadlines of the idle timers (agent updates, event polling) past the jump. Any other timer
+    (narration, debug) whose deadline falls inside the jump still cuts it short, so it fires at the same virtual time.
+    """
+
+    def __init__(self, timer_mgr: TimerManager, clock_timer: str, idle_timers: Set[str]=None, next_wakeup: Callable[[], datetime]=None):
+        """ _summary_ Constructor for the FastForwardRunner
+
+        Args:
+            timer_mgr (TimerManager): timer manager holding the periodic tasks to run
+            clock_timer (str): thread ID of the world clock timer
+            idle_timers (Set[str], optional): thread IDs of timers with nothing to do while every agent is idle. Defaults to None.
+            next_wakeup (Callable[[], datetime], optional): returns the world time the agents are idle until, or None if they are not.
+                Defaults to None, which never skips ahead.
+        """
+        self.timer_mgr: TimerManager = timer_mgr
+        self.clock_timer: str = clock_timer
+        self.idle_timers: Set[str] = idle_timers if idle_timers is not None else set()
+        self.next_wakeup: Callable[[], datetime] = next_wakeup
+
+        self.now: float = 0.0 # virtual seconds since the runner started
+        self.terminated: bool = False
+        self.skipped_ticks: int = 0
+        self._order: List[PeriodicTask] = []
+        self._heap: List[Tuple[float, int, PeriodicTask]] = []
+
+    def run(self) -> None:
+        """ _summary_ Step the timers until the runner is stopped """
+        self._order = list(self.timer_mgr.timers.values())
+        for t in self._order:
+            t.next_deadline = t.seconds
+        self._rebuild_heap()
+
+        info("Started fast-forward runner with [%d] periodic tasks" % len(self._order))
+        start_time = perf_counter()
+        try:
+            while not self.terminated and len(self._heap) > 0:
+                if self.next_wakeup is not None:
+                    self._skip_idle()
+
+                deadline, rank, task = heappop(self._heap)
+                self.now = deadline
+                self._step(task)
+                if self.terminated:
+                    break
+                task.next_deadline = deadline + task.seconds
+                heappush(self._heap, (task.next_deadline, rank, task))
+        finally:
+            elapsed = perf_counter() - start_time
+            info("Fast-forwarded [%.1f] virtual seconds in [%.1f] seconds, skipping [%d] idle clock ticks" % (self.now, elapsed, self.skipped_ticks))
+            [info("Timer stats: %s" % t) for t in self._order]
+
+    def stop(self) -> None:
+        """ _summary_ Stop stepping the timers """
+        self.terminated = True
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [(t.next_deadline, i, t) for i, t in enumerate(self._order)]
+        heapify(self._heap)
+
+    def _step(self, task: PeriodicTask) -> None:
+        """ _summary_ Run one step of a timer inline, recording its latency
+
+        Args:
+            task (PeriodicTask): timer to run
+        """
+        start_time = perf_counter()
+        try:
+            task.callback()
+        except Exception as err:
+            warn("Timer [%s] callback raised: %s" % (task.thread_id, err))
+        task.latency.record((perf_counter() - start_time) * 1000)
+        task.runs += 1
+
+    def _skip_idle(self) -> None:
+        """ _summary_ While every agent is idle, tick the clock up to the next wakeup without running the idle timers """
+        wakeup = self.next_wakeup()
+        if wakeup is None or self.clock_timer not in self.timer_mgr.timers:
+            return
+
+        clock_task = self.timer_mgr.timers[self.clock_timer]
+        limit = min((t.next_deadline for t in self._order if t is not clock_task and t.thread_id not in self.idle_timers), default=float('inf'))
+
+        ticks = 0
+        while not self.terminated and clock.peek() < wakeup and clock_task.next_deadline < limit:
+            self.now = clock_task.next_deadline
+            self._step(clock_task)
+            clock_task.next_deadline += clock_task.seconds
+            ticks += 1
+        if ticks == 0:
+            return
+
+        # the idle timers had nothing to do during the jump - drop the deadlines that passed
+        for t in self._order:
+            if t.thread_id in self.idle_timers and t.next_deadline < self.now:
+                missed = int(floor((self.now - t.next_deadline) / t.seconds)) + 1
+                t.skipped += missed
+                t.next_deadline += missed * t.seconds
+        self._rebuild_heap()
+
+        self.skipped_ticks += ticks
+        debug("Fast-forwarded [%d] clock ticks to [%s] while all agents were idle" % (ticks, clock.get_datetime_str()))
@@ -1,4 +1,6 @@
 from time import perf_counter
+from json import dump, load
+from os import path
 from typing import List
 from queue import Queue
 
@@ -7,6 +9,7 @@ from rtai.utils.config import Config
 from rtai.core.event import Event
 from rtai.utils.timer_manager import TimerManager
 from rtai.utils.logging import info, debug, log_transcript
+from rtai.utils.stats import profiler
 from rtai.llm.llm_client import LLMClient
 from rtai.world.clock import clock
 from rtai.agent.agent_manager import AgentManager
@@ -48,13 +51,14 @@ class Narrator(AbstractAgent):
         log_transcript('Narrator', clock.get_time_str(), 'Auto', completion)
 
         elapsed_time = perf_counter() - start_time
+        profiler.record(self.get_name(), 'narrate', elapsed_time * 1000)
 
         event = Event.create_narration_event(self, completion)
 
         info("Narrator [%s] took [%s] ms for generate_narration()" % (self.get_name(), elapsed_time * 1000))
         
+        self.narration.append(event.retain())
         self.queue.put(event)
-        self.narration.append(event)
 
         self._counter += 1
         return event
@@ -71,8 +75,8 @@ class Narrator(AbstractAgent):
         TODO : If manual narration triggered, restart generate_narration timer thread
         """
         event = Event.create_narration_event(self, narration)
+        self.narration.append(event.retain())
         self.queue.put(event)
-        self.narration.append(event)
         
         self._counter += 1
         return event
@@ -117,7 +121,8 @@ class Narrator(AbstractAgent):
         Args:
             file_path (str): File path to save to
         """
-        pass
+        with open(file_path, 'w') as f:
+            dump({'counter': self._counter, 'narration': [e.get_message() for e in self.narration]}, f)
     
     def load_from_file(self, file_path: str) -> bool:
         """ _summary_ Load the narrator's state from a file
@@ -128,4 +133,11 @@ class Narrator(AbstractAgent):
         Returns:
             bool: True if loaded successfully, False otherwise
         """
-        pass
\ No newline at end of file
+        if not path.exists(file_path):
+            return False
+
+        with open(file_path, 'r') as f:
+            state = load(f)
+        self.narration = [Event.create_narration_event(self, msg) for msg in state['narration']]
+        self._counter = state['counter']
+        return True
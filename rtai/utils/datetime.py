@@ -1,4 +1,7 @@
 from datetime import datetime as pydatetime, timedelta as pytimedelta
+from calendar import timegm
+from functools import lru_cache
+from time import time
 from typing import TypeAlias
 
 timedelta: TypeAlias = pytimedelta
@@ -13,8 +16,31 @@ def now_str() -> str:
     """
     return pydatetime.utcnow().strftime("%m%d%Y_%H:%M:%S")
 
+EPOCH: pydatetime = pydatetime(1970, 1, 1)
+SEC_PER_MIN: int = 60
+SEC_PER_HOUR: int = 3600
+SEC_PER_DAY: int = 86400
+
+_new = object.__new__
+
+@lru_cache(maxsize=4096)
+def _format(seconds: int, format: str) -> str:
+    """ _summary_ Format epoch seconds - the clock only moves forward, so every string is formatted once per tick"""
+    return (EPOCH + timedelta(seconds=seconds)).strftime(format)
+
 class datetime:
-    """ _summary_ Wrapper class for working with datetime objects """
+    """ _summary_ Class for working with simulation date/times, stored as whole epoch seconds (UTC)
+
+    Copies, additions and comparisons are integer operations on a single slot, and string formatting is cached.
+    """
+
+    __slots__ = ['_seconds']
+
+    @classmethod
+    def _from_seconds(cls, seconds: int) -> 'datetime':
+        o = _new(cls)
+        o._seconds = seconds
+        return o
 
     @classmethod
     def now(cls) -> 'datetime':
@@ -23,9 +49,7 @@ class datetime:
         Returns:
             datetime: datetime object with the current UTC time
         """
-        o = cls.__new__(cls)
-        o._data: pydatetime = pydatetime.utcnow()
-        return o
+        return cls._from_seconds(int(time()))
     
     @classmethod
     def strptime(cls, datetime_str: str, format: str='%Y-%m-%d %I:%M:%S %p') -> 'datetime':
@@ -38,17 +62,29 @@ class datetime:
         Returns:
             datetime: datetime object from the input string
         """
-        o = cls.__new__(cls)
-        o._data = pydatetime.strptime(datetime_str, format)
-        return o
+        return cls._from_seconds(timegm(pydatetime.strptime(datetime_str, format).utctimetuple()))
     
+    @classmethod
+    def fromtimestamp(cls, seconds: int) -> 'datetime':
+        """ _summary_ Factory method to generate a datetime object from epoch seconds
+
+        Args:
+            seconds (int): seconds since the epoch (UTC)
+
+        Returns:
+            datetime: datetime object at the input epoch seconds
+        """
+        return cls._from_seconds(int(seconds))
+
     def copy(self) -> 'datetime':
         """ _summary_ Copy the datetime object
         
         Returns:
             datetime: copy of the datetime object
         """
-        return datetime(self)
+        o = _new(datetime)
+        o._seconds = self._seconds
+        return o
 
     def __init__(self, other: 'datetime'):
         """ _summary_ Constructor for the datetime object
@@ -56,7 +92,7 @@ class datetime:
         Args:
             other (datetime): datetime object to copy
         """
-        self._data = other._data
+        self._seconds = other._seconds
 
     def get_time_str(self) -> str:
         """ _summary_ Get a string representation of the time
@@ -64,7 +100,7 @@ class datetime:
         Returns:
             str: string representation of the time
         """
-        return self._data.strftime("%I:%M:%S %p")
+        return _format(self._seconds, "%I:%M:%S %p")
 
     def get_date_str(self) -> str:
         """ _summary_ Get a string representation of the date
@@ -72,7 +108,7 @@ class datetime:
         Returns:
             str: string representation of the date
         """
-        return self._data.strftime("%Y-%m-%d")
+        return _format(self._seconds - self._seconds % SEC_PER_DAY, "%Y-%m-%d")
 
     def get_datetime_str(self, show_seconds: bool=True) -> str:
         """ _summary_ Get a string representation of the datetime
@@ -80,7 +116,7 @@ class datetime:
         Args:
             show_seconds (bool, optional): whether or not to show the seconds. Defaults to True.
         """
-        return self._data.strftime("%Y-%m-%d %I:%M:%S %p") if show_seconds else self._data.strftime("%Y-%m-%d %I:%M %p")
+        return _format(self._seconds, "%Y-%m-%d %I:%M:%S %p") if show_seconds else _format(self._seconds - self._seconds % SEC_PER_MIN, "%Y-%m-%d %I:%M %p")
 
     def get_date_with_time_str(self, time_str: str) -> str:
         """ _summary_ Get a string representation of the datetime with the input time
@@ -96,13 +132,11 @@ class datetime:
         Args:
             seconds (int): number of seconds to increment by
         """
-        self._data += timedelta(seconds=seconds)
-        # self._data += timedelta64(1, 's')
+        self._seconds += seconds
 
     def increment_minute(self) -> None:
         """ _summary_ Increment the datetime by 1 minute """
-        self._data += timedelta(minutes=1)
-        # self._data += timedelta64(1, 'm')
+        self._seconds += SEC_PER_MIN
 
     def increment_time(self, hours: int=0, minutes: int=0) -> None:
         """ _summary_ Increment the datetime by the input number of hours and minutes
@@ -111,8 +145,7 @@ class datetime:
             hours (int, optional): number of hours to increment by. Defaults to 0.
             minutes (int, optional): number of minutes to increment by. Defaults to 0.
         """
-        self._data += timedelta(hours=hours, minutes=minutes)
-        # self._data += timedelta64(hours, 'h') + timedelta64(minutes, 'm')
+        self._seconds += hours * SEC_PER_HOUR + minutes * SEC_PER_MIN
 
     def get_timedelta_from_time_str(self, time_str: str) -> timedelta:
         """ _summary_ Get a timedelta object from the input time string
@@ -123,15 +156,31 @@ class datetime:
         Returns:
             timedelta: timedelta object from the input time string
         """
-        return pydatetime.strptime(time_str, "%H:%M").replace(month=self._data.month, day=self._data.day, year=self._data.year) - self._data
-        # return pydatetime.strptime(time_str, "%I:%M %p").replace(month=self._data.month, day=self._data.day, year=self._data.year) - self._data
+        time_of_day = pydatetime.strptime(time_str, "%H:%M")
+        return timedelta(seconds=self._seconds - self._seconds % SEC_PER_DAY + time_of_day.hour * SEC_PER_HOUR + time_of_day.minute * SEC_PER_MIN - self._seconds)
+
+    def timestamp(self) -> int:
+        """ _summary_ Get the datetime as whole epoch seconds (UTC)
+
+        Returns:
+            int: seconds since the epoch
+        """
+        return self._seconds
+
+    def get_second(self) -> int:
+        """ _summary_ Get the seconds of the minute
+
+        Returns:
+            int: seconds of the minute
+        """
+        return self._seconds % SEC_PER_MIN
 
     def get_datetime_raw(self) -> pydatetime:
         """ _summary_ Get the raw datetime object
         
         Returns:
             datetime: raw datetime object"""
-        return self._data
+        return EPOCH + timedelta(seconds=self._seconds)
     
     def replace_time(self, seconds: int=None, minutes: int=None, hours: int=None) -> None:
         """ _summary_ Replace the time of the datetime with the input values
@@ -142,11 +191,11 @@ class datetime:
             hours (int, optional): hours to replace the time with. Defaults to None.
         """
         if seconds:
-            self._data = self._data.replace(second=seconds)
+            self._seconds += seconds - self._seconds % SEC_PER_MIN
         if minutes:
-            self._data = self._data.replace(minute=minutes)
+            self._seconds += (minutes - self._seconds % SEC_PER_HOUR // SEC_PER_MIN) * SEC_PER_MIN
         if hours:
-            self._data = self._data.replace(hour=hours)
+            self._seconds += (hours - self._seconds % SEC_PER_DAY // SEC_PER_HOUR) * SEC_PER_HOUR
 
     def calc_timedelta_diff(self, other: 'datetime') -> timedelta:
         """ _summary_ Calculate the timedelta difference between the input datetime and the current datetime
@@ -157,16 +206,19 @@ class datetime:
         Returns:
             timedelta: timedelta difference between the input datetime and the current datetime
         """
-        return self._data - other._data
+        return timedelta(seconds=self._seconds - other._seconds)
 
     def __eq__(self, other: 'datetime') -> bool:
-        return self._data == other._data
+        return self._seconds == other._seconds
 
     def __lt__(self, other: 'datetime') -> bool:
-        return self._data < other._data
+        return self._seconds < other._seconds
     
     def __le__(self, other: 'datetime') -> bool:
-        return self == other or self < other
+        return self._seconds <= other._seconds
+
+    def __hash__(self) -> int:
+        return self._seconds
 
     def __str__(self) -> str:
         return self.get_datetime_str()
@@ -175,8 +227,9 @@ class datetime:
         return self.__str__()
     
     def __add__(self, other: timedelta) -> 'datetime':
-        o = datetime(self)
-        o._data += other
+        # whole seconds, like the timestamps
+        o = _new(datetime)
+        o._seconds = self._seconds + other.days * SEC_PER_DAY + other.seconds
         return o
     
 #     _data: datetime64
@@ -1,16 +1,28 @@
 
 from os import path, makedirs
-from sys import stdout
-from inspect import stack
+from sys import stdout, _getframe
+from atexit import register
+from queue import SimpleQueue, Empty
+from threading import Thread
+from typing import Dict, List, Tuple
 
-from logging import info as log_info, debug as log_debug, error as log_error, warning as log_warn
-from logging import basicConfig, getLogger, StreamHandler, Formatter, FileHandler, Formatter, INFO
+from logging import getLogger, StreamHandler, Formatter, FileHandler, Handler, LogRecord, INFO, DEBUG, WARNING, ERROR
+from logging.handlers import QueueHandler
+import logging
 
 from rtai.utils.datetime import now_str
+from rtai.utils.transcript import TranscriptWriter
 
 # TODO wrap in a class and setup instance in __init__.py, then reroute all logging calls to use instance
 USE_CALLEE_STACK = False
 t_logger = None
+log_writer = None
+_clock = None # world clock, looked up on the first transcript line
+
+LOG_WRITER_BATCH_SIZE = 256 # max records written between two flushes
+
+root_logger = getLogger()
+caller_cache: Dict[Tuple[object, int], str] = dict()
 
 # class LogFormatter(Formatter):
 #     def format(self, record):
@@ -45,9 +57,120 @@ class TranscriptFormatter(Formatter):
         formatted_message = f"[{custom_time}] [{custom_name}] [{custom_type}] {record.getMessage()}"
         return formatted_message
 
-def setup_logging(log_dir: str, log_name: str, log_level: int, transcript_log_name: str='', use_callee_stack: bool=False, log_stdout_pipe: bool=False) -> None:
+class LogFormatter(Formatter):
+    """ _summary_ Formatter prefixing the message with the calling class and method when they were captured """
+
+    def formatMessage(self, record: LogRecord) -> str:
+        """ _summary_ Format the log message """
+        caller = getattr(record, 'caller', None)
+        if caller is not None:
+            record.message = "[%s] %s" % (caller, record.message)
+        return super().formatMessage(record)
+
+class BatchedFlush:
+    """ _summary_ Mixin for stream handlers leaving the flushes to the log writer, once per batch of records """
+
+    def flush(self) -> None:
+        pass
+
+    def flush_batch(self) -> None:
+        super().flush()
+
+class BatchedStreamHandler(BatchedFlush, StreamHandler):
+    pass
+
+class BatchedFileHandler(BatchedFlush, FileHandler):
+    pass
+
+class StructuredTranscriptHandler(Handler):
+    """ _summary_ Handler appending transcript records to a structured binary transcript - see rtai.utils.transcript"""
+
+    def __init__(self, base_path: str):
+        """ _summary_ Constructor for the StructuredTranscriptHandler
+
+        Args:
+            base_path (str): path of the transcript files, without extension
+        """
+        super().__init__(INFO)
+        self.writer: TranscriptWriter = TranscriptWriter(base_path)
+
+    def emit(self, record: LogRecord) -> None:
+        self.writer.append(getattr(record, 'sim_time', 0), getattr(record, 'custom_name', ''), getattr(record, 'custom_type', ''), record.getMessage(),
+                           getattr(record, 'event_time', None))
+
+    def flush(self) -> None:
+        self.writer.flush()
+
+    def close(self) -> None:
+        self.writer.close()
+        super().close()
+
+class LazyQueueHandler(QueueHandler):
+    """ _summary_ Queue handler enqueuing records as is - the message is formatted by the log writer, not the logging thread
+
+    Arguments are formatted when the record is written, so objects logged with %-style arguments should not be mutated after the call.
+    """
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        return record
+
+class LogWriter(Thread):
+    """ _summary_ Background thread writing the queued log records
+
+    Threads logging only put their record on a queue. The writer takes the queued records in batches, hands each to
+    the handlers of its logger and flushes the handlers once per batch.
+    """
+
+    def __init__(self, routes: Dict[str, List[Handler]], batch_size: int=LOG_WRITER_BATCH_SIZE):
+        """ _summary_ Constructor for the LogWriter
+
+        Args:
+            routes (Dict[str, List[Handler]]): handlers of the records of each logger name, '' for every record
+            batch_size (int, optional): maximum number of records written between two flushes. Defaults to LOG_WRITER_BATCH_SIZE.
+        """
+        super().__init__(name='LogWriter', daemon=True)
+        self.queue: SimpleQueue = SimpleQueue()
+        self.routes: Dict[str, List[Handler]] = routes
+        self.batch_size: int = batch_size
+        self.handlers: List[Handler] = list({id(h): h for handlers in routes.values() for h in handlers}.values())
+        self.written: int = 0
+        self.batches: int = 0
+
+    def run(self) -> None:
+        """ _summary_ Write batches of records until a None record is queued by stop() """
+        every_record = self.routes.get('', [])
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.queue.get_nowait())
+            except Empty:
+                pass
+
+            for record in batch:
+                if record is None:
+                    running = False
+                    continue
+                for handler in every_record + self.routes.get(record.name, []):
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            [h.flush_batch() if isinstance(h, BatchedFlush) else h.flush() for h in self.handlers]
+            self.written += len(batch)
+            self.batches += 1
+
+    def stop(self) -> None:
+        """ _summary_ Write every queued record, then stop the writer """
+        self.queue.put(None)
+        self.join()
+        [h.close() for h in self.handlers]
+
+def setup_logging(log_dir: str, log_name: str, log_level: int, transcript_log_name: str='', use_callee_stack: bool=False, log_stdout_pipe: bool=False,
+                  structured_transcript: bool=False) -> None:
     """ _summary_ Setup the logging for the agent
 
+    Records are queued by the logging threads and written by a background LogWriter, see shutdown_logging().
+
     Args:
         log_dir (str): directory to store the log files
         log_name (str): name of the log file
@@ -55,58 +178,92 @@ def setup_logging(log_dir: str, log_name: str, log_level: int, transcript_log_na
         transcript_log_name (str, optional): name of the transcript log file. Defaults to ''.
         use_callee_stack (bool, optional): whether or not to use the callee stack to get the calling class and method. Defaults to False.
         log_stdout_pipe (bool, optional): whether or not to pipe the log to stdout. Defaults to False.
+        structured_transcript (bool, optional): whether or not to also write the transcript in the indexed binary format of rtai.utils.transcript. Defaults to False.
     """
+    global USE_CALLEE_STACK, t_logger, log_writer
     if not path.exists(log_dir):
         makedirs(log_dir)
+    shutdown_logging()
+
+    USE_CALLEE_STACK = use_callee_stack
 
     log_fmt = '[%(asctime)s] [%(levelname)s] [%(threadName)s] %(message)s'
-    basicConfig(filename='%s/%s_%s.log' % (log_dir, log_name, now_str()), filemode='w', format=log_fmt, 
-                        level=log_level)
-    
-    if use_callee_stack:
-        global USE_CALLEE_STACK 
-        USE_CALLEE_STACK = True
-    
+    handlers: List[Handler] = [BatchedFileHandler(filename='%s/%s_%s.log' % (log_dir, log_name, now_str()), mode='w')]
     if log_stdout_pipe:
-        logger = getLogger()
-        logger.setLevel(log_level)
-        handler = StreamHandler(stdout)
+        handlers.append(BatchedStreamHandler(stdout))
+    for handler in handlers:
         handler.setLevel(log_level)
-        formatter = Formatter(log_fmt)
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        handler.setFormatter(LogFormatter(log_fmt))
+    routes: Dict[str, List[Handler]] = {'': handlers}
 
     if len(transcript_log_name) > 0:
-        global t_logger
-        handler = FileHandler(filename='%s/%s_%s.log' % (log_dir, transcript_log_name, now_str()))   
+        # transcript records also propagate to the main log
+        handler = BatchedFileHandler(filename='%s/%s_%s.log' % (log_dir, transcript_log_name, now_str()))
         handler.setLevel(INFO)
-        formatter = TranscriptFormatter()
-        handler.setFormatter(formatter)
+        handler.setFormatter(TranscriptFormatter())
+        routes['transcript'] = [handler]
+        if structured_transcript:
+            routes['transcript'].append(StructuredTranscriptHandler('%s/%s_%s' % (log_dir, transcript_log_name, now_str())))
 
         t_logger = getLogger('transcript')
         t_logger.setLevel(INFO)
-        t_logger.addHandler(handler)
         # COLOR CODING ONLY WORKS FOR CONSOLE OUTPUT
         # ch = StreamHandler()
         # ch.setLevel(INFO)
         # ch.setFormatter(formatter)
         # t_logger.addHandler(ch)
 
-def get_caller_details() -> str:
+    log_writer = LogWriter(routes)
+    log_writer.start()
+    root_logger.setLevel(log_level)
+    root_logger.addHandler(LazyQueueHandler(log_writer.queue))
+    # the calling class and method are captured by info/debug/warn/error, so logging does not need to walk the stack of every record
+    logging._srcfile = None
+    register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """ _summary_ Write every queued log record and stop the background log writer
+
+    Runs at exit - processes ending with os._exit (e.g. multiprocessing children) must call it themselves.
+    """
+    global log_writer
+    if log_writer is None:
+        return
+    [root_logger.removeHandler(h) for h in list(root_logger.handlers) if isinstance(h, LazyQueueHandler)]
+    log_writer.stop()
+    log_writer = None
+
+def get_caller_details(frame=None) -> str:
     """ _summary_ Get the details of the calling class and method
+
+    Details are cached per code object and line, so a call site only builds its string once.
+
+    Args:
+        frame (FrameType, optional): frame of the caller. Defaults to the caller of the function calling get_caller_details().
     
     Returns:
         str: string representation of the calling class and method
     """
-    call_stack = stack()
-    try:
-        calling_class = call_stack[2][0].f_locals["self"].__class__.__name__
-    except KeyError:
-        calling_class = call_stack[2][1].split('/')[-1]
-        
-    calling_method = call_stack[2][0].f_code.co_name
-    line_number = call_stack[2][2]
-    return "%s::%s::%s" % (calling_class, calling_method, line_number)
+    frame = frame if frame is not None else _getframe(2)
+    code = frame.f_code
+    line_number = frame.f_lineno
+    details = caller_cache.get((code, line_number))
+    if details is None:
+        qualname = getattr(code, 'co_qualname', code.co_name).split('.<locals>.')[-1]
+        calling_class, _, calling_method = qualname.rpartition('.')
+        if len(calling_class) == 0:
+            calling_class = code.co_filename.split('/')[-1]
+        details = "%s::%s::%s" % (calling_class, calling_method, line_number)
+        caller_cache[(code, line_number)] = details
+    return details
+
+def _log(level: int, msg, args, kwargs) -> None:
+    """ _summary_ Log a message from the caller of info/debug/warn/error """
+    if not root_logger.isEnabledFor(level):
+        return
+    if USE_CALLEE_STACK:
+        kwargs['extra'] = dict(kwargs.get('extra') or {}, caller=get_caller_details(_getframe(2)))
+    root_logger.log(level, msg, *args, **kwargs)
 
 def info(msg, *args, **kwargs):
     """ _summary_ Log an info message
@@ -116,7 +273,7 @@ def info(msg, *args, **kwargs):
         args (list): arguments for the message
         kwargs (dict): keyword arguments for the message
     """
-    log_info(msg if not USE_CALLEE_STACK else "[%s] %s" % (get_caller_details(), msg), *args, **kwargs)
+    _log(INFO, msg, args, kwargs)
 
 def debug(msg, *args, **kwargs):
     """ _summary_ Log a debug message
@@ -126,7 +283,7 @@ def debug(msg, *args, **kwargs):
         args (list): arguments for the message
         kwargs (dict): keyword arguments for the message
     """
-    log_debug(msg if not USE_CALLEE_STACK else "[%s] %s" % (get_caller_details(), msg), *args, **kwargs)
+    _log(DEBUG, msg, args, kwargs)
 
 def warn(msg, *args, **kwargs):
     """ _summary_ Log a warning message
@@ -136,7 +293,7 @@ def warn(msg, *args, **kwargs):
         args (list): arguments for the message
         kwargs (dict): keyword arguments for the message
     """
-    log_warn(msg if not USE_CALLEE_STACK else "[%s] %s" % (get_caller_details(), msg), *args, **kwargs)
+    _log(WARNING, msg, args, kwargs)
 
 def error(msg, *args, **kwargs):
     """ _summary_ Log an error message
@@ -146,9 +303,18 @@ def error(msg, *args, **kwargs):
         args (list): arguments for the message
         kwargs (dict): keyword arguments for the message
     """
-    log_error(msg if not USE_CALLEE_STACK else "[%s] %s" % (get_caller_details(), msg), *args, **kwargs)
+    _log(ERROR, msg, args, kwargs)
+
+def _sim_now() -> int:
+    """ _summary_ Get the current simulation time in epoch seconds, 0 until the world clock is set up"""
+    global _clock
+    if _clock is None:
+        # the clock logs through this module, so it can only be imported once both are loaded
+        from rtai.world.clock import clock
+        _clock = clock
+    return _clock.clock.timestamp() if hasattr(_clock, 'clock') else 0
 
-def log_transcript(sender, time, event, msg):
+def log_transcript(sender, time, event, msg, event_time=None):
     """ _summary_ Log a transcript message
     
     Args:
@@ -156,6 +322,10 @@ def log_transcript(sender, time, event, msg):
         time (str): time of the message
         event (str): event of the message
         msg (str): message to log
+        event_time (datetime | int, optional): simulation time the message is about (e.g. the start of an action), as a datetime or epoch seconds.
+            The message is still stamped with the current world time. Defaults to the current world time.
     """
     if t_logger:
-        t_logger.info(msg, extra={'custom_name': sender, 'custom_time': time, 'custom_type': event})
\ No newline at end of file
+        if hasattr(event_time, 'timestamp'):
+            event_time = event_time.timestamp()
+        t_logger.info(msg, extra={'custom_name': sender, 'custom_time': time, 'custom_type': event, 'sim_time': _sim_now(), 'event_time': event_time})
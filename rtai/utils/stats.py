@@ -0,0 +1,219 @@
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from json import dump
+from threading import Lock
+from time import perf_counter
+from typing import Deque, Dict, Iterator, List
+
+DEFAULT_WINDOW = 1024
+# Upper bounds of the latency histogram buckets, samples above the last bound fall in an overflow bucket
+HISTOGRAM_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+class LatencyStats:
+    """ _summary_ Class to track latency samples (in milliseconds) for a hot path
+
+    Keeps running totals and a fixed bucket histogram over every sample recorded, and a bounded window of the most recent samples for percentiles.
+    """
+
+    def __init__(self, window: int=DEFAULT_WINDOW):
+        """ _summary_ Constructor for the LatencyStats
+
+        Args:
+            window (int, optional): number of most recent samples kept for percentiles. Defaults to DEFAULT_WINDOW.
+        """
+        self._lock: Lock = Lock()
+        self._window: Deque[float] = deque(maxlen=window)
+        self.count: int = 0
+        self.total_ms: float = 0.0
+        self.min_ms: float = 0.0
+        self.max_ms: float = 0.0
+        self.last_ms: float = 0.0
+        self.buckets: List[int] = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+
+    def record(self, elapsed_ms: float) -> None:
+        """ _summary_ Record a latency sample
+
+        Args:
+            elapsed_ms (float): elapsed time of the sample in milliseconds
+        """
+        with self._lock:
+            if self.count == 0 or elapsed_ms < self.min_ms:
+                self.min_ms = elapsed_ms
+            if elapsed_ms > self.max_ms:
+                self.max_ms = elapsed_ms
+            self.count += 1
+            self.total_ms += elapsed_ms
+            self.last_ms = elapsed_ms
+            self._window.append(elapsed_ms)
+            self.buckets[bisect_left(HISTOGRAM_BUCKETS_MS, elapsed_ms)] += 1
+
+    def mean(self) -> float:
+        """ _summary_ Get the mean latency over all samples
+
+        Returns:
+            float: mean latency in milliseconds, 0 if there are no samples
+        """
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """ _summary_ Get a percentile of the latency over the recent window
+
+        Args:
+            pct (float): percentile to compute, between 0 and 100
+
+        Returns:
+            float: latency at the given percentile in milliseconds, 0 if there are no samples
+        """
+        with self._lock:
+            samples = sorted(self._window)
+        if not samples:
+            return 0.0
+        idx = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[idx]
+
+    def reset(self) -> None:
+        """ _summary_ Clear all recorded samples """
+        with self._lock:
+            self._window.clear()
+            self.count = 0
+            self.total_ms = 0.0
+            self.min_ms = 0.0
+            self.max_ms = 0.0
+            self.last_ms = 0.0
+            self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+
+    def histogram(self) -> Dict[str, int]:
+        """ _summary_ Get the number of samples in each latency bucket over all samples
+
+        Returns:
+            Dict[str, int]: sample count keyed by the bucket upper bound, in increasing order
+        """
+        labels = ['<=%gms' % bound for bound in HISTOGRAM_BUCKETS_MS] + ['>%gms' % HISTOGRAM_BUCKETS_MS[-1]]
+        with self._lock:
+            return dict(zip(labels, self.buckets))
+
+    def as_dict(self) -> Dict[str, float]:
+        """ _summary_ Get a summary of the latency samples
+
+        Returns:
+            Dict[str, float]: summary of the recorded samples
+        """
+        return {
+            'count': self.count,
+            'mean_ms': self.mean(),
+            'min_ms': self.min_ms,
+            'max_ms': self.max_ms,
+            'last_ms': self.last_ms,
+            'p50_ms': self.percentile(50),
+            'p99_ms': self.percentile(99),
+        }
+
+    def __str__(self) -> str:
+        return "count=%d mean=%.3fms p50=%.3fms p99=%.3fms max=%.3fms" % (self.count, self.mean(), self.percentile(50), self.percentile(99), self.max_ms)
+
+    def __repr__(self) -> str:
+        return str(self)
+
+class Profiler:
+    """ _summary_ Class to aggregate the latency of named sections, grouped by scope
+
+    A scope is usually an agent name (perceive, retrieve, act, chat, reflect, encode and search sections)
+    or a shared component such as 'llm' (one section per prompt template). Stats are created on first use.
+    """
+
+    def __init__(self, window: int=DEFAULT_WINDOW):
+        """ _summary_ Constructor for the Profiler
+
+        Args:
+            window (int, optional): number of most recent samples kept for percentiles of each section. Defaults to DEFAULT_WINDOW.
+        """
+        self._lock: Lock = Lock()
+        self.window: int = window
+        self.enabled: bool = True
+        self.sections: Dict[str, Dict[str, LatencyStats]] = dict()
+
+    def get(self, scope: str, name: str) -> LatencyStats:
+        """ _summary_ Get the latency stats of a section, creating them if needed
+
+        Args:
+            scope (str): scope of the section
+            name (str): name of the section
+
+        Returns:
+            LatencyStats: latency stats of the section
+        """
+        stats = self.sections.get(scope, {}).get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.sections.setdefault(scope, dict()).setdefault(name, LatencyStats(self.window))
+        return stats
+
+    def record(self, scope: str, name: str, elapsed_ms: float) -> None:
+        """ _summary_ Record a latency sample of a section
+
+        Args:
+            scope (str): scope of the section
+            name (str): name of the section
+            elapsed_ms (float): elapsed time of the sample in milliseconds
+        """
+        if self.enabled:
+            self.get(scope, name).record(elapsed_ms)
+
+    @contextmanager
+    def measure(self, scope: str, name: str) -> Iterator[None]:
+        """ _summary_ Context manager recording the time spent in its block as a sample of a section
+
+        Args:
+            scope (str): scope of the section
+            name (str): name of the section
+        """
+        start_time = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(scope, name, (perf_counter() - start_time) * 1000)
+
+    def get_stats(self) -> Dict[str, Dict[str, dict]]:
+        """ _summary_ Get a summary of every section, with its histogram
+
+        Returns:
+            Dict[str, Dict[str, dict]]: summary of the sections keyed by scope then section name
+        """
+        with self._lock:
+            sections = {scope: dict(stats) for scope, stats in self.sections.items()}
+        return {scope: {name: dict(stats.as_dict(), histogram=stats.histogram()) for name, stats in sorted(stats.items())}
+                for scope, stats in sorted(sections.items())}
+
+    def reset(self) -> None:
+        """ _summary_ Forget every section """
+        with self._lock:
+            self.sections = dict()
+
+    def dump(self, file_path: str, stats: Dict[str, Dict[str, dict]]=None) -> None:
+        """ _summary_ Write a summary of every section to a json file
+
+        Args:
+            file_path (str): path of the file to write
+            stats (Dict[str, Dict[str, dict]], optional): summary to write. Defaults to the summary of this profiler.
+        """
+        with open(file_path, 'w') as f:
+            dump(stats if stats is not None else self.get_stats(), f, indent=2)
+
+def format_profile(stats: Dict[str, Dict[str, dict]]) -> str:
+    """ _summary_ Format a profiler summary as a table, one line per section
+
+    Args:
+        stats (Dict[str, Dict[str, dict]]): summary returned by Profiler.get_stats
+
+    Returns:
+        str: formatted table
+    """
+    lines = ["%-20s %-24s %8s %10s %10s %10s %10s" % ('scope', 'section', 'count', 'mean_ms', 'p50_ms', 'p99_ms', 'max_ms')]
+    for scope, sections in stats.items():
+        for name, s in sections.items():
+            lines.append("%-20s %-24s %8d %10.3f %10.3f %10.3f %10.3f" % (scope, name, s['count'], s['mean_ms'], s['p50_ms'], s['p99_ms'], s['max_ms']))
+    return "\n".join(lines)
+
+# Process-wide profiler of the agent cycle
+profiler = Profiler()
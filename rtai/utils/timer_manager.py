@@ -1,96 +1,155 @@
-from threading import Timer as Thread_Timer
+from threading import Thread, Condition, Event, current_thread
+from heapq import heappush, heappop
 from numpy import uint16
-from dataclasses import dataclass
-from typing import Callable, Dict
-from time import time
+from typing import Callable, Dict, List, Tuple
+from time import perf_counter
+from math import floor
 
-from rtai.utils.logging import info, warn
+from rtai.utils.logging import info, warn, debug
+from rtai.utils.stats import LatencyStats
 
-@dataclass
-class TimerWrapper:
-    """ _summary_ Wrapper class for a timer object"""
+SCHEDULER_THREAD_NAME = 'TimerSchedulerThread'
+
+class PeriodicTask:
+    """ _summary_ Class to represent a periodic task driven by the TimerManager
+
+    The task runs on its own worker thread (named after the task, so logs keep their thread names),
+    which is created once and reused for every run.
+    """
 
     def __init__(self, thread_id: str, seconds: float, callback: Callable):
-        """ _summary_ Constructor for the TimerWrapper
-        
+        """ _summary_ Constructor for the PeriodicTask
+
         Args:
-            thread_id (str): ID of the thread
-            seconds (float): number of seconds for the timer
-            callback (Callable): callback function to call when the timer expires
-            timer (Thread_Timer): timer object
+            thread_id (str): ID of the task, also the name of its worker thread
+            seconds (float): period of the task in seconds
+            callback (Callable): callback function to call every period
         """
         self.thread_id: str = thread_id
         self.seconds: float = seconds
         self.callback: Callable = callback
-        self.timer: Thread_Timer = None
-        self.remaining: float = seconds
-        self.start_time: time = None
-        self.is_paused: bool = False
-
-    def pause(self):
-        if self.timer:
-            self.timer.cancel()
-            self.remaining -= time() - self.start_time
-            self.timer = None
-            self.is_paused = True
-        else:
-            warn("Failed to pause timer %s - not yet running." % self.thread_id)
 
-    def resume(self):
-        if not self.timer:
-            self.is_paused = False
-            self.start()
-        else:
-            warn("Failed to resume timer %s - already running." % self.thread_id)
+        self.next_deadline: float = 0.0
+        self.remaining: float = seconds # time left until the next deadline while paused
+        self.version: int = 0 # bumped whenever the task is rescheduled, to invalidate stale heap entries
+
+        self.busy: bool = False
+        self.scheduled_time: float = 0.0
+        self.trigger: Event = Event()
+        self.worker: Thread = None
 
-    def start(self):
-        self.timer = Thread_Timer(self.remaining, self.callback, [self.thread_id])
-        self.timer.name = self.thread_id
-        self.remaining = self.seconds
-        self.start_time = time()
-        self.timer.start()
+        self.runs: int = 0
+        self.overruns: int = 0 # deadlines reached while the previous run was still in flight
+        self.skipped: int = 0 # deadlines missed entirely because the scheduler fell behind
+        self.jitter: LatencyStats = LatencyStats() # start time - scheduled time
+        self.latency: LatencyStats = LatencyStats() # duration of the callback
 
-    def cancel(self):
-        if self.timer:
-            self.timer.cancel()
+    def get_stats(self) -> Dict[str, object]:
+        """ _summary_ Get the scheduling stats of the task
+
+        Returns:
+            Dict[str, object]: run counters and jitter/latency summaries in milliseconds
+        """
+        return {
+            'period_ms': self.seconds * 1000,
+            'runs': self.runs,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+            'jitter': self.jitter.as_dict(),
+            'latency': self.latency.as_dict(),
+        }
+
+    def __str__(self) -> str:
+        return "%s(period=%.3fs runs=%d overruns=%d skipped=%d jitter[%s] latency[%s])" % (self.thread_id, self.seconds, self.runs, self.overruns, self.skipped, self.jitter, self.latency)
 
 class TimerManager:
-    """ _summary_ Singleton class to manage timers"""
+    """ _summary_ Singleton class to manage timers
+
+    A single scheduler thread keeps a heap of task deadlines and triggers each task's worker thread when its deadline is reached.
+    Tasks run at a fixed rate - the next deadline is the previous deadline plus the period, regardless of how long the callback took.
+    If a task is still running when its next deadline is reached, that run is dropped and counted as an overrun.
+    """
 
     def __new__(cls):
         """ _summary_ Singleton constructor for the TimerManager"""
         if not hasattr(cls, '_instance'):
             cls._instance = super().__new__(cls)
-            cls._instance.timers: Dict[str, TimerWrapper] = dict()
+            cls._instance.timers: Dict[str, PeriodicTask] = dict()
             cls._instance.terminated: bool = False
             cls._instance.is_paused: bool = False
+            cls._instance._cond: Condition = Condition()
+            cls._instance._heap: List[Tuple[float, int, int, PeriodicTask]] = []
+            cls._instance._seq: int = 0
+            cls._instance._scheduler: Thread = None
         return cls._instance
 
+    def _schedule(self, task: PeriodicTask, deadline: float) -> None:
+        """ _summary_ Push the next deadline of a task. Must hold the lock."""
+        task.next_deadline = deadline
+        self._seq += 1
+        heappush(self._heap, (deadline, self._seq, task.version, task))
+
+    def _start_worker(self, task: PeriodicTask) -> None:
+        """ _summary_ Start the worker thread of a task """
+        task.worker = Thread(target=self._run_task, args=(task,), name=task.thread_id, daemon=True)
+        task.worker.start()
+
     def start_timers(self) -> None:
         """ _summary_ Start all timers """
-        [t.start() for t in self.timers.values()]
+        with self._cond:
+            now = perf_counter()
+            for t in self.timers.values():
+                if t.worker is None:
+                    self._start_worker(t)
+                t.version += 1
+                self._schedule(t, now + t.seconds)
+
+            if self._scheduler is None:
+                self._scheduler = Thread(target=self._run_scheduler, name=SCHEDULER_THREAD_NAME, daemon=True)
+                self._scheduler.start()
+            self._cond.notify_all()
         info("All Timers Started")
 
     def pause_timers(self) -> None:
-        [t.pause() for t in self.timers.values()]
-        self.is_paused = True
+        with self._cond:
+            now = perf_counter()
+            for t in self.timers.values():
+                t.remaining = max(0.0, t.next_deadline - now)
+            self.is_paused = True
         info("All Timers Paused")
 
     def resume_timers(self) -> None:
-        [t.resume() for t in self.timers.values()]
-        self.is_paused = False
+        with self._cond:
+            if not self.is_paused:
+                warn("Failed to resume timers - not paused.")
+                return
+            now = perf_counter()
+            for t in self.timers.values():
+                t.version += 1
+                self._schedule(t, now + t.remaining)
+            self.is_paused = False
+            self._cond.notify_all()
         info("All Timers Resumed")
 
     def stop_timers(self) -> None:
         """ _summary_ Stop all timers """
-        self.terminated = True
+        with self._cond:
+            self.terminated = True
+            self._heap.clear()
+            self._cond.notify_all()
         info("Joining Timers.........")
-        [t.cancel() for t in self.timers.values()]
+        for t in self.timers.values():
+            t.trigger.set()
+            if t.worker is not None and t.worker is not current_thread():
+                t.worker.join()
+        if self._scheduler is not None and self._scheduler is not current_thread():
+            self._scheduler.join()
+        [info("Timer stats: %s" % t) for t in self.timers.values()]
         info("All Timers Joined.........")
 
     def add_timer(self, thread_id: str, seconds: uint16, callback_func: Callable, milliseconds: bool=False) -> None:
         """ _summary_ Add a timer to the timer manager
-        
+
         Args:
             thread_id (str): ID of the thread
             seconds (uint16): number of seconds for the timer
@@ -100,40 +159,132 @@ class TimerManager:
 
         seconds = float(seconds/1000.0) if milliseconds else float(seconds)
         print("Adding Timer %s every %s seconds." % (thread_id, seconds))
-        self.timers[thread_id] = TimerWrapper(thread_id, seconds, callback_func)
-    
+        task = PeriodicTask(thread_id, seconds, callback_func)
+        with self._cond:
+            self.timers[thread_id] = task
+            if self._scheduler is not None and not self.terminated:
+                # scheduler already running - start the new timer right away
+                self._start_worker(task)
+                if not self.is_paused:
+                    self._schedule(task, perf_counter() + seconds)
+                    self._cond.notify_all()
+
     def reset_timer(self, thread_id: str) -> bool:
-        """ _summary_ Reset a timer
-        
+        """ _summary_ Reset a timer, so its next deadline is one period from now
+
         Args:
             thread_id (str): ID of the thread
-            
+
         Returns:
             bool: whether or not the timer was reset
         """
-        if not self.terminated and thread_id in self.timers:
-            self.timers[thread_id].start()
-            return True
-        return False
+        with self._cond:
+            if self.terminated or thread_id not in self.timers:
+                return False
+            task = self.timers[thread_id]
+            task.version += 1
+            task.remaining = task.seconds
+            if not self.is_paused:
+                self._schedule(task, perf_counter() + task.seconds)
+                self._cond.notify_all()
+        return True
+
+    def get_stats(self) -> Dict[str, Dict[str, object]]:
+        """ _summary_ Get the scheduling stats of every timer
+
+        Returns:
+            Dict[str, Dict[str, object]]: stats of each timer keyed by thread ID
+        """
+        return {thread_id: t.get_stats() for thread_id, t in self.timers.items()}
+
+    def _dispatch(self, task: PeriodicTask, deadline: float, now: float) -> None:
+        """ _summary_ Trigger a run of a task whose deadline was reached, and schedule its next deadline. Must hold the lock.
+
+        Args:
+            task (PeriodicTask): task to run
+            deadline (float): deadline that was reached
+            now (float): current time
+        """
+        if task.busy:
+            task.overruns += 1
+            debug("Timer [%s] overran its period of [%s] seconds" % (task.thread_id, task.seconds))
+        else:
+            task.busy = True
+            task.scheduled_time = deadline
+            task.trigger.set()
+
+        # fixed rate - skip any deadlines that already passed rather than firing them back to back
+        next_deadline = deadline + task.seconds
+        if next_deadline <= now:
+            missed = int(floor((now - next_deadline) / task.seconds)) + 1
+            task.skipped += missed
+            next_deadline += missed * task.seconds
+        self._schedule(task, next_deadline)
+
+    def _run_scheduler(self) -> None:
+        """ _summary_ Scheduler loop triggering tasks in deadline order """
+        with self._cond:
+            while not self.terminated:
+                if self.is_paused or len(self._heap) == 0:
+                    self._cond.wait()
+                    continue
+
+                deadline, _, version, task = self._heap[0]
+                if version != task.version:
+                    heappop(self._heap) # stale entry of a rescheduled task
+                    continue
+
+                now = perf_counter()
+                if deadline > now:
+                    self._cond.wait(deadline - now)
+                    continue
+
+                heappop(self._heap)
+                self._dispatch(task, deadline, now)
+
+    def _run_task(self, task: PeriodicTask) -> None:
+        """ _summary_ Worker loop running a task every time the scheduler triggers it
+
+        Args:
+            task (PeriodicTask): task to run
+        """
+        while True:
+            task.trigger.wait()
+            task.trigger.clear()
+            if self.terminated:
+                return
+
+            start_time = perf_counter()
+            task.jitter.record((start_time - task.scheduled_time) * 1000)
+            try:
+                task.callback()
+            except Exception as err:
+                warn("Timer [%s] callback raised: %s" % (task.thread_id, err))
+            finally:
+                task.latency.record((perf_counter() - start_time) * 1000)
+                task.runs += 1
+                with self._cond:
+                    task.busy = False
 
     def timer_callback(func) -> Callable:
-        """ _summary_ A decorator for callback functions from timers 
-        
+        """ _summary_ A decorator for callback functions from timers
+
+        Timers are re-armed by the scheduler, so the decorator only keeps the callback signature
+        compatible with callers passing a thread ID.
+
         Args:
             func (Callable): callback function to call when the timer expires
-            
+
         Returns:
             Callable: wrapper function for the callback function
         """
         def wrapper(self, thread_id: str="", *args, **kwargs) -> None:
-            """ _summary_ Wrapper for callback functions from timers 
-            
+            """ _summary_ Wrapper for callback functions from timers
+
             Args:
-                thread_id (str, optional): ID of the thread. Defaults to "".
+                thread_id (str, optional): ID of the thread. Unused. Defaults to "".
                 args (list, optional): arguments for the callback function. Defaults to [].
                 kwargs (dict, optional): keyword arguments for the callback function. Defaults to {}.
             """
-            func(self, *args, **kwargs)
-            if len(thread_id) > 0:
-                TimerManager().reset_timer(thread_id)
-        return wrapper
\ No newline at end of file
+            return func(self, *args, **kwargs)
+        return wrapper
@@ -0,0 +1,203 @@
+from dataclasses import dataclass
+from json import dump, load
+from mmap import mmap, ACCESS_READ
+from os import path, replace
+from typing import BinaryIO, Dict, List
+
+from numpy import dtype, memmap, ndarray, array, arange, zeros, searchsorted, flatnonzero, concatenate, iinfo, all as np_all, diff, int64, uint16, uint32, uint64
+
+TRANSCRIPT_VERSION = 2
+RECORDS_EXT = '.rec'
+MESSAGES_EXT = '.msg'
+INDEX_EXT = '.idx.json'
+
+# One fixed width row per transcript line - the message text lives in the messages file
+RECORD_DTYPE = dtype([('sim_time', int64), ('event_time', int64), ('sender', uint16), ('event_type', uint16), ('length', uint32), ('offset', uint64)])
+
+@dataclass
+class TranscriptEntry:
+    """ _summary_ Class to hold a transcript line read back with the TranscriptReader """
+    record: int # position of the line in the transcript
+    sim_time: int # simulation time in epoch seconds when the line was logged
+    event_time: int # simulation time in epoch seconds the line is about, e.g. the start of an action
+    sender: str
+    event_type: str
+    message: str
+
+class TranscriptWriter:
+    """ _summary_ Class to append transcript lines to a structured binary transcript
+
+    A transcript is three files sharing a base path:
+        .rec - fixed width records (sim time, event time, sender ID, event type ID, message length and offset)
+        .msg - UTF-8 messages, back to back
+        .idx.json - sidecar index with the sender and event type names and the records of each sender
+
+    Records are stamped with the sim time they are logged at, which only moves forward, so the sim time column stays sorted
+    even when a line is about an earlier time (kept as its event time).
+    Both data files are append only. The index is rewritten when a new sender or event type shows up and on close(),
+    and readers index the records written since then themselves, so a transcript is readable while it is written.
+    Not thread safe - the LogWriter thread is its only writer.
+    """
+
+    def __init__(self, base_path: str):
+        """ _summary_ Constructor for the TranscriptWriter
+
+        Args:
+            base_path (str): path of the transcript files, without extension
+        """
+        self.base_path: str = base_path
+        self.records: BinaryIO = open(base_path + RECORDS_EXT, 'wb')
+        self.messages: BinaryIO = open(base_path + MESSAGES_EXT, 'wb')
+        self.senders: Dict[str, int] = dict()
+        self.event_types: Dict[str, int] = dict()
+        self.by_sender: List[List[int]] = []
+        self.count: int = 0
+        self.offset: int = 0
+        self.last_sim_time: int = 0
+        self.time_sorted: bool = True
+        self.row: ndarray = zeros(1, dtype=RECORD_DTYPE)
+
+    def append(self, sim_time: int, sender: str, event_type: str, message: str, event_time: int=None) -> int:
+        """ _summary_ Append a line to the transcript
+
+        Args:
+            sim_time (int): simulation time in epoch seconds when the line is logged
+            sender (str): name of the sender
+            event_type (str): type of the line (e.g. Chat, Action)
+            message (str): message of the line
+            event_time (int, optional): simulation time in epoch seconds the line is about. Defaults to sim_time.
+
+        Returns:
+            int: position of the line in the transcript
+        """
+        new_name = sender not in self.senders or event_type not in self.event_types
+        sender_id = self.senders.setdefault(sender, len(self.senders))
+        type_id = self.event_types.setdefault(event_type, len(self.event_types))
+        if sender_id == len(self.by_sender):
+            self.by_sender.append([])
+
+        data = message.encode('utf-8')
+        self.row[0] = (sim_time, sim_time if event_time is None else event_time, sender_id, type_id, len(data), self.offset)
+        self.records.write(self.row.tobytes())
+        self.messages.write(data)
+
+        self.by_sender[sender_id].append(self.count)
+        self.time_sorted = self.time_sorted and sim_time >= self.last_sim_time
+        self.last_sim_time = sim_time
+        self.offset += len(data)
+        self.count += 1
+
+        if new_name:
+            self.flush()
+            self.write_index()
+        return self.count - 1
+
+    def flush(self) -> None:
+        """ _summary_ Flush the appended lines to the data files - messages first, so every flushed record has its message """
+        self.messages.flush()
+        self.records.flush()
+
+    def write_index(self) -> None:
+        """ _summary_ Atomically rewrite the sidecar index"""
+        index = {'version': TRANSCRIPT_VERSION, 'records': self.count, 'time_sorted': self.time_sorted,
+                 'senders': list(self.senders), 'event_types': list(self.event_types), 'by_sender': self.by_sender}
+        with open(self.base_path + INDEX_EXT + '.tmp', 'w') as f:
+            dump(index, f)
+        replace(self.base_path + INDEX_EXT + '.tmp', self.base_path + INDEX_EXT)
+
+    def close(self) -> None:
+        """ _summary_ Flush the data files, write the index and close the transcript"""
+        self.flush()
+        self.write_index()
+        self.records.close()
+        self.messages.close()
+
+class TranscriptReader:
+    """ _summary_ Class to read lines back from a structured binary transcript written by the TranscriptWriter
+
+    The records are memory mapped, so a time range is found by binary search over the sim time column and the lines of a
+    sender come from the sidecar index - only the selected messages are read, never the whole transcript.
+    """
+
+    def __init__(self, base_path: str):
+        """ _summary_ Constructor for the TranscriptReader
+
+        Args:
+            base_path (str): path of the transcript files, without extension
+        """
+        with open(base_path + INDEX_EXT) as f:
+            index = load(f)
+        if index['version'] != TRANSCRIPT_VERSION:
+            raise ValueError("Unsupported transcript version [%s] at [%s]" % (index['version'], base_path))
+
+        self.senders: List[str] = index['senders']
+        self.event_types: List[str] = index['event_types']
+        size = path.getsize(base_path + RECORDS_EXT) // RECORD_DTYPE.itemsize
+        records = memmap(base_path + RECORDS_EXT, dtype=RECORD_DTYPE, mode='r', shape=(size,)) if size > 0 else zeros(0, dtype=RECORD_DTYPE)
+        self.messages_file: BinaryIO = open(base_path + MESSAGES_EXT, 'rb')
+        messages_size = path.getsize(base_path + MESSAGES_EXT)
+        self.messages: mmap = mmap(self.messages_file.fileno(), 0, access=ACCESS_READ) if messages_size > 0 else b''
+        # a transcript being written may have flushed records whose message is still buffered
+        size = int(searchsorted(records['offset'] + records['length'], messages_size, 'right'))
+        self.records: ndarray = records[:size]
+
+        # records appended after the index was written are indexed here
+        indexed = min(index['records'], size)
+        tail = self.records[indexed:]
+        self.by_sender: Dict[str, ndarray] = {name: array(ids[:indexed], dtype=int64) for name, ids in zip(self.senders, index['by_sender'])}
+        for sender_id, name in enumerate(self.senders):
+            self.by_sender[name] = concatenate([self.by_sender[name], indexed + flatnonzero(tail['sender'] == sender_id)])
+        self.time_sorted: bool = index['time_sorted'] and bool(np_all(diff(self.records['sim_time'][max(indexed - 1, 0):]) >= 0))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, record: int) -> TranscriptEntry:
+        """ _summary_ Read the line at a position of the transcript"""
+        sim_time, event_time, sender, event_type, length, offset = self.records[record].tolist()
+        return TranscriptEntry(record=int(record), sim_time=sim_time, event_time=event_time, sender=self.senders[sender], event_type=self.event_types[event_type],
+                               message=self.messages[offset:offset + length].decode('utf-8'))
+
+    def _in_time_range(self, start: int, end: int) -> ndarray:
+        """ _summary_ Get the positions of the lines logged from start (included) to end (excluded)"""
+        sim_times = self.records['sim_time']
+        if self.time_sorted:
+            first, last = searchsorted(sim_times, start, 'left'), searchsorted(sim_times, end, 'left')
+            return arange(first, max(first, last), dtype=int64)
+        return flatnonzero((sim_times >= start) & (sim_times < end))
+
+    def time_range(self, start: int, end: int) -> List[TranscriptEntry]:
+        """ _summary_ Read the lines logged in a sim time range
+
+        Args:
+            start (int): start of the range in epoch seconds, included
+            end (int): end of the range in epoch seconds, excluded
+
+        Returns:
+            List[TranscriptEntry]: lines of the range, in transcript order
+        """
+        return [self[i] for i in self._in_time_range(start, end)]
+
+    def by_agent(self, sender: str, start: int=None, end: int=None) -> List[TranscriptEntry]:
+        """ _summary_ Read the lines of a sender, optionally in a sim time range
+
+        Args:
+            sender (str): name of the sender
+            start (int, optional): start of the range in epoch seconds, included. Defaults to the start of the transcript.
+            end (int, optional): end of the range in epoch seconds, excluded. Defaults to the end of the transcript.
+
+        Returns:
+            List[TranscriptEntry]: lines of the sender, in transcript order
+        """
+        ids = self.by_sender.get(sender, zeros(0, dtype=int64))
+        if start is not None or end is not None:
+            sim_times = self.records['sim_time'][ids]
+            ids = ids[(sim_times >= (start if start is not None else iinfo(int64).min)) & (sim_times < (end if end is not None else iinfo(int64).max))]
+        return [self[i] for i in ids]
+
+    def close(self) -> None:
+        """ _summary_ Close the transcript files"""
+        if isinstance(self.messages, mmap):
+            self.messages.close()
+        self.messages_file.close()
+        self.records = None
@@ -1,70 +1,122 @@
+from typing import Any, Callable, Dict, List
+from threading import Lock
 from numpy import uint16
 
 from rtai.utils.timer_manager import TimerManager
-from rtai.utils.datetime import datetime as mydatetime
-from rtai.utils.logging import info
+from rtai.utils.datetime import datetime as mydatetime, SEC_PER_HOUR, SEC_PER_DAY
+from rtai.utils.logging import info, error
 from rtai.utils.config import Config
 
 SEC_PER_HALF_DAY = 43200
 
+SPEED_MULTIPLIER_CONFIG = 'SpeedMultiplier'
+
+HOUR_BOUNDARY = 'Hour'
+DAY_BOUNDARY = 'Day'
+
+ClockSubscriber = Callable[[mydatetime], None]
+
 class clock:
     """
     Class to represent the simulation world's date/time 
     
-    Maybe using an entire datetime object ....
+    Every tick publishes a new sim time instead of mutating the current one - reads are a single attribute load,
+    so agent threads peek or snapshot the clock without locking, and the times they hold never change under them.
+    Subscribers are called on the ticking thread when the clock crosses an hour or day boundary.
     """
 
     # Tracks number of days that have passed since clock was created
     day_counter: uint16 = uint16(0)
 
+    # Published sim time - replaced on every tick, never mutated
     clock: mydatetime
 
+    subscribers: Dict[str, List[ClockSubscriber]] = {HOUR_BOUNDARY: [], DAY_BOUNDARY: []}
+
     def __new__(cls, config: Config) -> 'clock':
         """ _summary_ Singleton constructor for the world clock"""
         if not hasattr(cls, '_instance'):
             cls._instance = super().__new__(cls)
 
-            # Start world clock at 5 am
             cls.clock = mydatetime.strptime('%s %s' % (config['StartDate'], config['StartTime'])) # static datetime object
             cls._instance.clock_increment = int(config['ClockIncrementSec'])
-
-            # Tracks number of seconds that have passed in a given day
-            cls._instance.time = uint16(60*60*5)
-            cls._instance.is_am = True
+            cls._instance.speed = float(config[SPEED_MULTIPLIER_CONFIG]) if SPEED_MULTIPLIER_CONFIG in config else 1.0
+            if not cls._instance.speed > 0:
+                error("Invalid clock %s [%s] - must be positive, using 1.0" % (SPEED_MULTIPLIER_CONFIG, cls._instance.speed))
+                cls._instance.speed = 1.0
+            cls._instance.lock = Lock() # serializes writers, readers never take it
 
         return cls._instance
 
     @TimerManager.timer_callback
     def tick(self) -> None:
         """
-        Increments the world clock by one minute
+        Advances the world clock by the clock increment times the speed multiplier
         """
-        self.time += self.clock_increment
-        
-        # self.mins_since_last_update += 1
-        self.clock.increment_by(self.clock_increment)
-        info("TIME : %s " % self.clock.get_datetime_str())
-        if self.time >= 43200:
-            if self.is_am:
-                # AM -> PM
-                self.is_am = False
-            else:
-                # NEW DAY
-                self.is_am = True
-                self.day_counter += 1
-                info("New Day: %s" % self.clock.get_datetime_str())
-            
-            self.time = 0
-
-
-
-        # self.mins_since_last_update = 0# TODO delete
-
-            # self.world_date_str = self.world_date.strftime("%A %B %d, %Y")
+        with self.lock:
+            previous = clock.clock
+            clock.clock = mydatetime.fromtimestamp(previous.timestamp() + round(self.clock_increment * self.speed))
+            days = clock.clock.timestamp() // SEC_PER_DAY - previous.timestamp() // SEC_PER_DAY
+            clock.day_counter += uint16(days) # class attribute, read by get_day_count()
+
+        info("TIME : %s " % clock.clock.get_datetime_str())
+        if days > 0:
+            info("New Day: %s" % clock.clock.get_datetime_str())
+        clock._notify(previous, clock.clock)
+
+    @classmethod
+    def _notify(cls, previous: mydatetime, current: mydatetime) -> None:
+        """
+        Calls the subscribers of every hour and day boundary crossed between two sim times
+        """
+        for boundary, seconds in ((HOUR_BOUNDARY, SEC_PER_HOUR), (DAY_BOUNDARY, SEC_PER_DAY)):
+            subscribers = clock.subscribers[boundary]
+            if len(subscribers) == 0:
+                continue
+            for n in range(previous.timestamp() // seconds + 1, current.timestamp() // seconds + 1):
+                boundary_time = mydatetime.fromtimestamp(n * seconds)
+                [subscriber(boundary_time) for subscriber in subscribers]
+
+    @classmethod
+    def subscribe(cls, boundary: str, subscriber: ClockSubscriber) -> None:
+        """
+        Calls subscriber with the boundary sim time whenever the clock crosses an hour (HOUR_BOUNDARY) or day (DAY_BOUNDARY)
+        """
+        # copy on write, so a tick in progress keeps iterating over the previous list
+        clock.subscribers[boundary] = clock.subscribers[boundary] + [subscriber]
+
+    @classmethod
+    def unsubscribe(cls, boundary: str, subscriber: ClockSubscriber) -> None:
+        """
+        Stops calling subscriber on hour (HOUR_BOUNDARY) or day (DAY_BOUNDARY) boundaries
+        """
+        clock.subscribers[boundary] = [s for s in clock.subscribers[boundary] if s != subscriber]
+
+    @classmethod
+    def set_speed(cls, multiplier: float) -> bool:
+        """
+        Sets how many clock increments each tick advances the sim time by - the sim time only moves forward, so it must be positive
+        """
+        if not multiplier > 0:
+            error("Invalid clock speed [%sx] - must be positive" % multiplier)
+            return False
+        cls._instance.speed = multiplier
+        info("Clock speed set to [%sx]" % multiplier)
+        return True
+
+    @classmethod
+    def get_speed(cls) -> float:
+        """
+        Returns the speed multiplier of the clock
+        """
+        return cls._instance.speed
         
     @classmethod
     def snapshot(cls) -> mydatetime:
-        return clock.clock.copy()
+        """
+        Returns the current sim time - published times are shared and must not be mutated, copy() them first
+        """
+        return clock.clock
     
     @classmethod
     def peek(cls) -> mydatetime:
@@ -75,7 +127,6 @@ class clock:
         """
         Returns the time as a string object
         """
-        # return  "%02d:%02d %s" % (self.get_hour() % 12, self.get_minute(), self.get_meridiem())
         return clock.clock.get_time_str()
     
     @classmethod
@@ -92,6 +143,26 @@ class clock:
         """
         return clock.clock.get_datetime_str(show_seconds=False)
 
+    @classmethod
+    def get_state(cls) -> Dict[str, Any]:
+        """
+        Returns the state of the world clock as a JSON friendly dictionary
+        """
+        seconds_of_day = clock.clock.timestamp() % SEC_PER_DAY
+        return {'datetime': clock.clock.timestamp(), 'day_counter': int(clock.day_counter),
+                'time': seconds_of_day % SEC_PER_HALF_DAY, 'is_am': seconds_of_day < SEC_PER_HALF_DAY}
+
+    @classmethod
+    def set_state(cls, state: Dict[str, Any]) -> None:
+        """
+        Restores the state of the world clock saved with get_state(), calling the subscribers of the boundaries crossed
+        """
+        with cls._instance.lock:
+            previous = clock.clock
+            clock.clock = mydatetime.fromtimestamp(state['datetime'])
+            clock.day_counter = uint16(state['day_counter'])
+        clock._notify(previous, clock.clock)
+
     def __str__(self) -> str:
         return self.get_datetime_str()
     
@@ -1,13 +1,16 @@
 
 from typing import List, Tuple
-import faiss
-from sentence_transformers import SentenceTransformer
 from rtai.agent.retriever import Retriever
+from rtai.agent.memory.embedding_store import EmbeddingStore, IndexConfig
+from rtai.agent.memory.memory_table import MemoryTable
+from rtai.llm.embedding_service import EmbeddingService
 
 from rtai.world.world import World
 
+INDEX_CONFIG = "Index"
+
 class StaticWorld(World):
-    def __init__(self, cfg, queue):
+    def __init__(self, cfg, queue, embedding_service: EmbeddingService=None):
         super().__init__(cfg, queue)
     
         static_world_file: str = cfg.get_value("StaticWorldFile", "")
@@ -15,10 +18,10 @@ class StaticWorld(World):
         if len(static_world_file) > 0:
             self.static_world = self.load_static_world(static_world_file)
 
-        self.embeddings_model = SentenceTransformer('sentence-transformers/all-mpnet-base-v2')
-        embeddings_dim = 768
-        self.index = faiss.IndexFlatL2(embeddings_dim)
-        self.retriever = Retriever(self.embeddings_model, self.index, self.static_world)
+        self.embeddings_model = embedding_service if embedding_service is not None else EmbeddingService()
+        self.embedding_store = EmbeddingStore(self.embeddings_model, index_config=IndexConfig.from_config(cfg.expand(INDEX_CONFIG)), name='world')
+        self.table = MemoryTable()
+        self.retriever = Retriever(self.embedding_store, self.table)
 
         self.create_embeddings()
 
@@ -33,23 +36,13 @@ class StaticWorld(World):
         '''
         searches the embeddings for the query and returns the distances and indices of the top k results
         '''
-        query_embedding = self.embeddings_model.encode([query]) # query needs to be a list as it is converted to a vector
-        faiss.normalize_L2(query_embedding)
-        distances, indices = self.index.search(query_embedding, k) # get the top k serarch embeddings
-        return distances, indices  # we probably want the raw content?
+        return self.embedding_store.search(query, k)
 
     def create_embeddings(self):
         '''
         Creates embeddings of all the content in long term memory and adds the index
         '''
-        # grab the content from storage
-        embeddings = self.embeddings_model.encode(self.static_world)
-
-        # faiss set index
-        faiss.normalize_L2(embeddings) # generate embeddings on the entire storage
-        # self.index = None
-
-        # create a new index
-        index = faiss.IndexFlatL2(768)
-        index.add(embeddings)
-        self.index = index
\ No newline at end of file
+        self.embedding_store.rebuild(self.static_world)
+        self.table = MemoryTable(max(1, len(self.static_world)))
+        [self.table.append(i, line, None, importance=0, created_sim_time=0) for i, line in enumerate(self.static_world)]
+        self.retriever.table = self.table
\ No newline at end of file
@@ -0,0 +1,59 @@
+'''
+Benchmarks the agent cycle time against the number of agents, with the act phase run sequentially and in parallel.
+
+Agents answer from the LLMTestClient, so the timings measure the simulation itself rather than the model.
+Idle agents are not skipped, so every agent acts every cycle.
+
+Usage:
+    PYTHONPATH=. python scripts/agent_cycle_benchmark.py --config configs/rtai.yaml --agents 1 2 4 8 16 --cycles 50
+'''
+from argparse import ArgumentParser
+from queue import Queue
+from time import perf_counter
+from numpy import percentile, mean
+
+from rtai.utils.config import Config, YamlLoader
+from rtai.agent.agent_manager import AgentManager, NUM_AGENTS_CONFIG, SKIP_IDLE_AGENTS_CONFIG, PARALLEL_ACT_CONFIG
+from rtai.llm.embedding_service import EmbeddingService
+from rtai.world.clock import clock
+from tests.mock.llm.llm_client_mock import LLMTestClient
+
+def run(cfg: Config, client: LLMTestClient, embedding_service: EmbeddingService, num_agents: int, parallel: bool, cycles: int):
+    """ _summary_ Time every cycle of an agent manager with num_agents agents"""
+    world_clock = clock(cfg.expand('Clock'))
+    agents_cfg = dict(cfg.expand('Agents').getDict())
+    agents_cfg.update({NUM_AGENTS_CONFIG: num_agents, SKIP_IDLE_AGENTS_CONFIG: False, PARALLEL_ACT_CONFIG: parallel})
+    agent_mgr = AgentManager(Queue(), Config(agents_cfg, 'Agents'), client, None, embedding_service)
+    agent_mgr.initialize()
+    agent_mgr.update(first_day=True)
+
+    latencies = []
+    for _ in range(cycles):
+        world_clock.tick()
+        start_time = perf_counter()
+        agent_mgr.update()
+        latencies.append((perf_counter() - start_time) * 1000)
+    agent_mgr.tp.shutdown()
+    return latencies
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--config', default='configs/rtai.yaml', help='simulation config')
+    parser.add_argument('--agents', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='agent counts to benchmark')
+    parser.add_argument('--cycles', type=int, default=50, help='number of cycles to time per run')
+    args = parser.parse_args()
+
+    cfg = YamlLoader.load(args.config)
+    client = LLMTestClient()
+    client.initialize(cfg.expand('LLMClient'))
+    embedding_service = EmbeddingService()
+    embedding_service.initialize(cfg.expand('Embeddings'))
+
+    print("%-8s %-12s %10s %10s %10s" % ('agents', 'act', 'mean(ms)', 'p50(ms)', 'p99(ms)'))
+    for num_agents in args.agents:
+        for parallel in (False, True):
+            latencies = run(cfg, client, embedding_service, num_agents, parallel, args.cycles)
+            print("%-8d %-12s %10.3f %10.3f %10.3f" % (num_agents, 'parallel' if parallel else 'sequential', mean(latencies), percentile(latencies, 50), percentile(latencies, 99)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+'''
+Microbenchmarks for the sim time helpers run on every agent cycle: clock snapshots, action end times and completion checks,
+chat message creation, comparisons and time string formatting.
+
+Usage:
+    PYTHONPATH=. python scripts/datetime_benchmark.py --number 200000
+'''
+from argparse import ArgumentParser
+from timeit import repeat
+
+from rtai.utils.datetime import datetime, timedelta
+from rtai.world.clock import clock
+from rtai.agent.behavior.action import Action
+from rtai.agent.behavior.chat_message import ChatMessage
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=200000, help='number of calls per timing')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timings per benchmark, the best one is reported')
+    args = parser.parse_args()
+
+    clock({'StartDate': '2024-01-01', 'StartTime': '06:15:00 AM', 'ClockIncrementSec': '30'})
+    start = clock.snapshot()
+    later = start + timedelta(minutes=30)
+    duration = timedelta(minutes=30)
+    action = Action('reading a book', 'library', start, duration)
+
+    benchmarks = {
+        'clock.snapshot': lambda: clock.snapshot(),
+        'datetime + timedelta': lambda: start + duration,
+        'datetime <= datetime': lambda: start <= later,
+        'datetime.timestamp': lambda: start.timestamp(),
+        'Action()': lambda: Action('reading a book', 'library', start, duration),
+        'Action.has_completed': lambda: action.has_completed(),
+        'ChatMessage()': lambda: ChatMessage(1, 'Alice', 'hello'),
+        'get_time_str': lambda: clock.get_time_str(),
+        'get_datetime_str': lambda: clock.get_datetime_str(),
+        'datetime.fromtimestamp': lambda: datetime.fromtimestamp(1704089700),
+        # last, since it moves the clock past the end of the action
+        'clock tick': lambda: clock.clock.increment_by(30),
+    }
+
+    print("%-24s %10s" % ('benchmark', 'ns/call'))
+    for name, fn in benchmarks.items():
+        best = min(repeat(fn, number=args.number, repeat=args.repeat))
+        print("%-24s %10.1f" % (name, best * 1e9 / args.number))
+
+if __name__ == '__main__':
+    main()
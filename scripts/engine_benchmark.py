@@ -0,0 +1,199 @@
+'''
+Benchmarks the whole story engine headless, with synthetic agents answered by a fake LLM with a fixed latency.
+
+A fixed seed generates the personas and the memories pre-seeded into every agent, so runs are reproducible.
+Every cycle ticks the clock, updates the agents and dispatches their events, as the engine timers do.
+After the cycles, every agent answers retrieval queries over its memories.
+
+Reports cycles/sec, the p50/p99 cycle latency, the peak resident memory and the retrieval latency,
+along with the share of agent steps executed rather than skipped as idle and the latency profile of the agent phases.
+--no-skip-idle updates every agent every cycle, to measure the cost of the agent cycle itself. --output writes the report as json, for regression tracking against a --baseline report.
+
+Usage:
+    PYTHONPATH=. python scripts/engine_benchmark.py --config configs/rtai.yaml --agents 8 --memories 1000 --cycles 500 --llm-latency-ms 20 --output engine_benchmark.json
+'''
+from argparse import ArgumentParser
+from json import dump, load
+from os import path
+from tempfile import TemporaryDirectory
+from time import perf_counter, sleep
+from typing import Dict, List, Tuple
+from numpy import percentile, mean
+from numpy.random import default_rng
+
+from rtai.utils.config import Config, YamlLoader
+from rtai.story.engine import StoryEngine, STORY_CONFIG, AGENTS_CONFIG, WORLD_CONFIG, LLM_CLIENT_CONFIG, EMBEDDINGS_CONFIG, MAX_CYCLES, MAX_DAYS, RESTORE_SNAPSHOT_CONFIG, SNAPSHOT_ON_EXIT_CONFIG
+from rtai.agent.agent_manager import NUM_AGENTS_CONFIG, AGENT_STATIC_FILES, SKIP_IDLE_AGENTS_CONFIG
+from rtai.agent.agent_shard import SHARDS_CONFIG
+from rtai.world.world import LOAD_SHARED_MEMORIES
+from rtai.llm.llm_client import GENERATION_N_CTX, SCHEDULE_N_CTX
+from rtai.llm.embedding_service import EmbeddingService, max_rss_mb
+from rtai.world.clock import clock
+from tests.mock.llm.llm_client_mock import LLMTestClient
+from tests.mock.agent.embedding_mock import EmbeddingsTestModel
+
+WORDS = ['coffee', 'farm', 'river', 'market', 'letter', 'storm', 'library', 'festival', 'garden', 'train', 'museum', 'harbor',
+         'argument', 'promise', 'secret', 'dinner', 'rumor', 'bridge', 'lantern', 'journal', 'mayor', 'bakery', 'forest', 'trial']
+
+class FixedLatencyLLMClient(LLMTestClient):
+    """ _summary_ LLMTestClient sending every request through the scheduler to a fake model answering after a fixed latency"""
+
+    def __init__(self, latency_ms: float, names: List[str]):
+        """ _summary_ Constructor for the FixedLatencyLLMClient
+
+        Args:
+            latency_ms (float): time the fake model takes to answer a request, in milliseconds
+            names (List[str]): names of the synthetic agents, each one chats with its neighbour every day
+        """
+        super().__init__()
+        self.latency: float = latency_ms / 1000
+        self.names: List[str] = names
+
+    def _run_program(self, n_ctx: int, program, names: Tuple[str]) -> Dict[str, str]:
+        # the program is the canned answer
+        sleep(self.latency)
+        return {name: program for name in names}
+
+    def generate_observation(self, persona, current_action):
+        text = "%s observes that they are busy with %s" % (persona.get_name(), current_action)
+        return self.generate_cached('create_observation', dict(persona=persona, action=current_action), dict(), GENERATION_N_CTX, text, 'observation')['observation']
+
+    def generate_daily_schedule(self, persona) -> List[Tuple[str, str, str]]:
+        self.generate_cached('create_daily_tasks', dict(persona=persona, num_tasks=3), dict(), SCHEDULE_N_CTX, '', 'tasks')
+        i = self.names.index(persona.get_name())
+        partner = self.names[i ^ 1] if (i ^ 1) < len(self.names) else self.names[0]
+        return [
+            ("Wake up and make coffee", "0.25", "9:00"),
+            ("Have a chat with %s" % partner, "0.5", "9:15"),
+            ("Work at the %s" % WORDS[i % len(WORDS)], "8", "9:45"),
+            ("Eat dinner", "1", "17:45"),
+            ("Read a book", "4", "18:45"),
+            ("Sleep", "9", "22:45"),
+        ]
+
+def write_personas(dir_path: str, num_agents: int) -> Tuple[List[str], List[str]]:
+    """ _summary_ Write the persona files of the synthetic agents"""
+    names, files = [], []
+    for i in range(num_agents):
+        name = "Synthetic Agent%d" % i
+        file_path = path.join(dir_path, 'persona%d.txt' % i)
+        with open(file_path, 'w') as f:
+            f.write("first_name: Synthetic\nlast_name: Agent%d\nname: %s\nage: %d\noccupation: Farmer\nbackstory: %s grew up by the %s.\n"
+                    "hobbies: reading\ntraits: curious\nmotivations: To find the truth\nrelationships: %s knows everyone\n" % (i, name, 20 + i % 50, name, WORDS[i % len(WORDS)], name))
+        names.append(name)
+        files.append(file_path)
+    return names, files
+
+def write_memories(file_path: str, num_memories: int, seed: int) -> None:
+    """ _summary_ Write the memories pre-seeded into every agent as the world's shared memories"""
+    rng = default_rng(seed)
+    with open(file_path, 'w') as f:
+        for i in range(num_memories):
+            f.write("Memory %d: the %s near the %s was about the %s\n" % (i, *rng.choice(WORDS, 3)))
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """ _summary_ Summarize latency samples in milliseconds"""
+    return {'mean_ms': float(mean(samples)), 'p50_ms': float(percentile(samples, 50)), 'p99_ms': float(percentile(samples, 99)), 'max_ms': float(max(samples))}
+
+def run(args) -> dict:
+    """ _summary_ Build the engine, time the cycles and retrieval queries and collect the report"""
+    start_rss = max_rss_mb()
+    if args.fake_embeddings:
+        # the shared embeddings service keeps the model it was first given
+        EmbeddingService().initialize(embeddings_model=EmbeddingsTestModel())
+
+    with TemporaryDirectory() as tmp_dir:
+        names, persona_files = write_personas(tmp_dir, args.agents)
+        write_memories(path.join(tmp_dir, 'memories.txt'), args.memories, args.seed)
+
+        root = dict(YamlLoader.load(args.config).getDict())
+        root[STORY_CONFIG] = dict(root.get(STORY_CONFIG) or dict(), **{MAX_CYCLES: 0, MAX_DAYS: 0, RESTORE_SNAPSHOT_CONFIG: False, SNAPSHOT_ON_EXIT_CONFIG: False})
+        root[AGENTS_CONFIG] = dict(root.get(AGENTS_CONFIG) or dict(), **{NUM_AGENTS_CONFIG: args.agents, AGENT_STATIC_FILES: persona_files, SHARDS_CONFIG: 0,
+                                                                      SKIP_IDLE_AGENTS_CONFIG: str(not args.no_skip_idle)})
+        root[WORLD_CONFIG] = dict(root.get(WORLD_CONFIG) or dict(), **{LOAD_SHARED_MEMORIES: path.join(tmp_dir, 'memories.txt')})
+        cfg = Config(root)
+
+        client = FixedLatencyLLMClient(args.llm_latency_ms, names)
+        start_time = perf_counter()
+        engine = StoryEngine(cfg, test_mode=True, client=client)
+        startup_sec = perf_counter() - start_time
+        startup_rss = max_rss_mb()
+
+    world_clock = clock(cfg.expand('Clock'))
+    latencies = []
+    start_time = perf_counter()
+    for _ in range(args.cycles):
+        cycle_start = perf_counter()
+        world_clock.tick()
+        engine.agent_mgr.update()
+        engine.poll_event_queue()
+        latencies.append((perf_counter() - cycle_start) * 1000)
+    elapsed_sec = perf_counter() - start_time
+
+    rng = default_rng(args.seed + 1)
+    retrievals = []
+    for agent in engine.agent_mgr.agents.values():
+        for _ in range(args.queries):
+            query = "What happened at the %s?" % rng.choice(WORDS)
+            query_start = perf_counter()
+            agent.l_mem.retriever.retrieve_context(query)
+            retrievals.append((perf_counter() - query_start) * 1000)
+
+    schedule = engine.agent_mgr.get_schedule_stats()
+    total_steps = schedule['agent_steps'] + schedule['skipped_agent_steps']
+    report = {
+        'params': {'agents': args.agents, 'memories': args.memories, 'cycles': args.cycles, 'queries': args.queries, 'llm_latency_ms': args.llm_latency_ms,
+                   'fake_embeddings': args.fake_embeddings, 'skip_idle': not args.no_skip_idle, 'seed': args.seed, 'config': args.config},
+        'startup_sec': startup_sec,
+        'cycles_per_sec': args.cycles / elapsed_sec,
+        'cycle': summarize(latencies),
+        'retrieval': summarize(retrievals) if retrievals else dict(),
+        'peak_rss_mb': {'start': start_rss, 'after_startup': startup_rss, 'end': max_rss_mb()},
+        'schedule': schedule,
+        'executed_step_ratio': schedule['agent_steps'] / total_steps if total_steps else 0.0,
+        'profile': engine.agent_mgr.get_profile(),
+    }
+    engine.agent_mgr.stop()
+    return report
+
+def compare(report: dict, baseline: dict) -> None:
+    """ _summary_ Print the change of the headline numbers against a baseline report"""
+    print("%-20s %12s %12s %10s" % ('vs baseline', 'baseline', 'current', 'change'))
+    for name, get in [('cycles/s', lambda r: r['cycles_per_sec']), ('cycle p50(ms)', lambda r: r['cycle']['p50_ms']), ('cycle p99(ms)', lambda r: r['cycle']['p99_ms']),
+                      ('retrieval p99(ms)', lambda r: r['retrieval'].get('p99_ms', 0.0)), ('peak rss(MB)', lambda r: r['peak_rss_mb']['end'])]:
+        old, new = get(baseline), get(report)
+        print("%-20s %12.3f %12.3f %9.1f%%" % (name, old, new, (new - old) * 100 / old if old else 0.0))
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--config', default='configs/rtai.yaml', help='simulation config, its agents, world and snapshot settings are overridden')
+    parser.add_argument('--agents', type=int, default=8, help='number of synthetic agents')
+    parser.add_argument('--memories', type=int, default=1000, help='number of memories pre-seeded into every agent')
+    parser.add_argument('--cycles', type=int, default=500, help='number of cycles to time')
+    parser.add_argument('--queries', type=int, default=20, help='number of retrieval queries per agent')
+    parser.add_argument('--llm-latency-ms', type=float, default=20, help='latency of every fake LLM request')
+    parser.add_argument('--no-skip-idle', action='store_true', help='update every agent every cycle instead of skipping the agents idle until their action ends')
+    parser.add_argument('--fake-embeddings', action='store_true', help='hash sentences to random vectors instead of loading the embeddings model')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic memories and queries')
+    parser.add_argument('--output', default='', help='json file to write the report to')
+    parser.add_argument('--baseline', default='', help='json report of an earlier run to compare against')
+    args = parser.parse_args()
+
+    report = run(args)
+    print("agents=%d memories=%d cycles=%d startup=%.2fs skip_idle=%s" % (args.agents, args.memories, args.cycles, report['startup_sec'], not args.no_skip_idle))
+    print("%-12s %10s %10s %10s %10s" % ('', 'mean(ms)', 'p50(ms)', 'p99(ms)', 'max(ms)'))
+    for name in ('cycle', 'retrieval'):
+        if report[name]:
+            print("%-12s %10.3f %10.3f %10.3f %10.3f" % (name, report[name]['mean_ms'], report[name]['p50_ms'], report[name]['p99_ms'], report[name]['max_ms']))
+    print("agent steps executed=%d skipped=%d (%.1f%% executed)" % (report['schedule']['agent_steps'], report['schedule']['skipped_agent_steps'], report['executed_step_ratio'] * 100))
+    print("cycles/s=%.1f peak rss=%.1f MB (%.1f MB after startup)" % (report['cycles_per_sec'], report['peak_rss_mb']['end'], report['peak_rss_mb']['after_startup']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, load(f))
+
+if __name__ == '__main__':
+    main()
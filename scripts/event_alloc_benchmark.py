@@ -0,0 +1,62 @@
+'''
+Benchmarks event allocation through the event bus, with events recycled by the event pool and with pooling disabled.
+
+Agents publish action and chat events that the bus dispatches to subscribers, like the worker thread of a long run does.
+Reports the events allocated and the garbage collections triggered by each run.
+
+Usage:
+    PYTHONPATH=. python scripts/event_alloc_benchmark.py --events 1000000 --agents 25
+'''
+from argparse import ArgumentParser
+from gc import get_stats, collect
+from time import perf_counter
+
+from rtai.core.event import Event, EventType, event_pool
+from rtai.core.event_bus import EventBus
+
+class Sender:
+    def __init__(self, name: str):
+        self.name = name
+
+    def get_name(self) -> str:
+        return self.name
+
+def run(num_events: int, num_agents: int, pooled: bool):
+    """ _summary_ Publish and drain num_events events from num_agents agents, returning the timing and allocation counters"""
+    event_pool.max_size = 1024 if pooled else 0
+    event_pool.free.clear()
+    allocated = event_pool.allocated
+
+    senders = [Sender('Agent%d' % i) for i in range(num_agents)]
+    bus = EventBus()
+    bus.subscribe(EventType.ActionEvent, lambda e: None)
+    [bus.subscribe(EventType.ChatEvent, lambda e: None, topic=s.get_name()) for s in senders]
+
+    collect()
+    collections = sum(s['collections'] for s in get_stats())
+    start_time = perf_counter()
+    for i in range(num_events):
+        sender = senders[i % num_agents]
+        if i % 4 == 0:
+            bus.put(Event.create_chat_event(sender, 'hello', senders[(i + 1) % num_agents].get_name()))
+        else:
+            bus.put(Event.create_action_event(sender, 'reading a book'))
+        if i % num_agents == num_agents - 1:
+            bus.drain()
+    bus.drain()
+    elapsed = perf_counter() - start_time
+    return elapsed, event_pool.allocated - allocated, sum(s['collections'] for s in get_stats()) - collections
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=1000000, help='number of events to publish')
+    parser.add_argument('--agents', type=int, default=25, help='number of publishing agents, the bus is drained once per agent cycle')
+    args = parser.parse_args()
+
+    print("%-10s %10s %12s %14s %12s" % ('pool', 'time(s)', 'events/s', 'allocated', 'gc runs'))
+    for pooled in (False, True):
+        elapsed, allocated, collections = run(args.events, args.agents, pooled)
+        print("%-10s %10.2f %12.0f %14d %12d" % ('on' if pooled else 'off', elapsed, args.events / elapsed, allocated, collections))
+
+if __name__ == '__main__':
+    main()
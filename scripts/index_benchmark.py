@@ -0,0 +1,77 @@
+'''
+Benchmarks recall and query latency of the approximate embedding indexes against the flat baseline.
+
+Usage:
+    PYTHONPATH=. python scripts/index_benchmark.py --size 50000 --queries 200 --k 10
+'''
+from argparse import ArgumentParser
+from time import perf_counter
+from numpy import ndarray, float32, percentile, mean
+from numpy.random import default_rng
+import faiss
+
+from rtai.agent.memory.embedding_store import EMBEDDINGS_DIM, INDEX_FLAT, INDEX_HNSW, INDEX_IVFPQ, IndexConfig, build_index
+
+def make_embeddings(n: int, dim: int, num_clusters: int, rng) -> ndarray:
+    """ _summary_ Generate clustered, normalized embeddings resembling sentence embeddings of related memories"""
+    centers = rng.standard_normal((num_clusters, dim)).astype(float32)
+    embeddings = centers[rng.integers(0, num_clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype(float32)
+    faiss.normalize_L2(embeddings)
+    return embeddings
+
+def run(index: faiss.Index, queries: ndarray, k: int):
+    """ _summary_ Search every query one at a time, like the retriever does, and time each search"""
+    latencies, results = [], []
+    for q in queries:
+        start_time = perf_counter()
+        _, indices = index.search(q.reshape(1, -1), k)
+        latencies.append((perf_counter() - start_time) * 1000)
+        results.append(indices[0])
+    return latencies, results
+
+def recall(results, truth) -> float:
+    return mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)])
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=50000, help='number of embeddings in the index')
+    parser.add_argument('--queries', type=int, default=200, help='number of queries to run')
+    parser.add_argument('--k', type=int, default=10, help='number of neighbors to retrieve')
+    parser.add_argument('--dim', type=int, default=EMBEDDINGS_DIM, help='dimension of the embeddings')
+    parser.add_argument('--clusters', type=int, default=256, help='number of topic clusters in the synthetic data')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = default_rng(args.seed)
+    embeddings = make_embeddings(args.size, args.dim, args.clusters, rng)
+    queries = make_embeddings(args.queries, args.dim, args.clusters, rng)
+
+    configs = [
+        IndexConfig(index_type=INDEX_FLAT),
+        IndexConfig(index_type=INDEX_HNSW),
+        IndexConfig(index_type=INDEX_HNSW, hnsw_ef_search=32),
+        IndexConfig(index_type=INDEX_IVFPQ),
+        IndexConfig(index_type=INDEX_IVFPQ, ivf_nprobe=64),
+    ]
+
+    truth = None
+    print("%-36s %10s %10s %10s %10s" % ('index', 'build(s)', 'recall@%d' % args.k, 'p50(ms)', 'p99(ms)'))
+    for cfg in configs:
+        start_time = perf_counter()
+        index = build_index(embeddings, args.dim, cfg)
+        build_sec = perf_counter() - start_time
+
+        latencies, results = run(index, queries, args.k)
+        if truth is None:
+            truth = results # flat is exact
+
+        name = cfg.index_type
+        if cfg.index_type == INDEX_HNSW:
+            name += ' (M=%d efSearch=%d)' % (cfg.hnsw_m, cfg.hnsw_ef_search)
+        elif cfg.index_type == INDEX_IVFPQ:
+            ivf = faiss.extract_index_ivf(index)
+            name += ' (nlist=%d nprobe=%d m=%d)' % (ivf.nlist, ivf.nprobe, cfg.pq_m)
+        print("%-36s %10.2f %10.3f %10.3f %10.3f" % (name, build_sec, recall(results, truth), percentile(latencies, 50), percentile(latencies, 99)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+'''
+Benchmarks the per-call overhead of the rtai logging helpers on the calling thread, and how long the log files take to be fully written.
+
+Logs go to a temporary directory, so the timings include the file writes the calling threads wait on.
+
+Usage:
+    PYTHONPATH=. python scripts/logging_benchmark.py --calls 20000 --threads 4
+'''
+from argparse import ArgumentParser
+from logging import DEBUG
+from tempfile import TemporaryDirectory
+from threading import Thread
+from time import perf_counter
+
+from rtai.utils.logging import setup_logging, shutdown_logging, info, debug, log_transcript
+
+class Agent:
+    def act(self, i: int) -> None:
+        info("Agent [%s] finished act() in [%s] ms" % ('Alice', i))
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=20000, help='number of log calls per benchmark and thread')
+    parser.add_argument('--threads', type=int, default=4, help='number of threads logging concurrently')
+    parser.add_argument('--no-callee-stack', action='store_true', help='log without the calling class and method')
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as log_dir:
+        setup_logging(log_dir, 'rtai', DEBUG, 'transcript', use_callee_stack=not args.no_callee_stack)
+        agent = Agent()
+        benchmarks = {
+            'info (method)': lambda i: agent.act(i),
+            'debug %-args': lambda i: debug("Polling [%s] events from [%d] agents", 'chat', i),
+            'log_transcript': lambda i: log_transcript('Alice', '06:15 AM', 'Chat', 'Hello Bob, how are you today?'),
+        }
+
+        print("%-18s %8s %12s" % ('benchmark', 'threads', 'us/call'))
+        start_time = perf_counter()
+        for name, fn in benchmarks.items():
+            for num_threads in (1, args.threads):
+                def run():
+                    for i in range(args.calls):
+                        fn(i)
+                threads = [Thread(target=run) for _ in range(num_threads)]
+                call_start = perf_counter()
+                [t.start() for t in threads]
+                [t.join() for t in threads]
+                print("%-18s %8d %12.2f" % (name, num_threads, (perf_counter() - call_start) * 1e6 / (args.calls * num_threads)))
+
+        shutdown_logging()
+        print("all records written after %.2f s" % (perf_counter() - start_time))
+
+if __name__ == '__main__':
+    main()
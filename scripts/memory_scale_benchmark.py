@@ -0,0 +1,117 @@
+'''
+Benchmarks how an agent's long term memory scales from thousands to millions of concepts, for every index type.
+
+Synthetic concepts with precomputed, clustered embeddings are bulk loaded into a LongTermMemory in chunks, so no
+embeddings model is loaded and the timings measure the table, the index and the retriever. Queries are encoded
+by the hashing test model, so retrieval latency excludes the forward pass of a real model.
+
+Reports insert throughput, retrieve_context latency (with the faiss search share of it) and resident memory per size and index type.
+
+Usage:
+    PYTHONPATH=. python scripts/memory_scale_benchmark.py --sizes 10000 100000 1000000 --indexes Flat HNSW IVFPQ --queries 100 --output memory_scale.json
+'''
+from argparse import ArgumentParser
+from gc import collect
+from json import dump
+from time import perf_counter
+from numpy import ndarray, float32, percentile, mean
+from numpy.random import default_rng
+
+from rtai.agent.persona import Persona
+from rtai.agent.memory.long_memory import LongTermMemory
+from rtai.agent.memory.embedding_store import EMBEDDINGS_DIM, INDEX_FLAT, INDEX_HNSW, INDEX_IVFPQ, IndexConfig
+from rtai.llm.embedding_service import max_rss_mb
+from rtai.utils.stats import profiler
+from rtai.world.clock import clock
+from tests.mock.agent.embedding_mock import EmbeddingsTestModel
+
+WORDS = ['coffee', 'farm', 'river', 'market', 'letter', 'storm', 'library', 'festival', 'garden', 'train', 'museum', 'harbor',
+         'argument', 'promise', 'secret', 'dinner', 'rumor', 'bridge', 'lantern', 'journal', 'mayor', 'bakery', 'forest', 'trial']
+
+def rss_mb() -> float:
+    """ _summary_ Get the current resident memory of the process, falling back to the peak where /proc is not available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * 4096 / (1024 * 1024)
+    except OSError:
+        return max_rss_mb()
+
+def make_embeddings(n: int, centers: ndarray, rng) -> ndarray:
+    """ _summary_ Generate clustered embeddings resembling sentence embeddings of related memories"""
+    return centers[rng.integers(0, len(centers), n)] + 0.5 * rng.standard_normal((n, centers.shape[1])).astype(float32)
+
+def run(index_type: str, size: int, args) -> dict:
+    """ _summary_ Bulk load size concepts into a memory with the given index type, then time retrieval queries"""
+    rng = default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, EMBEDDINGS_DIM)).astype(float32)
+    name = "%s-%d" % (index_type, size)
+    persona = Persona(first_name='Synthetic', last_name=name, name=name, occupation='', backstory='', hobbies='', traits='', motivations='', relationships=[], age=30)
+
+    collect()
+    start_rss = rss_mb()
+    l_mem = LongTermMemory(persona, None, EmbeddingsTestModel(), IndexConfig(index_type=index_type))
+
+    load_sec = 0.0
+    for start in range(0, size, args.chunk):
+        n = min(args.chunk, size - start)
+        contents = ["Memory %d: the %s near the %s" % (start + i, WORDS[(start + i) % len(WORDS)], WORDS[(start + i) // len(WORDS) % len(WORDS)]) for i in range(n)]
+        embeddings = make_embeddings(n, centers, rng)
+        start_time = perf_counter()
+        l_mem.bulk_load(contents, embeddings)
+        load_sec += perf_counter() - start_time
+    loaded_rss = rss_mb()
+
+    latencies = []
+    for _ in range(args.queries):
+        query = "What happened at the %s near the %s?" % tuple(rng.choice(WORDS, 2))
+        start_time = perf_counter()
+        l_mem.retriever.retrieve_context(query, k=args.k)
+        latencies.append((perf_counter() - start_time) * 1000)
+    search = profiler.get(name, 'search')
+
+    return {
+        'index': index_type,
+        'size': size,
+        'inserts_per_sec': size / load_sec,
+        'load_sec': load_sec,
+        'retrieve_p50_ms': float(percentile(latencies, 50)),
+        'retrieve_p99_ms': float(percentile(latencies, 99)),
+        'retrieve_mean_ms': float(mean(latencies)),
+        'search_p50_ms': search.percentile(50),
+        'search_p99_ms': search.percentile(99),
+        'rss_mb': loaded_rss - start_rss,
+        'bytes_per_memory': (loaded_rss - start_rss) * 1024 * 1024 / size,
+        'peak_rss_mb': max_rss_mb(),
+    }
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='number of concepts per memory, up to millions')
+    parser.add_argument('--indexes', nargs='+', default=[INDEX_FLAT, INDEX_HNSW, INDEX_IVFPQ], help='index types to benchmark')
+    parser.add_argument('--chunk', type=int, default=50000, help='number of concepts per bulk load')
+    parser.add_argument('--queries', type=int, default=100, help='number of retrieve_context queries per memory')
+    parser.add_argument('--k', type=int, default=3, help='number of concepts in each retrieved context')
+    parser.add_argument('--clusters', type=int, default=256, help='number of topic clusters in the synthetic data')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='', help='json file to write the results to')
+    args = parser.parse_args()
+
+    # concepts are stamped with the world time
+    clock({'StartDate': '2024-01-01', 'StartTime': '06:15:00 AM', 'ClockIncrementSec': '30'})
+
+    results = []
+    print("%-8s %10s %12s %12s %12s %12s %10s %10s" % ('index', 'size', 'inserts/s', 'retr p50(ms)', 'retr p99(ms)', 'srch p50(ms)', 'rss(MB)', 'B/memory'))
+    for size in args.sizes:
+        for index_type in args.indexes:
+            r = run(index_type, size, args)
+            results.append(r)
+            print("%-8s %10d %12.0f %12.3f %12.3f %12.3f %10.1f %10.0f" % (index_type, size, r['inserts_per_sec'], r['retrieve_p50_ms'], r['retrieve_p99_ms'],
+                                                                         r['search_p50_ms'], r['rss_mb'], r['bytes_per_memory']))
+            collect()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+'''
+Benchmarks the agent cycle time of a single process Agent Manager against agents sharded across worker processes, from 2 to 200 agents.
+
+Agents answer from the LLMTestClient, so the timings measure the simulation itself rather than the model.
+Idle agents are not skipped, so every agent acts every cycle.
+
+Usage:
+    PYTHONPATH=. python scripts/shard_benchmark.py --config configs/rtai.yaml --agents 2 10 50 100 200 --shards 0 2 4 8 --cycles 20
+'''
+from argparse import ArgumentParser
+from queue import Queue
+from time import perf_counter
+from numpy import percentile, mean
+
+from rtai.utils.config import Config, YamlLoader
+from rtai.agent.agent_manager import AgentManager, NUM_AGENTS_CONFIG, SKIP_IDLE_AGENTS_CONFIG
+from rtai.agent.agent_shard import ShardedAgentManager, SHARDS_CONFIG
+from rtai.llm.embedding_service import EmbeddingService
+from rtai.world.clock import clock
+from tests.mock.llm.llm_client_mock import LLMTestClient
+
+def run(cfg: Config, client: LLMTestClient, embedding_service: EmbeddingService, num_agents: int, num_shards: int, cycles: int):
+    """ _summary_ Time the startup and every cycle of an agent manager with num_agents agents over num_shards processes"""
+    world_clock = clock(cfg.expand('Clock'))
+    agents_cfg = dict(cfg.expand('Agents').getDict())
+    agents_cfg.update({NUM_AGENTS_CONFIG: num_agents, SKIP_IDLE_AGENTS_CONFIG: False, SHARDS_CONFIG: num_shards})
+    agents_cfg = Config(agents_cfg, 'Agents')
+
+    start_time = perf_counter()
+    if num_shards > 0:
+        agent_mgr = ShardedAgentManager(Queue(), agents_cfg, cfg, client, None, embedding_service)
+    else:
+        agent_mgr = AgentManager(Queue(), agents_cfg, client, None, embedding_service)
+    agent_mgr.initialize()
+    agent_mgr.update(first_day=True)
+    startup_sec = perf_counter() - start_time
+
+    latencies = []
+    for _ in range(cycles):
+        world_clock.tick()
+        start_time = perf_counter()
+        agent_mgr.update()
+        latencies.append((perf_counter() - start_time) * 1000)
+    agent_mgr.stop()
+    return startup_sec, latencies
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--config', default='configs/rtai.yaml', help='simulation config')
+    parser.add_argument('--agents', type=int, nargs='+', default=[2, 10, 50, 100, 200], help='agent counts to benchmark')
+    parser.add_argument('--shards', type=int, nargs='+', default=[0, 2, 4, 8], help='shard counts to benchmark, 0 runs in process')
+    parser.add_argument('--cycles', type=int, default=20, help='number of cycles to time per run')
+    args = parser.parse_args()
+
+    cfg = YamlLoader.load(args.config)
+    client = LLMTestClient()
+    client.initialize(cfg.expand('LLMClient'))
+    embedding_service = EmbeddingService()
+    embedding_service.initialize(cfg.expand('Embeddings'))
+
+    print("%-8s %-8s %12s %10s %10s %10s %14s" % ('agents', 'shards', 'startup(s)', 'mean(ms)', 'p50(ms)', 'p99(ms)', 'agent-steps/s'))
+    for num_agents in args.agents:
+        for num_shards in args.shards:
+            if num_shards > num_agents:
+                continue
+            startup_sec, latencies = run(cfg, client, embedding_service, num_agents, num_shards, args.cycles)
+            print("%-8d %-8d %12.2f %10.3f %10.3f %10.3f %14.1f" % (num_agents, num_shards, startup_sec, mean(latencies), percentile(latencies, 50),
+                                                                 percentile(latencies, 99), num_agents * 1000 / mean(latencies)))
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,19 @@
 from typing import List
+from queue import Queue
+from types import SimpleNamespace
 
 from rtai.agent.agent import Agent
+from rtai.agent.agent_manager import AgentManager
+from rtai.core.event import Event
+from rtai.utils.config import Config
+from rtai.utils.datetime import datetime
+from rtai.world.clock import clock, DAY_BOUNDARY
 
 from tests.mock.agent.agent_manager_mock import mock_agent_manager
 from tests.mock.configs.config_mock import mock_config_base
 from tests.mock.llm.llm_client_mock import mock_llm_client
 from tests.mock.story.engine_mock import mock_worker_queue
+from tests.mock.world.world_clock_mock import mock_world_clock, MOCK_START_TIME as START
 
 def test_agent_manager_base(mock_agent_manager):
     agents: List[Agent] = mock_agent_manager.agents
@@ -17,4 +25,95 @@ def test_agent_manager_base(mock_agent_manager):
 
     for a in agents:
         assert len(a.s_mem.daily_plan) > 0
-        assert len(a.s_mem.daily_req) > 0
\ No newline at end of file
+        assert len(a.s_mem.daily_req) > 0
+
+
+class IdleAgent:
+    """ Stand-in for an Agent that is busy with one action until end_time"""
+    def __init__(self, name: str, end_time: int=None):
+        self.name = name
+        action = SimpleNamespace(address='home' if end_time is not None else '', end_time=datetime.fromtimestamp(end_time) if end_time is not None else None)
+        self.s_mem = SimpleNamespace(current_action=action, chatting_with='')
+        self.agent_queue = Queue()
+
+    def get_name(self) -> str:
+        return self.name
+
+def end_cycle(agent_mgr: AgentManager) -> List[str]:
+    """ Run the scheduling part of a cycle, returning the names of the agents that were due"""
+    due = agent_mgr.get_due_agents()
+    [agent_mgr._schedule_wakeup(a) for a in due]
+    return [a.get_name() for a in due]
+
+def test_agent_manager_skips_idle_agents(mock_world_clock):
+    agent_mgr = AgentManager(Queue(), Config(dict()), None, None, embedding_service=object())
+    try:
+        agents = [IdleAgent('Alice', START + 60), IdleAgent('Bob', START + 300), IdleAgent('Carol')]
+        agent_mgr.agents = {a.get_name(): a for a in agents}
+        [agent_mgr._schedule_wakeup(a) for a in agents]
+
+        # agents mid-action sleep until their action ends, agents without an action are always due
+        assert end_cycle(agent_mgr) == ['Carol']
+        clock.set_state({'datetime': START + 59, 'day_counter': 0})
+        assert end_cycle(agent_mgr) == ['Carol']
+        clock.set_state({'datetime': START + 60, 'day_counter': 0})
+        assert end_cycle(agent_mgr) == ['Alice', 'Carol']
+        # Alice's action has ended but is not replaced, so she stays due
+        assert end_cycle(agent_mgr) == ['Alice', 'Carol']
+        assert agent_mgr.get_schedule_stats() == {'agent_steps': 6, 'skipped_agent_steps': 6}
+
+        # an event wakes an agent up before its action ends, and it stays due while the event is unprocessed
+        agent_mgr.wake('Bob')
+        assert end_cycle(agent_mgr) == ['Alice', 'Bob', 'Carol']
+        assert agent_mgr.dispatch_to_agent(Event.create_chat_event(agents[0], 'hello', 'Bob'))
+        assert end_cycle(agent_mgr) == ['Alice', 'Bob', 'Carol']
+        assert end_cycle(agent_mgr) == ['Alice', 'Bob', 'Carol']
+        agents[1].agent_queue.get().release()
+        assert end_cycle(agent_mgr) == ['Alice', 'Bob', 'Carol']
+        assert end_cycle(agent_mgr) == ['Alice', 'Carol']
+
+        # Bob's wakeup from before the events still fires
+        clock.set_state({'datetime': START + 300, 'day_counter': 0})
+        assert end_cycle(agent_mgr) == ['Alice', 'Bob', 'Carol']
+
+        # forcing a cycle (e.g. a new day) updates every agent, idle or not
+        agents[0].s_mem.current_action.end_time = datetime.fromtimestamp(START + 3600)
+        agents[1].s_mem.current_action.end_time = datetime.fromtimestamp(START + 3600)
+        assert end_cycle(agent_mgr) == ['Alice', 'Bob', 'Carol']
+        assert end_cycle(agent_mgr) == ['Carol']
+        assert [a.get_name() for a in agent_mgr.get_due_agents(force=True)] == ['Alice', 'Bob', 'Carol']
+    finally:
+        agent_mgr.stop()
+
+def test_agent_manager_sweeps_memories_on_new_day(mock_world_clock):
+    agent_mgr = AgentManager(Queue(), Config(dict()), None, None, embedding_service=object())
+    try:
+        # 06:15 AM -> 11:59:00 PM -> 11:59:30 PM
+        clock.set_state({'datetime': START + 2128 * 30, 'day_counter': 0})
+        mock_world_clock.tick()
+        assert not agent_mgr.sweep_due
+
+        # the clock crossing midnight schedules a single sweep, on the day it starts
+        mock_world_clock.tick()
+        mock_world_clock.tick()
+        assert agent_mgr.sweep_due
+        assert agent_mgr.sweep_memories() == 0
+        assert agent_mgr.memory_sweeps == [{'day': 1, 'reclaimed': 0, 'index_size': 0}]
+        assert not agent_mgr.sweep_due
+    finally:
+        agent_mgr.stop()
+    assert agent_mgr._on_new_day not in clock.subscribers[DAY_BOUNDARY]
+
+def test_agent_manager_keeps_redispatched_narration(mock_world_clock):
+    agent_mgr = AgentManager(Queue(), Config(dict()), None, None, embedding_service=object())
+    narration = Event.create_narration_event(IdleAgent('Narrator'), 'It is raining')
+    try:
+        agent_mgr.dispatch_narration(narration)
+        narration.release()
+        # the manager holds the only reference, so dispatching the same narration again must not recycle it
+        agent_mgr.dispatch_narration(narration)
+        assert agent_mgr.last_narration is narration
+        assert narration.refs == 1
+        assert narration.get_message() == 'It is raining'
+    finally:
+        agent_mgr.stop()
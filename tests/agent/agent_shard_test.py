@@ -0,0 +1,95 @@
+from os import path
+from queue import Queue
+from typing import Callable, List, Tuple
+
+from rtai.agent.abstract_agent import AbstractAgent
+from rtai.agent.agent_manager import AgentManager, AGENTS_SNAPSHOT_DIR
+from rtai.agent.agent_shard import ShardedAgentManager, SHARD_CHAT_ID_SHIFT, CMD_CHAT_MESSAGES
+from rtai.agent.behavior.chat_message import ChatMessage
+from rtai.core.event import EventType
+from rtai.utils.config import Config
+from rtai.world.clock import clock
+
+from tests.mock.agent.agent_mock import write_persona_files
+from tests.mock.agent.embedding_mock import EmbeddingsTestModel
+from tests.mock.llm.llm_client_mock import LLMTestClient
+from tests.mock.world.world_clock_mock import mock_world_clock, MOCK_START_TIME
+
+# the LLMTestClient schedules Hank and Claire to chat with each other at 9:15
+NAMES = ['Hank Thompson', 'Claire Reynolds']
+CYCLES = 50 # until 10:25, an hour into the chat
+
+def run_cycles(agent_mgr: AgentManager, queue: Queue, world_clock: clock, take_messages: Callable[[], List[Tuple[int, ChatMessage]]]) -> Tuple[list, list, set]:
+    """ Run the agent cycles, routing the chat requests as the engine does, and collect the events and chat messages of every cycle"""
+    first_agent_id = int(AbstractAgent.id) - len(NAMES)
+    events, messages, chat_ids = [], [], set()
+    agent_mgr.update(first_day=True)
+    for _ in range(CYCLES):
+        world_clock.tick()
+        agent_mgr.update()
+        cycle_events = []
+        while not queue.empty():
+            event = queue.get()
+            cycle_events.append((clock.get_time_str(), event.get_event_type().name, event.get_sender(), str(event.get_message())))
+            if event.get_event_type() == EventType.ChatEvent:
+                agent_mgr.dispatch_chat_event(event)
+            event.release()
+        cycle_messages = take_messages()
+        chat_ids.update(int(chat_id) for chat_id, _ in cycle_messages)
+        # agents in process act in parallel, so only the set of events of a cycle is deterministic
+        events.append(sorted(cycle_events))
+        messages.append(sorted((int(m.sender_id) - first_agent_id, m.message) for _, m in cycle_messages))
+    return events, messages, chat_ids
+
+def test_sharded_agent_manager_matches_single_process(tmp_path, mock_world_clock):
+    clock.set_speed(10) # 5 minutes per cycle
+    persona_files = write_persona_files(str(tmp_path), NAMES)
+    agents_cfg = {'NumAgents': len(NAMES), 'LoadFiles': str(persona_files), 'SkipIdleAgents': 'False'}
+    # the root config is overridden by the manager's, so shards must not skip idle agents either
+    root_cfg = Config({'Clock': {'StartDate': '2024-01-01', 'StartTime': '06:15:00 AM', 'ClockIncrementSec': '30'}, 'Agents': {'SkipIdleAgents': 'True'}})
+    client = LLMTestClient()
+    client.initialize(root_cfg.expand('LLMClient'))
+
+    queue = Queue()
+    agent_mgr = AgentManager(queue, Config(agents_cfg, 'Agents'), client, None, EmbeddingsTestModel())
+    agent_mgr.initialize()
+    agent_mgr.chat_mgr.written = []
+    expected_events, expected_messages, _ = run_cycles(agent_mgr, queue, mock_world_clock, agent_mgr.chat_mgr.take_written)
+    agent_mgr.stop()
+
+    # every agent in its own process, recording the chat messages passed on between the shards
+    clock.set_state({'datetime': MOCK_START_TIME, 'day_counter': 0})
+    queue = Queue()
+    agent_mgr = ShardedAgentManager(queue, Config(dict(agents_cfg, Shards=2), 'Agents'), root_cfg, client, None, shard_embeddings_model=EmbeddingsTestModel())
+    forwarded = []
+    send = agent_mgr._send
+    def record(shard: int, cmd: str, args=None) -> None:
+        if cmd == CMD_CHAT_MESSAGES:
+            forwarded.extend(args)
+        send(shard, cmd, args)
+    def take_forwarded() -> List[Tuple[int, ChatMessage]]:
+        messages = list(forwarded)
+        forwarded.clear()
+        return messages
+    agent_mgr._send = record
+
+    try:
+        assert agent_mgr.initialize()
+        assert agent_mgr.agent_shards == {'Hank Thompson': 0, 'Claire Reynolds': 1}
+        events, messages, chat_ids = run_cycles(agent_mgr, queue, mock_world_clock, take_forwarded)
+        assert agent_mgr.get_schedule_stats() == {'agent_steps': len(NAMES) * (CYCLES + 1), 'skipped_agent_steps': 0}
+
+        # chat requests cross the shards and both agents take turns in the chat, with agent IDs as in process
+        assert events == expected_events
+        assert sum(e[1] == 'ChatEvent' for cycle in events for e in cycle) == 2
+        assert messages == expected_messages
+        assert sum(len(m) for m in messages) > 10
+        assert {sender for cycle in messages for sender, _ in cycle} == {1, 2}
+        # chat IDs of each shard start at their own offset
+        assert {chat_id >> SHARD_CHAT_ID_SHIFT for chat_id in chat_ids} == {1, 2}
+
+        agent_mgr.save_agents(str(tmp_path))
+        assert all(path.exists(path.join(str(tmp_path), AGENTS_SNAPSHOT_DIR, name)) for name in NAMES)
+        assert agent_mgr.load_agents(str(tmp_path))
+    finally:
+        agent_mgr.stop()
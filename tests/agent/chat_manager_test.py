@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from pytest import mark
+
+from rtai.agent.chat_manager import ChatManager
+from rtai.agent.behavior.chat import Chat
+from rtai.agent.behavior.chat_message import ChatMessage
+from rtai.utils.datetime import datetime, timedelta
+
+from tests.mock.world.world_clock_mock import mock_world_clock
+
+START = datetime.strptime('2024-01-01 06:15:00 AM')
+
+# chat messages are stamped with the world time
+pytestmark = mark.usefixtures('mock_world_clock')
+
+def make_chat(creator_id: int, start_time: datetime=START) -> Chat:
+    return Chat(description="Chat", creator_id=creator_id, address="Test Address", start_time=start_time, duration=timedelta(minutes=30))
+
+def test_chat_manager_defers_writes():
+    chat_mgr = ChatManager()
+    chat = make_chat(1)
+    chat_mgr.create_chat(chat)
+
+    with chat_mgr.defer_writes():
+        chat_mgr.write_to_chat(chat, ChatMessage(sender_id=2, sender_name="B", message="second"))
+        chat_mgr.write_to_chat(chat, ChatMessage(sender_id=1, sender_name="A", message="first"))
+        # agents keep reading the history as it was at the start of the phase
+        assert len(chat_mgr.get_chat_history(chat)) == 0
+
+    assert [m.message for m in chat_mgr.get_chat_history(chat)] == ["first", "second"]
+
+    chat_mgr.write_to_chat(chat, ChatMessage(sender_id=2, sender_name="B", message="third"))
+    assert len(chat_mgr.get_chat_history(chat)) == 3
+
+def test_chat_manager_parallel_writes_are_deterministic():
+    def run() -> list:
+        chat_mgr = ChatManager()
+        chats = [make_chat(i) for i in range(8)]
+        [chat_mgr.create_chat(c) for c in chats]
+
+        def act(sender_id: int):
+            for c in chats:
+                chat_mgr.write_to_chat(c, ChatMessage(sender_id=sender_id, sender_name=str(sender_id), message=str(sender_id)))
+
+        with chat_mgr.defer_writes():
+            with ThreadPoolExecutor(8) as tp:
+                wait([tp.submit(act, i) for i in reversed(range(8))])
+        return [[m.message for m in chat_mgr.get_chat_history(c)] for c in chats]
+
+    first = run()
+    assert all(history == [str(i) for i in range(8)] for history in first)
+    assert all(run() == first for _ in range(5))
+
+def test_chat_priority():
+    early, late = make_chat(5), make_chat(1, START + timedelta(minutes=1))
+    assert early.get_priority() < late.get_priority()
+    # same start - lowest creator wins, regardless of which chat was created first
+    assert make_chat(2).get_priority() > make_chat(1).get_priority()
+    assert len({make_chat(1).get_id() for _ in range(10)}) == 10
+
+def test_chat_manager_shares_written_messages():
+    sender, receiver = ChatManager(), ChatManager()
+    sender.written = []
+    chat, other = make_chat(1), make_chat(2)
+    sender.create_chat(chat)
+    receiver.create_chat(chat)
+
+    sender.write_to_chat(chat, ChatMessage(sender_id=1, sender_name="A", message="hi"))
+    with sender.defer_writes():
+        sender.write_to_chat(chat, ChatMessage(sender_id=1, sender_name="A", message="there"))
+
+    written = sender.take_written()
+    assert [m.message for _, m in written] == ["hi", "there"]
+    assert sender.take_written() == []
+
+    # messages of chats the receiver does not know about are dropped
+    receiver.receive(written + [(other.get_id(), ChatMessage(sender_id=2, sender_name="B", message="lost"))])
+    assert [m.message for m in receiver.get_chat_history(chat)] == ["hi", "there"]
+    assert receiver.take_written() == []
@@ -0,0 +1,131 @@
+import faiss
+
+from rtai.agent.memory.embedding_store import EmbeddingStore, IndexConfig, INDEX_HNSW, INDEX_IVFPQ
+from rtai.agent.memory.memory_table import MemoryTable
+from rtai.agent.retriever import Retriever
+
+from tests.mock.agent.embedding_mock import mock_embeddings_model
+
+def test_embedding_store_incremental_add(mock_embeddings_model):
+    store = EmbeddingStore(mock_embeddings_model)
+    retriever = Retriever(store, MemoryTable())
+
+    for i in range(50):
+        assert store.add("memory %d" % i) == i
+
+    # each insert only encodes the new content
+    assert mock_embeddings_model.num_encoded == 50
+    assert len(store) == 50
+    assert retriever.index is store.index
+    assert retriever.index.ntotal == 50
+    assert store.insert_latency.count == 50
+
+def test_embedding_store_search(mock_embeddings_model):
+    store = EmbeddingStore(mock_embeddings_model)
+    contents = ["memory %d" % i for i in range(20)]
+    for c in contents:
+        store.add(c)
+
+    _, indices = store.search("memory 7", 1)
+    assert indices[0][0] == 7
+
+    store.rebuild(contents[:10])
+    assert len(store) == 10
+
+def test_embedding_store_promotes_to_hnsw(mock_embeddings_model):
+    store = EmbeddingStore(mock_embeddings_model, index_config=IndexConfig(index_type=INDEX_HNSW, promote_threshold=100))
+    for i in range(99):
+        store.add("memory %d" % i)
+    assert not store.promoted
+
+    store.add("memory 99")
+    assert store.promoted
+    assert isinstance(faiss.downcast_index(store.index.index), faiss.IndexHNSWFlat)
+    assert len(store) == 100
+
+    # embeddings added after promotion go straight into the approximate index
+    store.add("memory 100")
+    assert len(store) == 101
+    similarities, indices = store.search("memory 100", 1)
+    assert indices[0][0] == 100
+    assert abs(similarities[0][0] - 1.0) < 1e-4
+
+def test_embedding_store_extend_with_precomputed_embeddings(mock_embeddings_model):
+    store = EmbeddingStore(mock_embeddings_model, index_config=IndexConfig(index_type=INDEX_HNSW, promote_threshold=100))
+    contents = ["memory %d" % i for i in range(150)]
+    embeddings = mock_embeddings_model.encode(contents)
+    raw = embeddings.copy()
+    mock_embeddings_model.num_encoded = 0
+
+    assert list(store.extend(embeddings[:50])) == list(range(50))
+    assert not store.promoted
+
+    # crossing the threshold builds the approximate index from the raw embeddings
+    assert list(store.extend(embeddings[50:])) == list(range(50, 150))
+    assert store.promoted and store.index.ntotal == 150
+    assert mock_embeddings_model.num_encoded == 0
+    # the input is left as it was, the store keeps normalized copies
+    assert (embeddings == raw).all()
+    assert abs(float((store.get_embeddings()[120] ** 2).sum()) - 1.0) < 1e-4
+
+    _, indices = store.search("memory 120", 1)
+    assert indices[0][0] == 120
+
+def test_embedding_store_promotes_to_ivfpq(mock_embeddings_model):
+    store = EmbeddingStore(mock_embeddings_model, index_config=IndexConfig(index_type=INDEX_IVFPQ, promote_threshold=0, ivf_nlist=4, ivf_nprobe=4, pq_m=8, pq_bits=4))
+    assert store.promote_threshold == 16
+
+    store.rebuild(["memory %d" % i for i in range(200)])
+    assert store.promoted
+    assert isinstance(faiss.downcast_index(store.index.index), faiss.IndexIVFPQ)
+    assert len(store) == 200
+    assert store.get_embeddings().shape == (200, store.dim)
+
+def test_embedding_store_remove_keeps_ids(mock_embeddings_model):
+    store = EmbeddingStore(mock_embeddings_model)
+    for i in range(20):
+        store.add("memory %d" % i)
+
+    assert store.remove([3, 7, 7]) == 2
+    assert store.remove([3]) == 0
+    assert len(store) == 18
+
+    # remaining embeddings keep their ids, new ones are never given a removed id
+    _, indices = store.search("memory 12", 1)
+    assert indices[0][0] == 12
+    assert store.add("memory 20") == 20
+    _, indices = store.search("memory 3", 18)
+    assert 3 not in indices[0]
+
+def test_embedding_store_remove_rebuilds_hnsw(mock_embeddings_model):
+    store = EmbeddingStore(mock_embeddings_model, index_config=IndexConfig(index_type=INDEX_HNSW, promote_threshold=10))
+    for i in range(30):
+        store.add("memory %d" % i)
+    assert store.promoted
+
+    assert store.remove(list(range(0, 30, 2))) == 15
+    assert len(store) == 15
+    assert list(store.get_alive_ids()) == list(range(1, 30, 2))
+    _, indices = store.search("memory 9", 1)
+    assert indices[0][0] == 9
+
+def test_embedding_store_save_and_load(mock_embeddings_model, tmp_path):
+    store = EmbeddingStore(mock_embeddings_model)
+    for i in range(20):
+        store.add("memory %d" % i)
+    store.remove([4])
+    store.save(str(tmp_path))
+
+    loaded = EmbeddingStore(mock_embeddings_model)
+    loaded.load(str(tmp_path))
+    num_encoded = mock_embeddings_model.num_encoded
+
+    assert len(loaded) == 19
+    assert loaded.get_embeddings().shape == (20, loaded.dim)
+    assert not loaded.alive[4]
+
+    # restoring never re-encodes, and new embeddings continue the id sequence
+    assert loaded.add("memory 20") == 20
+    assert mock_embeddings_model.num_encoded == num_encoded + 1
+    _, indices = loaded.search("memory 11", 1)
+    assert indices[0][0] == 11
@@ -0,0 +1,60 @@
+from os import path
+from numpy import load, save, zeros, float32
+from pytest import raises
+
+from rtai.agent.persona import Persona
+from rtai.agent.memory.embedding_store import EMBEDDINGS_FILE
+from rtai.agent.memory.long_memory import LongTermMemory
+
+from tests.mock.agent.embedding_mock import mock_embeddings_model
+from tests.mock.world.world_clock_mock import mock_world_clock
+
+def make_memory(embeddings_model) -> LongTermMemory:
+    persona = Persona(first_name='Alice', last_name='Smith', name='Alice Smith', occupation='', backstory='', hobbies='', traits='', motivations='', relationships=[], age=30)
+    return LongTermMemory(persona, None, embeddings_model)
+
+def test_long_memory_restores_snapshot(tmp_path, mock_embeddings_model, mock_world_clock):
+    l_mem = make_memory(mock_embeddings_model)
+    l_mem.bulk_load(["memory %d." % i for i in range(20)])
+    l_mem.save_to_file(str(tmp_path))
+
+    restored = make_memory(mock_embeddings_model)
+    assert restored.load_from_file(str(tmp_path))
+    assert len(restored.id_to_node) == 20
+    assert restored.retriever.retrieve_context("memory 7.", k=1) == "memory 7."
+
+def test_long_memory_rejects_mismatched_snapshot(tmp_path, mock_embeddings_model, mock_world_clock):
+    l_mem = make_memory(mock_embeddings_model)
+    l_mem.bulk_load(["memory %d." % i for i in range(20)])
+    l_mem.save_to_file(str(tmp_path))
+    # drop embeddings so the snapshot no longer matches its table
+    embeddings_file = path.join(str(tmp_path), EMBEDDINGS_FILE)
+    save(embeddings_file, load(embeddings_file)[:15])
+
+    restored = make_memory(mock_embeddings_model)
+    restored.bulk_load(["initial %d." % i for i in range(5)])
+    table, store = restored.table, restored.embedding_store
+    assert not restored.load_from_file(str(tmp_path))
+
+    # the failed restore leaves the memory as it was, so initial memories still line up with their embeddings
+    assert restored.table is table and restored.embedding_store is store
+    assert restored.retriever.table is table and restored.retriever.embedding_store is store
+    restored.bulk_load(["shared %d." % i for i in range(5)])
+    assert len(restored.table) == len(restored.embedding_store.get_embeddings()) == 10
+    assert restored.retriever.retrieve_context("shared 3.", k=1) == "shared 3."
+
+def test_long_memory_rejects_mismatched_embeddings(mock_embeddings_model, mock_world_clock):
+    l_mem = make_memory(mock_embeddings_model)
+    l_mem.bulk_load(["memory %d." % i for i in range(5)])
+    dim = l_mem.embedding_store.dim
+
+    # wrong count or wrong dim is rejected before anything is added, so the table and the index stay aligned
+    with raises(ValueError):
+        l_mem.bulk_load(["extra %d." % i for i in range(3)], zeros((2, dim), dtype=float32))
+    with raises(ValueError):
+        l_mem.bulk_load(["extra %d." % i for i in range(3)], zeros((3, dim + 1), dtype=float32))
+    assert len(l_mem.table) == len(l_mem.embedding_store) == 5
+
+    l_mem.bulk_load(["extra %d." % i for i in range(3)], mock_embeddings_model.encode(["extra %d." % i for i in range(3)]))
+    assert len(l_mem.table) == len(l_mem.embedding_store) == 8
+    assert l_mem.retriever.retrieve_context("extra 1.", k=1) == "extra 1."
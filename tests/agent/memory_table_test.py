@@ -0,0 +1,77 @@
+from rtai.core.event import EventType
+from rtai.agent.memory.memory_table import MemoryTable, NO_EXPIRATION
+
+def test_memory_table_append_and_grow():
+    table = MemoryTable(capacity=2)
+    for i in range(5):
+        assert table.append(i, "concept %d é" % i, EventType.ThoughtEvent, importance=i, created_sim_time=100 + i) == i
+
+    assert len(table) == 5
+    assert len(table.node_id) >= 5
+    assert table.content(3) == "concept 3 é"
+    assert list(table.created_sim_time[:5]) == [100, 101, 102, 103, 104]
+    assert table.expiration[4] == NO_EXPIRATION
+
+def test_concept_view_reads_do_not_touch():
+    table = MemoryTable()
+    row = table.append(11, "went to the market", EventType.ActionEvent, importance=7, created_sim_time=0, expiration=60, last_accessed=1.0)
+    view = table.view(row)
+
+    assert view.node_id == 11
+    assert view.event_type == EventType.ActionEvent
+    assert view.importance == 7
+    assert view.expiration == 60
+    assert view.summary() == str(view) == "went to the market"
+    assert view.last_accessed == 1.0
+
+    view.touch()
+    assert view.last_accessed > 1.0
+
+def test_memory_table_select_forgettable():
+    table = MemoryTable()
+    table.append(0, "expired", EventType.ThoughtEvent, importance=7, created_sim_time=0, expiration=100)
+    table.append(1, "not expired", EventType.ThoughtEvent, importance=7, created_sim_time=0, expiration=1000)
+    table.append(2, "never expires", EventType.ThoughtEvent, importance=7, created_sim_time=0)
+    table.append(3, "unimportant", EventType.ThoughtEvent, importance=1, created_sim_time=0)
+
+    assert list(table.select_forgettable(now=500)) == [0]
+    assert list(table.select_forgettable(now=500, min_importance=2)) == [0, 3]
+
+    table.remove([0])
+    assert list(table.select_forgettable(now=500)) == []
+    assert table.num_alive() == 3
+    assert len(table) == 4
+
+def test_memory_table_save_and_load(tmp_path):
+    table = MemoryTable()
+    for i in range(3):
+        table.append(i, "concept %d" % i, EventType.ChatEvent, importance=i, created_sim_time=10 * i, expiration=100)
+    table.remove([1])
+    table.save(str(tmp_path / "table.npz"))
+
+    loaded = MemoryTable.load(str(tmp_path / "table.npz"))
+    assert len(loaded) == 3
+    assert loaded.num_alive() == 2
+    assert [loaded.content(i) for i in range(3)] == ["concept 0", "concept 1", "concept 2"]
+    assert list(loaded.created_sim_time[:3]) == [0, 10, 20]
+    assert loaded.view(2).event_type == EventType.ChatEvent
+
+    # loaded tables keep growing from where they left off
+    assert loaded.append(3, "concept 3", EventType.ChatEvent, importance=0, created_sim_time=0) == 3
+    assert loaded.content(3) == "concept 3"
+
+def test_memory_table_extend():
+    table = MemoryTable(capacity=2)
+    table.append(0, "first", EventType.ThoughtEvent, importance=1, created_sim_time=0)
+
+    rows = table.extend(range(1, 6), ["bulk %d é" % i for i in range(1, 6)], EventType.ActionEvent, importance=7, created_sim_time=[10, 11, 12, 13, 14], expiration=100)
+    assert list(rows) == [1, 2, 3, 4, 5]
+    assert len(table) == 6
+    assert [table.content(i) for i in range(6)] == ["first"] + ["bulk %d é" % i for i in range(1, 6)]
+    assert list(table.created_sim_time[1:6]) == [10, 11, 12, 13, 14]
+    assert table.view(3).event_type == EventType.ActionEvent and table.view(3).expiration == 100
+    assert table.num_alive() == 6
+
+    # appends after a bulk load continue from its end
+    assert table.append(6, "last", EventType.ThoughtEvent, importance=1, created_sim_time=0) == 6
+    assert table.content(6) == "last"
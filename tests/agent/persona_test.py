@@ -0,0 +1,14 @@
+from json import dumps, loads
+from numpy import uint8
+
+from rtai.agent.persona import Persona
+
+def test_persona_round_trips_through_json():
+    persona = Persona(first_name='Alice', last_name='Smith', name='Alice Smith', occupation='Baker', backstory='', hobbies='', traits='', motivations='', relationships=['Bob'], age=uint8(30))
+
+    data = loads(dumps(persona.to_dict()))
+    assert data['age'] == 30
+
+    restored = Persona.from_dict(data)
+    assert restored == persona
+    assert isinstance(restored.age, uint8)
@@ -0,0 +1,36 @@
+from time import time
+
+from rtai.agent.memory.embedding_store import EmbeddingStore
+from rtai.agent.memory.memory_table import MemoryTable
+from rtai.agent.retriever import Retriever
+
+from tests.mock.agent.embedding_mock import mock_embeddings_model
+
+def test_retriever_scores_relevance_and_importance(mock_embeddings_model):
+    storage = ["memory %d." % i for i in range(200)]
+    store = EmbeddingStore(mock_embeddings_model)
+    table = MemoryTable()
+    retriever = Retriever(store, table)
+    for i, s in enumerate(storage):
+        assert table.append(i, s, None, importance=0, created_sim_time=0) == store.add(s)
+
+    # the most relevant concept wins when importance and recency are equal
+    assert retriever.retrieve_context("memory 42.", k=1) == "memory 42."
+
+    # importance outweighs relevance
+    table.importance[7] = 9
+    assert retriever.retrieve_context("memory 42.", k=1) == "memory 7."
+
+def test_retriever_touches_retrieved_concepts(mock_embeddings_model):
+    storage = ["memory %d." % i for i in range(10)]
+    store = EmbeddingStore(mock_embeddings_model)
+    table = MemoryTable()
+    retriever = Retriever(store, table)
+    long_ago = time() - 48 * 3600
+    for i, s in enumerate(storage):
+        table.append(i, s, None, importance=0, created_sim_time=0, last_accessed=long_ago)
+        store.add(s)
+
+    context = retriever.retrieve_context("memory 3.", k=2)
+    assert context.startswith("memory 3.")
+    assert (table.last_accessed[:10] > long_ago).sum() == 2
@@ -0,0 +1,105 @@
+from threading import Thread
+
+from rtai.core.event import Event, EventType
+from rtai.core.event_bus import EventBus
+
+class Sender:
+    def __init__(self, name: str):
+        self.name = name
+
+    def get_name(self) -> str:
+        return self.name
+
+class Recorder:
+    """ Subscriber keeping every event it receives"""
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event: Event) -> None:
+        self.events.append(event.retain())
+
+    def messages(self) -> list:
+        return [e.get_message() for e in self.events]
+
+def test_event_bus_routes_by_type_and_topic():
+    bus = EventBus()
+    narrations, actions, alice_chats, bob_chats = Recorder(), Recorder(), Recorder(), Recorder()
+    bus.subscribe(EventType.NarrationEvent, narrations)
+    bus.subscribe(EventType.ActionEvent, actions)
+    bus.subscribe(EventType.ChatEvent, alice_chats, topic='Alice')
+    bus.subscribe(EventType.ChatEvent, bob_chats, topic='Bob')
+
+    alice, bob = Sender('Alice'), Sender('Bob')
+    bus.put(Event.create_narration_event(Sender('Narrator'), 'It is raining'))
+    bus.put(Event.create_action_event(alice, 'reading a book'))
+    bus.put(Event.create_chat_event(alice, 'hello', 'Bob'))
+    bus.put(Event.create_chat_event(bob, 'hi', 'Alice'))
+    bus.put(Event.create_chat_event(bob, 'anyone?', 'Carol'))
+    bus.put(Event.create_thought_event(bob, 'hmm'))
+
+    assert bus.drain() == 6
+    assert narrations.messages() == ['It is raining']
+    assert actions.messages() == ['reading a book']
+    assert alice_chats.messages() == ['hi']
+    assert bob_chats.messages() == ['hello']
+
+    stats = bus.get_stats()
+    assert stats['published'] == 6
+    assert stats['dispatched'] == 4
+    assert stats['unhandled'] == 2 # chat to Carol and the thought
+    assert stats['pending'] == 0
+
+    assert bus.unsubscribe(EventType.ActionEvent, actions)
+    assert not bus.unsubscribe(EventType.ActionEvent, actions)
+    bus.put(Event.create_action_event(alice, 'walking'))
+    bus.drain()
+    assert len(actions.events) == 1
+
+def test_event_bus_drains_in_batches_and_applies_backpressure():
+    bus = EventBus(max_pending=3, publish_timeout=0.01)
+    received = Recorder()
+    bus.subscribe(EventType.ActionEvent, received)
+    sender = Sender('Alice')
+
+    for i in range(4):
+        bus.put(Event.create_action_event(sender, str(i)))
+    # the last event timed out waiting for room
+    assert bus.get_stats()['dropped'] == 1
+    assert bus.qsize() == 3
+
+    assert bus.drain(2) == 2
+    assert received.messages() == ['0', '1']
+
+    # a blocked publisher resumes as soon as a drain makes room
+    bus.publish_timeout = 5
+    bus.put(Event.create_action_event(sender, '3'))
+    publisher = Thread(target=bus.put, args=(Event.create_action_event(sender, '4'),))
+    publisher.start()
+    bus.drain(1)
+    publisher.join()
+
+    assert bus.drain() == 2
+    assert received.messages() == ['0', '1', '2', '3', '4']
+    assert bus.get_stats() == {'published': 5, 'dispatched': 5, 'dropped': 1, 'unhandled': 0, 'failed': 0, 'pending': 0, 'max_depth': 3}
+
+def test_event_bus_survives_failing_subscribers():
+    bus = EventBus()
+    received = Recorder()
+
+    def fail(event: Event) -> None:
+        raise RuntimeError('boom')
+
+    bus.subscribe(EventType.ActionEvent, fail)
+    bus.subscribe(EventType.ActionEvent, received)
+    event = Event.create_action_event(Sender('Alice'), 'reading a book')
+    bus.put(event.retain())
+    bus.put(Event.create_action_event(Sender('Bob'), 'walking'))
+
+    assert bus.drain() == 2
+    # later subscribers still get the event and the bus still releases its reference
+    assert received.messages() == ['reading a book', 'walking']
+    assert event.refs == 2
+    assert bus.get_stats()['failed'] == 2
+
+    # every drained event was marked done
+    bus.join()
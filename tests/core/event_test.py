@@ -0,0 +1,38 @@
+from pickle import dumps, loads
+
+from rtai.core.event import Event, EventType, ChatEvent, event_pool
+
+class Sender:
+    def get_name(self) -> str:
+        return 'Alice'
+
+def test_event_types_are_subclasses():
+    event = Event.create_chat_event(Sender(), 'hello', 'Bob')
+    assert isinstance(event, ChatEvent)
+    assert event.get_event_type() == EventType.ChatEvent
+    assert event.get_receiver() == 'Bob'
+    assert Event.create_empty_event().get_event_type() == EventType.InvalidEvent
+
+    # events cross process boundaries when agents are sharded
+    copy = loads(dumps(event))
+    assert type(copy) is ChatEvent and copy.get_message() == 'hello' and copy.get_timestamp() == event.get_timestamp()
+
+def test_event_pool_recycles_released_events():
+    first = Event.create_action_event(Sender(), 'reading a book')
+    first.retain()
+    first.release()
+    # still referenced once
+    assert first.get_message() == 'reading a book'
+
+    recycled = event_pool.get_stats()['recycled']
+    first.release()
+    assert event_pool.get_stats()['recycled'] == recycled + 1
+    assert first.get_message() == ''
+
+    second = Event.create_action_event(Sender(), 'walking')
+    assert second is first
+    assert second.get_message() == 'walking'
+    assert second.get_timestamp() > 0
+
+    # the free lists are kept per event type
+    assert Event.create_narration_event(Sender(), 'It is raining') is not first
@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+from numpy import allclose
+
+from rtai.llm.embedding_service import EmbeddingService
+
+from tests.mock.agent.embedding_mock import EmbeddingsTestModel
+from tests.mock.llm.embedding_service_mock import mock_embedding_service
+
+class SlowEmbeddingsModel(EmbeddingsTestModel):
+    def encode(self, sentences):
+        sleep(0.01)
+        return super().encode(sentences)
+
+def test_embedding_service_coalesces_requests(mock_embedding_service):
+    model = SlowEmbeddingsModel()
+    service = mock_embedding_service
+    assert service.initialize(embeddings_model=model)
+    assert EmbeddingService() is service
+
+    start_batches = service.num_batches
+    sentences = ["memory %d" % i for i in range(32)]
+    with ThreadPoolExecutor(8) as tp:
+        results = list(tp.map(lambda s: service.encode([s]), sentences))
+
+    reference = EmbeddingsTestModel()
+    for s, r in zip(sentences, results):
+        assert allclose(r, reference.encode([s]))
+
+    # concurrent requests share forward passes
+    assert service.num_batches - start_batches < len(sentences)
+
+def test_embedding_service_is_reset_between_tests(mock_embedding_service):
+    # a fresh service has not loaded any model yet, in particular not the one of another test
+    assert mock_embedding_service.model is None
+    assert mock_embedding_service.num_requests == 0
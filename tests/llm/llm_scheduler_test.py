@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import sleep
+
+from rtai.llm.llm_scheduler import LLMScheduler
+
+def fake_generate(prompt: str) -> dict:
+    sleep(0.002)
+    return {'out': "reply to %s" % prompt}
+
+def test_llm_scheduler_runs_requests():
+    scheduler = LLMScheduler(max_concurrency=2)
+    scheduler.begin_cycle()
+
+    with ThreadPoolExecutor(8) as tp:
+        futures = list(tp.map(lambda i: scheduler.submit(fake_generate, "prompt %d" % i), range(16)))
+    results = [f.result() for f in futures]
+
+    assert results[3] == {'out': "reply to prompt 3"}
+    stats = scheduler.end_cycle()
+    assert stats.requests == 16
+    assert stats.words == 16 * 4
+    assert stats.words_per_sec() > 0
+
+def test_llm_scheduler_bounds_concurrency():
+    scheduler = LLMScheduler(max_concurrency=2)
+    lock = Lock()
+    running, peak = [0], [0]
+
+    def generate(prompt: str) -> str:
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        sleep(0.005)
+        with lock:
+            running[0] -= 1
+        return prompt
+
+    # requests start as soon as a worker is free, at most one per live model context
+    futures = [scheduler.submit(generate, "prompt %d" % i) for i in range(8)]
+    assert [f.result() for f in futures] == ["prompt %d" % i for i in range(8)]
+    assert peak[0] == 2
+
+    # a failed request fails its own future only
+    assert isinstance(scheduler.submit(lambda: 1 / 0).exception(), ZeroDivisionError)
+    assert scheduler.submit(generate, "after").result() == "after"
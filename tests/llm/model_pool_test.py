@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import sleep
+
+from rtai.llm.model_pool import ModelPool
+
+class CountingLoader:
+    def __init__(self):
+        self.loaded = []
+        self.lock = Lock()
+
+    def __call__(self, path, n_ctx):
+        with self.lock:
+            self.loaded.append((path, n_ctx))
+        return object()
+
+def test_model_pool_loads_once():
+    loader = CountingLoader()
+    pool = ModelPool(loader, max_live_contexts=2)
+
+    def use(_):
+        with pool.acquire("model.gguf", 2048) as model:
+            sleep(0.001)
+            return model
+
+    with ThreadPoolExecutor(8) as tp:
+        models = list(tp.map(use, range(32)))
+
+    assert loader.loaded == [("model.gguf", 2048)]
+    assert len(set(id(m) for m in models)) == 1
+    stats = pool.get_stats()
+    assert stats['loads'] == 1
+    assert stats['reuses'] == 31
+
+def test_model_pool_bounds_live_contexts():
+    loader = CountingLoader()
+    pool = ModelPool(loader, max_live_contexts=1)
+
+    pool.preload("a.gguf", 2048)
+    pool.preload("b.gguf", 2048)
+    assert pool.get_stats()['live'] == 1
+    assert pool.get_stats()['evictions'] == 1
+
+    with pool.acquire("b.gguf", 2048):
+        pass
+    assert pool.get_stats()['loads'] == 2
@@ -0,0 +1,34 @@
+from time import sleep
+
+from rtai.llm.response_cache import ResponseCache, make_cache_key
+
+def test_response_cache_key():
+    key = make_cache_key("mistral", "estimate_importance", {'concept': "Ate lunch"}, {'temperature': 0.7})
+    assert key == make_cache_key("mistral", "estimate_importance", {'concept': "Ate lunch"}, {'temperature': 0.7})
+    assert key != make_cache_key("mistral", "estimate_importance", {'concept': "Ate lunch"}, {'temperature': 1.0})
+    assert key != make_cache_key("mistral", "estimate_importance", {'concept': "Ate dinner"}, {'temperature': 0.7})
+
+def test_response_cache_lru_and_ttl():
+    cache = ResponseCache(max_entries=2, ttl_sec=0.05)
+    cache.put("a", {'out': 1})
+    cache.put("b", {'out': 2})
+    assert cache.get("a") == (True, {'out': 1})
+    cache.put("c", {'out': 3})
+
+    # b was least recently used
+    assert cache.get("b") == (False, None)
+    assert cache.get("c") == (True, {'out': 3})
+
+    sleep(0.06)
+    assert cache.get("a") == (False, None)
+    stats = cache.get_stats()
+    assert stats['hits'] == 2 and stats['misses'] == 2 and stats['evictions'] == 1
+
+def test_response_cache_survives_restart(tmp_path):
+    file_path = str(tmp_path / "responses.db")
+    cache = ResponseCache(file_path=file_path)
+    cache.put("key", {'importance': "7"})
+    cache.close()
+
+    restarted = ResponseCache(file_path=file_path)
+    assert restarted.get("key") == (True, {'importance': "7"})
@@ -0,0 +1,12 @@
+from os import path
+from typing import List
+
+def write_persona_files(dir_path: str, names: List[str]) -> List[str]:
+    """ Write a minimal persona file for each name, returning their paths"""
+    files = []
+    for i, name in enumerate(names):
+        file_path = path.join(dir_path, 'persona%d.txt' % i)
+        with open(file_path, 'w') as f:
+            f.write("first_name: %s\nlast_name: %s\nname: %s\nage: 30\noccupation: Farmer\nbackstory: \nhobbies: \ntraits: \nmotivations: \nrelationships: \n" % (*name.split(), name))
+        files.append(file_path)
+    return files
@@ -0,0 +1,25 @@
+from pytest import fixture
+from typing import List
+from zlib import crc32
+from numpy import ndarray, zeros, float32
+from numpy.random import default_rng
+
+from rtai.agent.memory.embedding_store import EMBEDDINGS_DIM
+
+class EmbeddingsTestModel:
+    """ _summary_ Deterministic stand-in for SentenceTransformer that hashes each sentence to a random vector"""
+
+    def __init__(self, dim: int=EMBEDDINGS_DIM):
+        self.dim: int = dim
+        self.num_encoded: int = 0
+
+    def encode(self, sentences: List[str]) -> ndarray:
+        out = zeros((len(sentences), self.dim), dtype=float32)
+        for i, sentence in enumerate(sentences):
+            out[i] = default_rng(crc32(str(sentence).encode())).standard_normal(self.dim)
+        self.num_encoded += len(sentences)
+        return out
+
+@fixture
+def mock_embeddings_model() -> EmbeddingsTestModel:
+    return EmbeddingsTestModel()
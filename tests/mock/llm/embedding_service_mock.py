@@ -0,0 +1,12 @@
+from pytest import fixture
+
+from rtai.llm.embedding_service import EmbeddingService
+
+@fixture
+def mock_embedding_service() -> EmbeddingService:
+    # EmbeddingService is a singleton - give every test a fresh one, so the model a test initializes it with does not leak
+    if hasattr(EmbeddingService, '_instance'):
+        del EmbeddingService._instance
+    service = EmbeddingService()
+    yield service
+    del EmbeddingService._instance
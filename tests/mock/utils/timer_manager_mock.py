@@ -0,0 +1,14 @@
+from pytest import fixture
+
+from rtai.utils.timer_manager import TimerManager
+
+@fixture
+def mock_timer_manager() -> TimerManager:
+    # TimerManager is a singleton - give every test a fresh one
+    if hasattr(TimerManager, '_instance'):
+        del TimerManager._instance
+    mgr = TimerManager()
+    yield mgr
+    if not mgr.terminated:
+        mgr.stop_timers()
+    del TimerManager._instance
@@ -0,0 +1,16 @@
+from pytest import fixture
+
+from rtai.world.clock import clock
+
+MOCK_START_TIME = 1704089700 # 2024-01-01 06:15:00 AM
+
+@fixture
+def mock_world_clock() -> clock:
+    # the clock is a singleton - start every test at the same time and speed, and put them back afterwards
+    c = clock({'StartDate': '2024-01-01', 'StartTime': '06:15:00 AM', 'ClockIncrementSec': '30'})
+    state = clock.get_state()
+    speed = clock.get_speed()
+    clock.set_state({'datetime': MOCK_START_TIME, 'day_counter': 0})
+    yield c
+    clock.set_speed(speed)
+    clock.set_state(state)
@@ -0,0 +1,51 @@
+from asyncio import sleep as async_sleep
+from time import sleep
+
+from rtai.story.async_runner import AsyncRunner
+
+from tests.mock.utils.timer_manager_mock import mock_timer_manager
+
+def test_async_runner_runs_timers(mock_timer_manager):
+    calls, coro_calls, blocking_calls = [], [], []
+
+    async def step():
+        await async_sleep(0)
+        coro_calls.append(1)
+
+    def stop_after():
+        calls.append(1)
+        if len(calls) == 20:
+            runner.stop()
+
+    mock_timer_manager.add_timer('InlineTimer', 10, stop_after, milliseconds=True)
+    mock_timer_manager.add_timer('CoroTimer', 10, None, milliseconds=True)
+    mock_timer_manager.add_timer('BlockingTimer', 10, lambda: (sleep(0.001), blocking_calls.append(1)), milliseconds=True)
+    runner = AsyncRunner(mock_timer_manager, lambda line: None, coroutines={'CoroTimer': step}, blocking={'BlockingTimer'})
+    runner.run()
+
+    stats = mock_timer_manager.get_stats()
+    assert len(calls) == 20
+    assert stats['InlineTimer']['runs'] == 20
+    assert abs(len(coro_calls) - 20) <= 2
+    assert abs(len(blocking_calls) - 20) <= 2
+    assert stats['InlineTimer']['jitter']['count'] == 20
+
+def test_async_runner_pause_resume(mock_timer_manager):
+    calls = []
+
+    async def control():
+        runner.pause()
+        paused_at = len(calls)
+        await async_sleep(0.1)
+        assert len(calls) == paused_at
+        runner.resume()
+        await async_sleep(0.1)
+        assert len(calls) > paused_at
+        runner.stop()
+
+    mock_timer_manager.add_timer('FastTimer', 10, lambda: calls.append(1), milliseconds=True)
+    mock_timer_manager.add_timer('ControlTimer', 50, None, milliseconds=True)
+    runner = AsyncRunner(mock_timer_manager, lambda line: None, coroutines={'ControlTimer': control})
+    runner.run()
+
+    assert not runner.is_paused
@@ -0,0 +1,53 @@
+from time import perf_counter
+
+from rtai.utils.datetime import timedelta
+from rtai.world.clock import clock
+from rtai.story.fast_forward import FastForwardRunner
+
+from tests.mock.utils.timer_manager_mock import mock_timer_manager
+from tests.mock.world.world_clock_mock import mock_world_clock
+
+def test_fast_forward_steps_in_virtual_time(mock_timer_manager):
+    calls = []
+
+    def record(name):
+        calls.append(name)
+        if len(calls) == 1000:
+            runner.stop()
+
+    mock_timer_manager.add_timer('Slow', 10, lambda: record('Slow'))
+    mock_timer_manager.add_timer('Fast', 2500, lambda: record('Fast'), milliseconds=True)
+    runner = FastForwardRunner(mock_timer_manager, 'Clock')
+
+    start_time = perf_counter()
+    runner.run()
+
+    # thousands of virtual seconds run without sleeping
+    assert perf_counter() - start_time < 1.0
+    assert runner.now == 2000.0
+    # equal deadlines run in registration order - Slow fires before the 4th Fast of every 10 seconds
+    assert calls[:5] == ['Fast', 'Fast', 'Fast', 'Slow', 'Fast']
+    assert calls.count('Slow') == 200
+    assert calls.count('Fast') == 800
+
+def test_fast_forward_skips_idle_agents(mock_timer_manager, mock_world_clock):
+    agent_calls = []
+    wakeup = clock.peek() + timedelta(minutes=30)
+
+    def next_wakeup():
+        return wakeup if clock.peek() < wakeup else None
+
+    def agent_update():
+        agent_calls.append(clock.peek().copy())
+        if len(agent_calls) == 3:
+            runner.stop()
+
+    mock_timer_manager.add_timer('Agent', 5, agent_update, milliseconds=True)
+    mock_timer_manager.add_timer('Clock', 500, mock_world_clock.tick, milliseconds=True)
+    runner = FastForwardRunner(mock_timer_manager, 'Clock', idle_timers={'Agent'}, next_wakeup=next_wakeup)
+    runner.run()
+
+    # the first agent update only runs once the clock reached the wakeup, after 60 ticks of 30 seconds
+    assert agent_calls[0] == wakeup
+    assert runner.skipped_ticks == 60
+    assert mock_timer_manager.get_stats()['Agent']['skipped'] > 0
@@ -0,0 +1,82 @@
+from glob import glob
+from logging import DEBUG, getLogger
+from typing import List, Tuple
+
+from rtai.agent.agent_manager import AgentManager
+from rtai.core.event import EventType
+from rtai.core.event_bus import EventBus
+from rtai.story.fast_forward import FastForwardRunner
+from rtai.utils.config import Config
+from rtai.utils.logging import setup_logging, shutdown_logging
+from rtai.utils.timer_manager import TimerManager
+from rtai.utils.transcript import TranscriptReader
+from rtai.world.clock import clock
+
+from tests.mock.agent.agent_mock import write_persona_files
+from tests.mock.agent.embedding_mock import EmbeddingsTestModel
+from tests.mock.llm.llm_client_mock import LLMTestClient
+from tests.mock.world.world_clock_mock import mock_world_clock, MOCK_START_TIME as START
+
+# the LLMTestClient schedules Hank and Claire to chat with each other at 9:15
+NAMES = ['Hank Thompson', 'Claire Reynolds']
+END = START + 4 * 3600 # 10:15, an hour into the chat
+
+def run_fast_forward(log_dir: str, persona_files: List[str], world_clock: clock, skip_idle: bool) -> Tuple[list, int]:
+    """ Run the agents on the engine's timers until END, returning the sorted transcript and the number of clock ticks jumped"""
+    clock.set_state({'datetime': START, 'day_counter': 0})
+    if hasattr(TimerManager, '_instance'):
+        del TimerManager._instance
+    timer_mgr = TimerManager()
+    client = LLMTestClient()
+    client.initialize(Config(dict()))
+    queue = EventBus()
+    agent_mgr = AgentManager(queue, Config({'NumAgents': len(NAMES), 'LoadFiles': str(persona_files)}, 'Agents'), client, None, EmbeddingsTestModel())
+
+    level = getLogger().level
+    setup_logging(log_dir, 'rtai', DEBUG, 'transcript', structured_transcript=True)
+    try:
+        assert agent_mgr.initialize()
+        [queue.subscribe(EventType.ChatEvent, agent_mgr.dispatch_chat_event, topic=name) for name in NAMES]
+        agent_mgr.update(first_day=True)
+
+        def poll_event_queue():
+            queue.drain()
+            if clock.peek().timestamp() >= END:
+                runner.stop()
+
+        def next_wakeup():
+            return agent_mgr.next_wakeup() if queue.empty() else None
+
+        # the story engine's timers, in its registration order - agent cycles every 3 ticks, so the 9:00 AM wakeup lands on an agent deadline
+        timer_mgr.add_timer('AgentThread', 1500, agent_mgr.update, milliseconds=True)
+        timer_mgr.add_timer('WorkerThread', 1000, poll_event_queue, milliseconds=True)
+        timer_mgr.add_timer('WorldClockThread', 500, world_clock.tick, milliseconds=True)
+        runner = FastForwardRunner(timer_mgr, 'WorldClockThread', idle_timers={'AgentThread', 'WorkerThread'}, next_wakeup=next_wakeup if skip_idle else None)
+        runner.run()
+    finally:
+        agent_mgr.stop()
+        shutdown_logging()
+        getLogger().setLevel(level)
+        del TimerManager._instance
+
+    reader = TranscriptReader(glob('%s/transcript_*.idx.json' % log_dir)[0][:-len('.idx.json')])
+    # agents act in parallel, so only the set of lines logged at a sim time is deterministic
+    transcript = sorted((e.sim_time, e.event_time, e.sender, e.event_type, e.message) for e in (reader[i] for i in range(len(reader))))
+    reader.close()
+    return transcript, runner.skipped_ticks
+
+def test_fast_forward_jump_keeps_transcript(tmp_path, mock_world_clock):
+    persona_files = write_persona_files(str(tmp_path), NAMES)
+    (tmp_path / 'replay').mkdir()
+    (tmp_path / 'jump').mkdir()
+
+    # every clock tick stepped, as the timed modes do when no timer overruns
+    expected, skipped = run_fast_forward(str(tmp_path / 'replay'), persona_files, mock_world_clock, skip_idle=False)
+    assert skipped == 0
+    transcript, skipped = run_fast_forward(str(tmp_path / 'jump'), persona_files, mock_world_clock, skip_idle=True)
+
+    # jumping the clock over idle stretches logs the same lines at the same sim times
+    assert skipped > 0
+    assert transcript == expected
+    assert sum(line[3] == 'Chat' for line in transcript) > 10
+    assert {line[2] for line in transcript} == set(NAMES)
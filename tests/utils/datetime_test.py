@@ -1,5 +1,6 @@
 from typing import List
 
+from rtai.utils.datetime import datetime, timedelta
 from tests.mock.utils.datetime_mock import mock_datetime
 
 def test_datetime(mock_datetime):
@@ -16,4 +17,24 @@ def test_datetime(mock_datetime):
     assert mock_datetime.get_time_str() == "22:10:00"
     assert mock_datetime.get_date_str() == "12/11/2023"
     assert mock_datetime.get_datetime_str() == "12/11/2023 10:10 PM"
-    assert str(mock_datetime) == "12/11/2023 10:10 PM"    
\ No newline at end of file
+    assert str(mock_datetime) == "12/11/2023 10:10 PM"    
+
+
+def test_datetime_is_whole_epoch_seconds():
+    start = datetime.strptime("2024-01-01 06:15:30 PM")
+    assert start.timestamp() == 1704132930
+    assert start.get_time_str() == "06:15:30 PM"
+    assert start.get_date_str() == "2024-01-01"
+    assert start.get_datetime_str(show_seconds=False) == "2024-01-01 06:15 PM"
+    assert datetime.fromtimestamp(start.timestamp()) == start
+
+    end = start + timedelta(days=1, minutes=90)
+    assert start < end and start <= end and not end <= start
+    assert end.calc_timedelta_diff(start) == timedelta(days=1, minutes=90)
+    assert end.get_datetime_str() == "2024-01-02 07:45:30 PM"
+    assert start.get_timedelta_from_time_str("20:00") == timedelta(hours=1, minutes=44, seconds=30)
+
+    # copies are independent of the original
+    copy = start.copy()
+    copy.increment_by(30)
+    assert copy.get_time_str() == "06:16:00 PM" and start.get_time_str() == "06:15:30 PM"
@@ -0,0 +1,51 @@
+from glob import glob
+from logging import DEBUG, getLogger, Handler
+from threading import Thread
+
+from rtai.utils.logging import setup_logging, shutdown_logging, info, debug, log_transcript
+
+class Agent:
+    def act(self, i: int) -> None:
+        info("Agent [%s] step [%d]", 'Alice', i)
+
+def test_logging_writes_queued_records_in_background(tmp_path):
+    level = getLogger().level
+    setup_logging(str(tmp_path), 'rtai', DEBUG, 'transcript', use_callee_stack=True)
+    try:
+        agent = Agent()
+        threads = [Thread(target=lambda: [agent.act(i) for i in range(100)]) for _ in range(4)]
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+        debug("module level")
+        log_transcript('Alice', '06:15 AM', 'Chat', 'Hello Bob')
+    finally:
+        shutdown_logging()
+        getLogger().setLevel(level)
+
+    with open(glob('%s/rtai_*.log' % tmp_path)[0]) as f:
+        lines = f.read().splitlines()
+    assert sum('[Agent::act::9] Agent [Alice] step [99]' in line for line in lines) == 4
+    assert len([line for line in lines if '[Agent::act::9]' in line]) == 400
+    assert lines[-2].endswith('[logging_test.py::test_logging_writes_queued_records_in_background::19] module level')
+    # transcript records also go to the main log
+    assert lines[-1].endswith('Hello Bob')
+
+    with open(glob('%s/transcript_*.log' % tmp_path)[0]) as f:
+        assert f.read() == "[06:15 AM] [Alice] [Chat] Hello Bob\n"
+
+def test_logging_keeps_caller_extra(tmp_path):
+    level = getLogger().level
+    records = []
+    handler = Handler()
+    handler.emit = records.append
+    setup_logging(str(tmp_path), 'rtai', DEBUG, 'transcript', use_callee_stack=True)
+    getLogger().addHandler(handler)
+    try:
+        info("tagged", extra={'custom_name': 'Alice'})
+    finally:
+        getLogger().removeHandler(handler)
+        shutdown_logging()
+        getLogger().setLevel(level)
+
+    assert records[0].custom_name == 'Alice'
+    assert records[0].caller == 'logging_test.py::test_logging_keeps_caller_extra::44'
@@ -0,0 +1,50 @@
+from json import load
+from threading import Thread
+
+from rtai.utils.stats import LatencyStats, Profiler, format_profile
+
+def test_latency_histogram_buckets_every_sample():
+    stats = LatencyStats(window=4)
+    for elapsed_ms in [0.05, 0.1, 0.3, 2, 2, 75, 20000]:
+        stats.record(elapsed_ms)
+
+    histogram = stats.histogram()
+    # buckets hold every sample, not only the recent window
+    assert sum(histogram.values()) == 7
+    assert histogram['<=0.1ms'] == 2 and histogram['<=0.5ms'] == 1 and histogram['<=5ms'] == 2
+    assert histogram['<=100ms'] == 1 and histogram['>10000ms'] == 1
+    assert list(histogram)[0] == '<=0.1ms'
+
+    stats.reset()
+    assert sum(stats.histogram().values()) == 0
+
+def test_profiler_aggregates_sections_by_scope(tmp_path):
+    profiler = Profiler()
+
+    def act(name: str):
+        for _ in range(100):
+            with profiler.measure(name, 'act'):
+                pass
+            profiler.record('llm', 'create_dialogue', 2.0)
+
+    threads = [Thread(target=act, args=(name,)) for name in ['Alice', 'Bob', 'Carol', 'Dave']]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+
+    stats = profiler.get_stats()
+    assert list(stats) == ['Alice', 'Bob', 'Carol', 'Dave', 'llm']
+    assert stats['Alice']['act']['count'] == 100
+    assert stats['llm']['create_dialogue']['count'] == 400
+    assert stats['llm']['create_dialogue']['histogram']['<=5ms'] == 400
+    assert 'Alice' in format_profile(stats)
+
+    profiler.dump(str(tmp_path / 'profile.json'))
+    with open(tmp_path / 'profile.json') as f:
+        assert load(f) == stats
+
+    profiler.enabled = False
+    profiler.record('Alice', 'act', 1.0)
+    assert profiler.get_stats()['Alice']['act']['count'] == 100
+
+    profiler.reset()
+    assert profiler.get_stats() == {}
@@ -0,0 +1,43 @@
+from time import sleep
+
+from tests.mock.utils.timer_manager_mock import mock_timer_manager
+
+def test_timer_manager_fixed_rate(mock_timer_manager):
+    calls = []
+    mock_timer_manager.add_timer('FastTimer', 10, lambda: calls.append(1), milliseconds=True)
+    mock_timer_manager.start_timers()
+    sleep(0.5)
+    mock_timer_manager.stop_timers()
+
+    stats = mock_timer_manager.get_stats()['FastTimer']
+    # fixed rate does not drift by the callback duration
+    assert 40 <= len(calls) <= 51
+    assert stats['runs'] == len(calls)
+    assert stats['overruns'] == 0
+    assert stats['jitter']['count'] == len(calls)
+
+def test_timer_manager_detects_overruns(mock_timer_manager):
+    mock_timer_manager.add_timer('SlowTimer', 10, lambda: sleep(0.035), milliseconds=True)
+    mock_timer_manager.start_timers()
+    sleep(0.3)
+    mock_timer_manager.stop_timers()
+
+    stats = mock_timer_manager.get_stats()['SlowTimer']
+    assert stats['overruns'] > 0
+    assert stats['runs'] <= 10
+    assert stats['latency']['mean_ms'] >= 30
+
+def test_timer_manager_pause_and_resume(mock_timer_manager):
+    calls = []
+    mock_timer_manager.add_timer('PausedTimer', 10, lambda: calls.append(1), milliseconds=True)
+    mock_timer_manager.start_timers()
+    sleep(0.1)
+    mock_timer_manager.pause_timers()
+    sleep(0.02)
+    num_calls = len(calls)
+    sleep(0.1)
+    assert len(calls) == num_calls
+
+    mock_timer_manager.resume_timers()
+    sleep(0.1)
+    assert len(calls) > num_calls
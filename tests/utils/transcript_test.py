@@ -0,0 +1,57 @@
+from glob import glob
+from logging import DEBUG, getLogger
+
+from rtai.utils.logging import setup_logging, shutdown_logging, log_transcript
+from rtai.utils.transcript import TranscriptWriter, TranscriptReader
+from rtai.world.clock import clock
+
+from tests.mock.world.world_clock_mock import mock_world_clock, MOCK_START_TIME as START
+
+def test_transcript_seeks_by_time_and_agent(tmp_path):
+    base_path = str(tmp_path / 'transcript')
+    writer = TranscriptWriter(base_path)
+    for i in range(1000):
+        writer.append(START + i * 30, 'Alice' if i % 2 == 0 else 'Bob', 'Chat' if i % 3 == 0 else 'Action', 'line %d ☕' % i)
+    writer.flush()
+
+    # readable while written - lines after the last index write are indexed by the reader
+    reader = TranscriptReader(base_path)
+    assert len(reader) == 1000
+    assert reader[999].message == 'line 999 ☕' and reader[999].sender == 'Bob'
+    assert len(reader.by_agent('Alice')) == 500
+    reader.close()
+
+    writer.append(START + 1000 * 30, 'Narrator', 'Auto', 'It is raining')
+    writer.close()
+
+    reader = TranscriptReader(base_path)
+    assert len(reader) == 1001
+    entries = reader.time_range(START + 300, START + 420)
+    assert [e.message for e in entries] == ['line 10 ☕', 'line 11 ☕', 'line 12 ☕', 'line 13 ☕']
+    assert [(e.sender, e.event_type, e.sim_time, e.event_time) for e in entries[:2]] == [('Alice', 'Action', START + 300, START + 300), ('Bob', 'Action', START + 330, START + 330)]
+    assert reader.time_range(START + 420, START + 300) == []
+
+    bob = reader.by_agent('Bob', START + 300, START + 420)
+    assert [e.record for e in bob] == [11, 13]
+    assert [e.message for e in reader.by_agent('Narrator')] == ['It is raining']
+    assert reader.by_agent('Carol') == []
+    reader.close()
+
+def test_log_transcript_writes_structured_transcript(tmp_path, mock_world_clock):
+    level = getLogger().level
+    setup_logging(str(tmp_path), 'rtai', DEBUG, 'transcript', structured_transcript=True)
+    try:
+        log_transcript('Alice', clock.get_time_str(), 'Chat', 'Hello Bob')
+        log_transcript('Bob', clock.get_time_str(), 'Chat', 'Hi Alice')
+        # lines about an earlier time, such as the start of an action, are still stamped with the time they are logged at
+        mock_world_clock.tick()
+        log_transcript('Alice', '06:15 AM', 'Action', 'Making coffee', event_time=START)
+    finally:
+        shutdown_logging()
+        getLogger().setLevel(level)
+
+    reader = TranscriptReader(glob('%s/transcript_*.idx.json' % tmp_path)[0][:-len('.idx.json')])
+    assert [(e.sim_time, e.sender, e.event_type, e.message) for e in reader.time_range(START, START + 1)] == [(START, 'Alice', 'Chat', 'Hello Bob'), (START, 'Bob', 'Chat', 'Hi Alice')]
+    assert [(e.sim_time, e.event_time, e.message) for e in reader.time_range(START + 30, START + 31)] == [(START + 30, START, 'Making coffee')]
+    assert reader.time_sorted
+    reader.close()
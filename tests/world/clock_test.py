@@ -0,0 +1,77 @@
+from threading import Thread, Event as ThreadEvent
+
+from rtai.world.clock import clock, HOUR_BOUNDARY, DAY_BOUNDARY
+
+from tests.mock.world.world_clock_mock import mock_world_clock
+
+def test_clock_reads_from_many_threads(mock_world_clock):
+    ticks = 5000
+    start = clock.peek().timestamp()
+    done = ThreadEvent()
+    errors = []
+
+    def read():
+        held = clock.snapshot()
+        held_time = held.timestamp()
+        last = held_time
+        while not done.is_set():
+            now = clock.peek()
+            # the published time never moves backwards, and a time already read never changes
+            if now.timestamp() < last or held.timestamp() != held_time:
+                errors.append((last, now.timestamp(), held.timestamp(), held_time))
+                return
+            last = now.timestamp()
+
+    readers = [Thread(target=read) for _ in range(8)]
+    [r.start() for r in readers]
+    for _ in range(ticks):
+        mock_world_clock.tick()
+    done.set()
+    [r.join() for r in readers]
+
+    assert errors == []
+    assert clock.peek().timestamp() == start + ticks * 30
+    # 5000 ticks of 30 seconds is 41 hours and 40 minutes, crossing midnight once
+    assert clock.get_day_count() == 1
+
+def test_clock_notifies_boundaries_and_speeds_up(mock_world_clock):
+    hours, days = [], []
+    clock.subscribe(HOUR_BOUNDARY, hours.append)
+    clock.subscribe(DAY_BOUNDARY, days.append)
+
+    try:
+        # 06:15 AM -> 07:00 AM
+        for _ in range(90):
+            mock_world_clock.tick()
+        assert [h.get_time_str() for h in hours] == ['07:00:00 AM']
+
+        # each tick now advances 4 hours, every hour crossed is still notified
+        clock.set_speed(480)
+        mock_world_clock.tick()
+        mock_world_clock.tick()
+        mock_world_clock.tick()
+        mock_world_clock.tick()
+        assert clock.get_time_str() == '11:00:00 PM'
+        assert len(hours) == 17
+        assert days == []
+
+        mock_world_clock.tick()
+        assert [d.get_datetime_str() for d in days] == ['2024-01-02 12:00:00 AM']
+        assert clock.get_day_count() == 1
+    finally:
+        clock.unsubscribe(HOUR_BOUNDARY, hours.append)
+        clock.unsubscribe(DAY_BOUNDARY, days.append)
+
+    assert clock.subscribers[HOUR_BOUNDARY] == [] and clock.subscribers[DAY_BOUNDARY] == []
+
+def test_clock_rejects_non_positive_speed(mock_world_clock):
+    clock.set_speed(2)
+    assert not clock.set_speed(0)
+    assert not clock.set_speed(-1)
+    assert not clock.set_speed(float('nan'))
+    assert clock.get_speed() == 2
+
+    # the clock never runs backwards
+    start = clock.peek().timestamp()
+    mock_world_clock.tick()
+    assert clock.peek().timestamp() == start + 60